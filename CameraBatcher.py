@@ -10,25 +10,79 @@ bl_info = {
 
 import bpy
 import os
+import re
+import sys
+import csv
 import math
+import json
+import time
+import struct
+import hashlib
+import queue
+import shutil
+import subprocess
+import heapq
+import fnmatch
+import tempfile
+import threading
+import zlib
+import numpy as np
+from collections import deque
+from types import SimpleNamespace
+from mathutils import Vector, Euler
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
 from bpy.types import PropertyGroup, Operator, Panel, UIList
+from bpy.app.handlers import persistent
 from bpy.props import (
-    StringProperty, BoolProperty, IntProperty, PointerProperty,
-    CollectionProperty, FloatVectorProperty
+    StringProperty, BoolProperty, IntProperty, FloatProperty, PointerProperty,
+    CollectionProperty, FloatVectorProperty, IntVectorProperty, EnumProperty
 )
 
 # =========================
 # 数据结构：单个姿态
 # =========================
+_POSE_EDIT_MUTED = set()  # 正在批量填充姿态的场景指针：逐项回调跳过，填完统一递增一次修订号
+
+def _poses_changed(s):
+    # 姿态列表的修订号：列表 UI 的过滤 / 排序缓存据此失效（随撤销一起还原）
+    s.poses_rev += 1
+
+def _on_pose_edit(self, context):
+    scene = self.id_data
+    if scene.as_pointer() not in _POSE_EDIT_MUTED:
+        _poses_changed(scene.htxr)
+
 class HTXR_PoseItem(PropertyGroup):
-    name: StringProperty(name="名称", default="Pose")
+    name: StringProperty(name="名称", default="Pose", update=_on_pose_edit)
     loc: FloatVectorProperty(
         name="位置", size=3, subtype='TRANSLATION', unit='LENGTH',
-        default=(0.0, 0.0, 0.0)
+        default=(0.0, 0.0, 0.0), update=_on_pose_edit
     )
     rot: FloatVectorProperty(
         name="旋转(XYZ)", size=3, subtype='EULER', unit='ROTATION',
-        default=(0.0, 0.0, 0.0)  # 内部弧度
+        default=(0.0, 0.0, 0.0), update=_on_pose_edit  # 内部弧度
+    )
+
+# =========================
+# 数据结构：机位（多机位 / 多镜头批次）
+# =========================
+class HTXR_RigItem(PropertyGroup):
+    name: StringProperty(name="后缀", default="rig", description="输出文件名 <前缀><序号>_<后缀>")
+    enabled: BoolProperty(name="启用", default=True)
+    camera: PointerProperty(
+        name="摄像机", type=bpy.types.Object,
+        description="留空则使用主摄像机",
+        poll=lambda self, obj: (obj and obj.type == 'CAMERA')
+    )
+    use_lens: BoolProperty(name="覆盖镜头", default=False)
+    lens: FloatProperty(name="焦距", min=1.0, max=5000.0, default=50.0, unit='CAMERA')
+    sensor_width: FloatProperty(name="传感器宽度", min=1.0, max=200.0, default=36.0, unit='CAMERA')
+    shift_x: FloatProperty(name="位移 X", min=-10.0, max=10.0, default=0.0)
+    shift_y: FloatProperty(name="位移 Y", min=-10.0, max=10.0, default=0.0)
+    offset: FloatVectorProperty(
+        name="局部偏移", size=3, subtype='TRANSLATION', unit='LENGTH', default=(0.0, 0.0, 0.0),
+        description="相对姿态的相机局部坐标偏移，立体对可分别设 X = ∓瞳距/2"
     )
 
 # =========================
@@ -60,10 +114,157 @@ class HTXR_Settings(PropertyGroup):
     res_y: IntProperty(name="高度", min=8, max=16384, default=1440)
     samples: IntProperty(name="采样", min=1, max=65536, default=1024)
     restore_scene_camera: BoolProperty(name="渲染后还原场景相机", default=True)
+    preview_scale: IntProperty(name="预览比例", subtype='PERCENTAGE', min=1, max=100, default=25)
+    preview_samples: IntProperty(name="预览采样", min=1, max=4096, default=16)
+    preview_denoise: BoolProperty(name="预览降噪", default=True)
+    static_scene: BoolProperty(
+        name="静态场景（持久数据）",
+        description="批次内只有相机在动：开启 render.use_persistent_data，第二张起复用已同步的场景、"
+                    "BVH 与着色器（Cycles）；渲染期间若有相机以外的数据变化会给出提示",
+        default=False
+    )
+    async_write: BoolProperty(
+        name="后台移动文件（本地暂存）",
+        description="Blender 仍在渲染之间把图片编码写出，但写到本地暂存目录；后台线程再把文件移到输出目录。"
+                    "只省下网络盘的慢拷贝，编码本身的时间不变",
+        default=False
+    )
+    async_workers: IntProperty(name="移动线程数", min=1, max=32, default=2)
+    async_queue: IntProperty(name="排队上限", min=1, max=1024, default=8,
+                             description="待移动的图片达到该数量时暂停启动新渲染，避免暂存目录无限堆积")
+    staging_dir: StringProperty(name="暂存目录", subtype='DIR_PATH', default="",
+                                description="留空使用系统临时目录下的 htxr_staging")
+    tile_render: BoolProperty(
+        name="分块渲染（超大图）",
+        description="按渲染边框把每张图拆成若干块分别渲染（裁剪到边框），再逐行流式拼接成整图；"
+                    "分布式渲染时各块分给不同进程并行。仅支持 PNG 输出",
+        default=False
+    )
+    tile_cols: IntProperty(name="列", min=1, max=64, default=2)
+    tile_rows: IntProperty(name="行", min=1, max=64, default=2)
+    tile_memory_mb: IntProperty(name="单块内存上限 (MB)", min=0, max=1 << 20, default=0,
+                                description="按 RGBA 浮点渲染缓冲估算单块大小，超出时自动增加行数；0 表示不限制")
+    multi_size: BoolProperty(
+        name="多尺寸输出",
+        description="每个姿态只按最大分辨率渲染一次，其余尺寸由后台线程面积平均降采样，"
+                    "写到按宽度命名的子目录并生成尺寸索引与联系表（仅 PNG 输出）",
+        default=False
+    )
+    multi_sizes: StringProperty(name="其余宽度", default="1920, 1280, 320",
+                                description="逗号分隔的像素宽度，高度按渲染宽高比换算；不小于渲染宽度的忽略")
+    multi_size_workers: IntProperty(name="降采样线程数", min=1, max=32, default=2)
+    multi_size_sheet: BoolProperty(name="生成联系表", default=True)
+    budget_mode: EnumProperty(
+        name="采样预算",
+        items=[
+            ('OFF', "关闭", "每张按固定采样数渲染"),
+            ('TIME', "总时长", "给定整批总时长：每张开始前按剩余时间分配 Cycles 采样时间上限，并开启自适应采样"),
+            ('NOISE', "噪声阈值", "每张用 Cycles 自适应采样渲到噪声阈值为止，采样数只作上限"),
+        ],
+        default='OFF'
+    )
+    budget_minutes: FloatProperty(name="总时长（分钟）", min=0.1, max=1e6, default=60.0)
+    budget_noise: FloatProperty(name="噪声阈值", min=0.0001, max=1.0, default=0.01, precision=4,
+                                description="Cycles 自适应采样阈值：越小越干净、越慢")
+    dedup_alias: BoolProperty(
+        name="重复姿态只渲一次",
+        description="位置与旋转都在容差内的姿态视为重复：只渲染先出现的代表，其余直接复制代表的图片",
+        default=False
+    )
+    dedup_pos_tol: FloatProperty(name="位置容差", min=0.0, default=0.01, unit='LENGTH')
+    dedup_ang_tol: FloatProperty(name="角度容差", subtype='ANGLE', min=0.0, max=math.pi, default=math.radians(0.5))
+    preflight: EnumProperty(
+        name="渲染前预检",
+        items=[
+            ('OFF', "关闭", "不检测"),
+            ('FLAG', "只提示", "渲染前用射线检测问题姿态并列出，照常渲染"),
+            ('SKIP', "跳过问题姿态", "在几何体内部、近处被遮挡或只看到背景的姿态不渲染"),
+        ],
+        default='OFF'
+    )
+    preflight_grid: IntProperty(name="检测射线网格", min=2, max=64, default=8,
+                                description="每个姿态穿过画面发射 N×N 条射线")
+    preflight_near: FloatProperty(name="遮挡距离", min=0.0, default=0.5, unit='LENGTH',
+                                  description="命中点比这更近的射线视为被遮挡")
+    preflight_block_ratio: FloatProperty(name="遮挡比例", subtype='FACTOR', min=0.05, max=1.0, default=0.9,
+                                         description="被遮挡射线占比达到该值时判定整张画面被挡住")
+    skip_unchanged: BoolProperty(
+        name="跳过未变化的姿态",
+        description="增量渲染：输出目录清单中哈希一致且图片已存在的姿态不再渲染。"
+                    "姿态、镜头参数、分辨率/采样、渲染引擎、输出格式，或场景内容（物体、网格、材质、灯光、世界等求值数据的哈希，"
+                    "含未保存的改动）变化都会触发重渲",
+        default=False
+    )
+
+    # 多机位
+    use_rigs: BoolProperty(
+        name="多机位批次",
+        description="每个姿态依次渲染下方全部启用的机位，再进入下一个姿态（同一姿态内只有相机变化，持久数据可充分复用）",
+        default=False
+    )
+    rigs: CollectionProperty(type=HTXR_RigItem)
+    rig_index: IntProperty(default=0)
 
     # 姿态列表
     poses: CollectionProperty(type=HTXR_PoseItem)
     pose_index: IntProperty(default=0)
+    poses_rev: IntProperty(default=0, options={'HIDDEN'})
+    pose_source: EnumProperty(
+        name="姿态来源",
+        items=[
+            ('SCENE', "场景列表", "渲染使用下方姿态列表"),
+            ('FILE', "外部文件", "渲染时直接读取姿态文件，不写入场景，.blend 保持小巧"),
+            ('GENERATOR', "生成器", "渲染时按参数批量计算姿态（环绕 / 半球 / 网格 / 沿曲线），不写入场景"),
+        ],
+        default='SCENE'
+    )
+    pose_file: StringProperty(
+        name="姿态文件", subtype='FILE_PATH', default="",
+        description="CSV / JSON / .npy / .npz，布局见『导入姿态』"
+    )
+
+    # ====== 姿态生成器 ======
+    gen_type: EnumProperty(
+        name="生成方式",
+        items=[
+            ('ORBIT', "环绕", "若干水平环，每环等角度分布"),
+            ('HEMISPHERE', "斐波那契半球", "仰角范围内按面积均匀分布的视点"),
+            ('GRID', "XYZ 网格", "长方体范围内的规则网格"),
+            ('CURVE', "沿曲线", "沿曲线对象按弧长等距采样"),
+        ],
+        default='ORBIT'
+    )
+    gen_target: PointerProperty(
+        name="目标对象", type=bpy.types.Object,
+        description="环绕/半球的中心与朝向目标；留空则使用下方中心点"
+    )
+    gen_center: FloatVectorProperty(name="中心点", size=3, subtype='TRANSLATION', unit='LENGTH', default=(0.0, 0.0, 0.0))
+    gen_radius: FloatProperty(name="半径", min=0.001, default=10.0, unit='LENGTH')
+    gen_count: IntProperty(
+        name="数量", min=1, max=10000000, default=36,
+        description="环绕：每环视点数；半球 / 沿曲线：视点总数"
+    )
+    gen_rings: IntProperty(name="环数", min=1, max=10000, default=1)
+    gen_elev_min: FloatProperty(name="最低仰角", subtype='ANGLE', min=-math.pi / 2, max=math.pi / 2, default=0.0)
+    gen_elev_max: FloatProperty(name="最高仰角", subtype='ANGLE', min=-math.pi / 2, max=math.pi / 2, default=math.radians(60.0))
+    gen_grid_min: FloatVectorProperty(name="网格起点", size=3, subtype='TRANSLATION', unit='LENGTH', default=(-5.0, -5.0, 1.0))
+    gen_grid_max: FloatVectorProperty(name="网格终点", size=3, subtype='TRANSLATION', unit='LENGTH', default=(5.0, 5.0, 3.0))
+    gen_grid_steps: IntVectorProperty(name="网格点数", size=3, min=1, max=10000, default=(5, 5, 2))
+    gen_curve: PointerProperty(
+        name="曲线", type=bpy.types.Object,
+        poll=lambda self, obj: (obj and obj.type == 'CURVE')
+    )
+    gen_orient: EnumProperty(
+        name="朝向",
+        items=[
+            ('LOOK_AT', "看向目标", "相机 -Z 指向目标对象 / 中心点，+Y 尽量朝上"),
+            ('TANGENT', "沿切线", "沿曲线前进方向（仅『沿曲线』）"),
+            ('FIXED', "固定", "全部使用下方固定旋转"),
+        ],
+        default='LOOK_AT'
+    )
+    gen_roll: FloatProperty(name="滚转", subtype='ANGLE', default=0.0)
+    gen_rotation: FloatVectorProperty(name="固定旋转", size=3, subtype='EULER', unit='ROTATION', default=(math.radians(90.0), 0.0, 0.0))
 
     # ====== 视频模块 ======
     video_apply_override: BoolProperty(
@@ -79,22 +280,196 @@ class HTXR_Settings(PropertyGroup):
     fps: IntProperty(name="帧率", min=1, max=240, default=30)
     frame_start: IntProperty(name="起始帧", min=0, max=1000000, default=1)
     video_filename: StringProperty(name="视频文件名", default="render.mp4")
+    path_interp: EnumProperty(
+        name="路径插值",
+        items=[
+            ('LINEAR', "线性", "姿态平均落在帧区间上，位置与欧拉角线性插值"),
+            ('SPLINE', "样条", "Catmull-Rom 位置样条 + 四元数旋转插值，逐帧烘焙"),
+        ],
+        default='LINEAR'
+    )
+    path_spline: EnumProperty(
+        name="位置样条",
+        items=[
+            ('CENTRIPETAL', "向心 Catmull-Rom", "α=0.5，不打结、不过冲"),
+            ('UNIFORM', "均匀 Catmull-Rom", "α=0，经典 Catmull-Rom"),
+        ],
+        default='CENTRIPETAL'
+    )
+    path_rotation: EnumProperty(
+        name="旋转插值",
+        items=[
+            ('SLERP', "Slerp", "逐段球面线性插值"),
+            ('SQUAD', "Squad", "球面样条，经过姿态时角速度连续"),
+        ],
+        default='SQUAD'
+    )
+    path_timing: EnumProperty(
+        name="节奏",
+        items=[
+            ('CONSTANT', "匀速", "按弧长查找表匀速前进（旋转也折算进路程）"),
+            ('POSES', "按姿态均分", "相邻姿态之间分配相同帧数"),
+        ],
+        default='CONSTANT'
+    )
+    pipeline_format: EnumProperty(
+        name="中间序列格式",
+        items=[
+            ('PNG', "PNG 16 位", "无损，已应用视图变换，编码结果与直接渲染视频一致"),
+            ('OPEN_EXR', "OpenEXR（ZIP）", "无损线性半浮点，编码时按标准 sRGB 转换"),
+        ],
+        default='PNG'
+    )
+    ffmpeg_path: StringProperty(
+        name="ffmpeg 程序", subtype='FILE_PATH', default="",
+        description="流水线编码使用的 ffmpeg；留空则在 PATH 中查找，找不到时渲完改用 Blender 序列编辑器编码"
+    )
+    video_direct_path: BoolProperty(
+        name="直接按姿态路径渲染",
+        description="不写入相机关键帧：渲染前一次性算出全部帧的相机变换，用临时动作驱动相机，"
+                    "结束后还原相机原有动画",
+        default=False
+    )
+    video_skip_holds: BoolProperty(
+        name="跳过静止帧",
+        description="预先算出逐帧相机变换，相机停住（变换在容差内相同）且场景中没有其他动画的连续帧只渲第一帧，"
+                    "其余帧复用其像素；『渲染视频』此时改为先渲序列帧再编码",
+        default=False
+    )
+
+    # ====== 性能记录 ======
+    profile_report: BoolProperty(
+        name="记录性能报告",
+        description="『按序渲染图片』与『渲染视频到文件夹』逐张/逐帧记录同步、采样、采样后（降噪 / 合成 / 写文件）耗时，"
+                    "进程峰值内存、渲染统计文本、文件大小与实际采样数，写入输出目录的 htxr_profile.jsonl / .csv",
+        default=False
+    )
+    profile_last: StringProperty(default="", options={'HIDDEN'})  # 最近一批的摘要（JSON），供面板显示
+
+    # ====== 分布式渲染 ======
+    dist_workers: IntProperty(
+        name="工作进程数", min=1, max=256, default=4,
+        description="同时启动的后台 Blender（blender -b）进程数，姿态列表按进程数分片"
+    )
+    dist_threads: IntProperty(
+        name="每进程线程数", min=0, max=1024, default=0,
+        description="传给每个工作进程的 -t 参数；0 = 自动（CPU 核数 / 进程数）"
+    )
+    dist_blender_path: StringProperty(
+        name="Blender 程序", subtype='FILE_PATH', default="",
+        description="工作进程使用的 Blender 可执行文件；留空则使用当前 Blender"
+    )
 
 # =========================
 # UI 列表（简洁，避免撑高）
 # =========================
+_POSE_LIST_CACHE = {}  # 设置指针 → 姿态列表的数据快照、过滤 / 排序结果与行文字
+
+def _pose_list_data(s):
+    # 列表不变（修订号、长度相同）时复用：名称一次取出，位置 / 旋转 foreach_get 批量读取
+    key = (s.poses_rev, len(s.poses))
+    c = _POSE_LIST_CACHE.get(s.as_pointer())
+    if c is None or c["key"] != key:
+        arr = _pose_array(s.poses)
+        c = _POSE_LIST_CACHE[s.as_pointer()] = {
+            "key": key, "arr": arr, "names": s.poses.keys(), "lower": None,
+            "view_key": None, "view": ([], []), "labels": {},
+        }
+    return c
+
+@persistent
+def _on_load_post(*_):
+    # 打开其他文件后旧的设置指针全部失效（还可能被新数据复用），整表清空
+    _POSE_LIST_CACHE.clear()
+
+def _pose_list_label(c, index):
+    # 行文字按需生成并缓存：重绘只格式化新滚进视野的行
+    text = c["labels"].get(index)
+    if text is None:
+        x, y, z, rx, ry, rz = c["arr"][index]
+        rx, ry, rz = np.degrees((rx, ry, rz))
+        text = c["labels"][index] = (f"loc:{x:.2f},{y:.2f},{z:.2f}", f"rot:{rx:.1f}°, {ry:.1f}°, {rz:.1f}°")
+    return text
+
+def _pose_list_view(c, pattern, sort_by, origin, bit):
+    # → (flt_flags, flt_neworder)；名称搜索不区分大小写，支持 * ? 通配；空列表表示全部显示 / 不重排
+    n = len(c["names"])
+    flags = []
+    if pattern:
+        if c["lower"] is None:
+            c["lower"] = [name.lower() for name in c["names"]]
+        pat = pattern.lower()
+        if not any(ch in pat for ch in "*?["):
+            pat = f"*{pat}*"
+        flags = [bit if fnmatch.fnmatchcase(name, pat) else 0 for name in c["lower"]]
+    order = []
+    if sort_by != 'INDEX' and n:
+        arr = c["arr"]
+        if sort_by == 'NAME':
+            keys = np.array(c["lower"] if c["lower"] is not None else [name.lower() for name in c["names"]])
+        elif sort_by == 'HEIGHT':
+            keys = arr[:, 2]
+        else:
+            keys = np.einsum("ij,ij->i", arr[:, :3] - origin, arr[:, :3] - origin)
+        rank = np.empty(n, dtype=np.int64)
+        rank[np.argsort(keys, kind="stable")] = np.arange(n)
+        order = rank.tolist()
+    return flags, order
+
 class HTXR_UL_PoseList(UIList):
     bl_idname = "HTXR_UL_pose_list"
+    sort_by: EnumProperty(
+        name="排序",
+        items=[
+            ('INDEX', "列表顺序", "按姿态在列表中的顺序"),
+            ('NAME', "名称", "按名称（不区分大小写）"),
+            ('DISTANCE', "离相机距离", "按与当前相机的距离，由近到远"),
+            ('HEIGHT', "高度", "按位置 Z，由低到高"),
+        ],
+        default='INDEX'
+    )
+
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
-        pose = item
         row = layout.row(align=True)
-        row.prop(pose, "name", text="", emboss=False, icon='OUTLINER_OB_EMPTY')
-        # 简略信息
-        deg = tuple(math.degrees(a) for a in pose.rot)
+        row.prop(item, "name", text="", emboss=False, icon='OUTLINER_OB_EMPTY')
+        # 简略信息（取自缓存，不逐行读属性、换算角度）
+        loc, rot = _pose_list_label(_pose_list_data(data), index)
         sub = layout.row(align=True); sub.alignment = 'RIGHT'
-        sub.label(text=f"loc:{pose.loc[0]:.2f},{pose.loc[1]:.2f},{pose.loc[2]:.2f}")
+        sub.label(text=loc)
         sub = layout.row(align=True); sub.alignment = 'RIGHT'
-        sub.label(text=f"rot:{deg[0]:.1f}°, {deg[1]:.1f}°, {deg[2]:.1f}°")
+        sub.label(text=rot)
+
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "use_filter_invert", text="", icon='ARROW_LEFTRIGHT')
+        row = layout.row(align=True)
+        row.prop(self, "sort_by", text="")
+        row.prop(self, "use_filter_sort_reverse", text="", icon='SORT_DESC' if self.use_filter_sort_reverse else 'SORT_ASC')
+
+    def filter_items(self, context, data, propname):
+        # 结果按 (列表修订号, 搜索词, 排序方式[, 相机位置]) 缓存：列表不变时重绘不随姿态数增长。
+        # 反选、倒序由 Blender 在返回结果上处理
+        c = _pose_list_data(data)
+        origin = None
+        if self.sort_by == 'DISTANCE':
+            cam = data.camera or context.scene.camera
+            origin = tuple(cam.matrix_world.translation) if cam else (0.0, 0.0, 0.0)
+        view_key = (self.filter_name, self.sort_by, origin)
+        if c["view_key"] != view_key:
+            c["view"] = _pose_list_view(c, self.filter_name, self.sort_by, np.array(origin or (0.0, 0.0, 0.0)),
+                                          self.bitflag_filter_item)
+            c["view_key"] = view_key
+        return c["view"]
+
+class HTXR_UL_RigList(UIList):
+    bl_idname = "HTXR_UL_rig_list"
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "enabled", text="")
+        row.prop(item, "name", text="", emboss=False, icon='OUTLINER_OB_CAMERA')
+        sub = row.row(align=True); sub.alignment = 'RIGHT'
+        sub.label(text=(item.camera.name if item.camera else "主相机") + (f" · {item.lens:.0f}mm" if item.use_lens else ""))
 
 # =========================
 # 列表操作
@@ -120,7 +495,7 @@ class HTXR_OT_PoseRemove(Operator):
         s = context.scene.htxr
         idx = s.pose_index
         if 0 <= idx < len(s.poses):
-            s.poses.remove(idx)
+            s.poses.remove(idx); _poses_changed(s)
             s.pose_index = min(idx, len(s.poses) - 1)
         return {'FINISHED'}
 
@@ -130,15 +505,15 @@ class HTXR_OT_PoseMove(Operator):
     def execute(self, context):
         s = context.scene.htxr; idx = s.pose_index
         if self.direction == 'UP' and idx > 0:
-            s.poses.move(idx, idx - 1); s.pose_index -= 1
+            s.poses.move(idx, idx - 1); s.pose_index -= 1; _poses_changed(s)
         elif self.direction == 'DOWN' and idx < len(s.poses) - 1:
-            s.poses.move(idx, idx + 1); s.pose_index += 1
+            s.poses.move(idx, idx + 1); s.pose_index += 1; _poses_changed(s)
         return {'FINISHED'}
 
 class HTXR_OT_PoseClear(Operator):
     bl_idname = "htxr.pose_clear"; bl_label = "清空姿态"
     def execute(self, context):
-        s = context.scene.htxr; s.poses.clear(); s.pose_index = 0
+        s = context.scene.htxr; s.poses.clear(); s.pose_index = 0; _poses_changed(s)
         return {'FINISHED'}
 
 class HTXR_OT_PoseFromCamera(Operator):
@@ -153,115 +528,2623 @@ class HTXR_OT_PoseFromCamera(Operator):
         pose.rot = cam.rotation_euler.to_matrix().to_euler('XYZ')
         return {'FINISHED'}
 
-class HTXR_OT_PoseQuickEdit(Operator):
-    bl_idname = "htxr.pose_quick_edit"; bl_label = "编辑选中姿态…"
-    name: StringProperty(name="名称")
-    loc: FloatVectorProperty(name="位置", size=3, subtype='TRANSLATION', unit='LENGTH')
-    rot_deg: FloatVectorProperty(name="旋转(度)", size=3, subtype='EULER')
+class HTXR_OT_RigAdd(Operator):
+    bl_idname = "htxr.rig_add"; bl_label = "添加机位"
+    preset: EnumProperty(
+        items=[('SINGLE', "单个机位", ""), ('STEREO', "立体对", "左右两个机位，X 偏移 ∓ 瞳距/2")],
+        default='SINGLE', options={'SKIP_SAVE'}
+    )
+    eye_distance: FloatProperty(name="瞳距", min=0.0, default=0.065, unit='LENGTH')
+    def execute(self, context):
+        s = context.scene.htxr
+        if self.preset == 'STEREO':
+            for name, sign in (("L", -1.0), ("R", 1.0)):
+                r = s.rigs.add(); r.name = name; r.offset = (sign * self.eye_distance / 2, 0.0, 0.0)
+        else:
+            r = s.rigs.add(); r.name = f"rig{len(s.rigs)}"
+            cam = s.camera or context.scene.camera
+            if cam and cam.type == 'CAMERA':
+                r.lens, r.sensor_width = cam.data.lens, cam.data.sensor_width
+                r.shift_x, r.shift_y = cam.data.shift_x, cam.data.shift_y
+        s.rig_index = len(s.rigs) - 1
+        return {'FINISHED'}
+
+class HTXR_OT_RigRemove(Operator):
+    bl_idname = "htxr.rig_remove"; bl_label = "删除机位"
+    def execute(self, context):
+        s = context.scene.htxr
+        if 0 <= s.rig_index < len(s.rigs):
+            s.rigs.remove(s.rig_index)
+            s.rig_index = max(0, min(s.rig_index, len(s.rigs) - 1))
+        return {'FINISHED'}
+
+class HTXR_OT_PoseQuickEdit(Operator):
+    bl_idname = "htxr.pose_quick_edit"; bl_label = "编辑选中姿态…"
+    name: StringProperty(name="名称")
+    loc: FloatVectorProperty(name="位置", size=3, subtype='TRANSLATION', unit='LENGTH')
+    rot_deg: FloatVectorProperty(name="旋转(度)", size=3, subtype='EULER')
+    def invoke(self, context, event):
+        s = context.scene.htxr
+        if not (0 <= s.pose_index < len(s.poses)):
+            self.report({'WARNING'}, "请先选中一条姿态。"); return {'CANCELLED'}
+        p = s.poses[s.pose_index]
+        self.name, self.loc, self.rot_deg = p.name, p.loc[:], tuple(math.degrees(a) for a in p.rot)
+        return context.window_manager.invoke_props_dialog(self, width=420)
+    def draw(self, context):
+        l = self.layout; l.use_property_split = True
+        l.prop(self, "name"); l.prop(self, "loc"); l.prop(self, "rot_deg")
+    def execute(self, context):
+        s = context.scene.htxr; p = s.poses[s.pose_index]
+        p.name = self.name; p.loc = self.loc; p.rot = tuple(math.radians(a) for a in self.rot_deg)
+        return {'FINISHED'}
+
+# =========================
+# 姿态文件：批量导入 / 导出 / 外部姿态源
+# =========================
+# 统一布局：N×6 float32（loc xyz + rot xyz，弧度）+ 可选名称
+#   .csv  每行 name,x,y,z,rx,ry,rz（名称列可省略，首行可为表头）
+#   .json {"names": [...], "poses": [[x, y, z, rx, ry, rz], ...]}，也接受 [{"name", "loc", "rot"}, ...]
+#   .npy  (N, 6) 数组；.npz 含 poses (N, 6) 与可选 names
+_POSE_FILE_EXTS = (".csv", ".json", ".npy", ".npz")
+_POSE_FILE_CACHE = {}
+
+def _check_pose_array(arr):
+    arr = np.asarray(arr, dtype=np.float32)
+    if arr.ndim != 2 or arr.shape[1] != 6:
+        raise ValueError(f"姿态数组应为 N×6，实际为 {arr.shape}")
+    if not np.isfinite(arr).all():
+        raise ValueError("姿态数据含 NaN / Inf")
+    return arr
+
+def _read_pose_file(path):
+    # → (N×6 float32, 名称列表或 None)；内容结构不对（缺键、类型不符等）统一报 ValueError，调用方只需捕获 (OSError, ValueError)
+    try:
+        return _parse_pose_file(path)
+    except (KeyError, TypeError, IndexError, AttributeError) as e:
+        raise ValueError(f"姿态文件结构不正确：{type(e).__name__}: {e}") from e
+
+def _parse_pose_file(path):
+    ext = os.path.splitext(path)[1].lower()
+    names = None
+    if ext == ".npy":
+        arr = np.load(path, allow_pickle=False)
+    elif ext == ".npz":
+        with np.load(path, allow_pickle=False) as z:
+            if "poses" not in z:
+                raise ValueError("npz 中缺少 poses 数组")
+            arr = z["poses"]
+            names = [str(n) for n in z["names"]] if "names" in z else None
+    elif ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            arr, names = data.get("poses", []), data.get("names")
+            names = [str(n) for n in names] if names is not None else None
+        else:
+            arr = [(*e["loc"], *e["rot"]) for e in data]
+            names = [str(e.get("name", "")) for e in data]
+    elif ext == ".csv":
+        rows, names = [], []
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for k, row in enumerate(csv.reader(f)):
+                if not row:
+                    continue
+                try:
+                    rows.append([float(v) for v in row[-6:]])
+                except ValueError:
+                    if k == 0:
+                        continue  # 表头
+                    raise ValueError(f"第 {k + 1} 行无法解析：{row}")
+                names.append(row[0] if len(row) > 6 else "")
+        arr = rows if rows else np.empty((0, 6))
+        names = names if any(names) else None
+    else:
+        raise ValueError(f"不支持的姿态文件格式：{ext}")
+    arr = _check_pose_array(arr)
+    if names is not None and len(names) != len(arr):
+        raise ValueError("名称数量与姿态数量不一致")
+    return arr, names
+
+def _write_pose_file(path, arr, names):
+    ext = os.path.splitext(path)[1].lower()
+    arr = np.asarray(arr, dtype=np.float32)
+    if ext == ".npy":
+        np.save(path, arr)
+    elif ext == ".npz":
+        np.savez_compressed(path, poses=arr, names=np.array(names, dtype=str))
+    elif ext == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"names": names, "poses": arr.tolist()}, f, ensure_ascii=False)
+    elif ext == ".csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(("name", "x", "y", "z", "rx", "ry", "rz"))
+            w.writerows([n, *row] for n, row in zip(names, arr.tolist()))
+    else:
+        raise ValueError(f"不支持的姿态文件格式：{ext}")
+
+def _fill_poses(coll, arr, names, append=False):
+    # add() 只能逐个调用；位置/旋转随后用 foreach_set 整体写入
+    if not append:
+        coll.clear()
+    start, n = len(coll), len(arr)
+    key = coll.id_data.as_pointer(); _POSE_EDIT_MUTED.add(key)  # 逐个 add().name= 会触发名称更新回调
+    try:
+        for k in range(n):
+            coll.add().name = names[k] if names and names[k] else f"Pose {start + k + 1}"
+    finally:
+        _POSE_EDIT_MUTED.discard(key)
+    total = start + n
+    loc = np.empty(total * 3, dtype=np.float32); rot = np.empty(total * 3, dtype=np.float32)
+    coll.foreach_get("loc", loc); coll.foreach_get("rot", rot)
+    loc[start * 3:] = arr[:, :3].ravel(); rot[start * 3:] = arr[:, 3:].ravel()
+    coll.foreach_set("loc", loc); coll.foreach_set("rot", rot)
+    _poses_changed(coll.id_data.htxr)  # foreach_set 不触发属性更新回调
+
+def _pose_file_path(s):
+    return bpy.path.abspath(s.pose_file)
+
+def _load_pose_file(path):
+    # 按 (修改时间, 大小) 缓存：面板重绘与各渲染入口反复调用时不重复解析
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _POSE_FILE_CACHE.get(path)
+    if hit is None or hit[0] != stamp:
+        hit = _POSE_FILE_CACHE[path] = (stamp, *_read_pose_file(path))
+    return hit[1], hit[2]
+
+def _batch_poses(s):
+    # 渲染实际使用的姿态 (N, 6) float64：场景列表，或直接读外部文件（不写入场景）
+    if s.pose_source == 'FILE':
+        return _load_pose_file(_pose_file_path(s))[0].astype(np.float64)
+    if s.pose_source == 'GENERATOR':
+        return _generate_poses(s)
+    return _pose_array(s.poses)
+
+def _pose_count(s):
+    # 面板用：外部文件读不了时返回 0，不抛异常
+    if s.pose_source == 'GENERATOR':
+        return _generator_count(s)
+    if s.pose_source != 'FILE':
+        return len(s.poses)
+    try:
+        return len(_load_pose_file(_pose_file_path(s))[0])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+# =========================
+# 姿态生成器：参数化定义视点集合，NumPy 批量计算，渲染时才求值
+# =========================
+_GOLDEN_ANGLE = math.pi * (3.0 - math.sqrt(5.0))
+
+def _matrix_to_euler(m):
+    # (N, 3, 3) 旋转矩阵 → Blender XYZ 欧拉（R = Rz · Ry · Rx）
+    return np.column_stack((np.arctan2(m[:, 2, 1], m[:, 2, 2]),
+                            np.arcsin(np.clip(-m[:, 2, 0], -1.0, 1.0)),
+                            np.arctan2(m[:, 1, 0], m[:, 0, 0])))
+
+def _look_at_euler(pos, target, roll=0.0):
+    # 相机 -Z 指向 target、+Y 尽量朝世界 +Z；target 可为单点或逐点 (N, 3)
+    f = np.broadcast_to(target, pos.shape) - pos
+    f = f / np.maximum(np.linalg.norm(f, axis=1, keepdims=True), 1e-12)
+    r = np.cross(f, (0.0, 0.0, 1.0))
+    n = np.linalg.norm(r, axis=1, keepdims=True)
+    r = np.where(n > 1e-8, r / np.maximum(n, 1e-12), (1.0, 0.0, 0.0))  # 正上 / 正下方：右向量取世界 X
+    u = np.cross(r, f)
+    if roll:
+        c, sn = math.cos(roll), math.sin(roll)
+        r, u = r * c + u * sn, u * c - r * sn
+    return _matrix_to_euler(np.stack((r, u, -f), axis=2))
+
+def _gen_center(s):
+    return np.array(s.gen_target.matrix_world.translation if s.gen_target else s.gen_center, dtype=np.float64)
+
+def _gen_orbit(s, center):
+    rings = s.gen_rings
+    elev = np.linspace(s.gen_elev_min, s.gen_elev_max, rings) if rings > 1 else np.array([s.gen_elev_min])
+    k = np.arange(s.gen_count)
+    # 相邻环错开半格，俯视时视点不在同一条经线上
+    az = 2.0 * math.pi * (k[None, :] + 0.5 * (np.arange(rings)[:, None] % 2)) / s.gen_count
+    el = np.broadcast_to(elev[:, None], az.shape)
+    d = np.stack((np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)), axis=-1).reshape(-1, 3)
+    return center + s.gen_radius * d
+
+def _gen_hemisphere(s, center):
+    # 球冠上 z 均匀 ⇔ 面积均匀；方位按黄金角递增
+    n = s.gen_count
+    z0, z1 = sorted((math.sin(s.gen_elev_min), math.sin(s.gen_elev_max)))
+    z = z0 + (z1 - z0) * (np.arange(n) + 0.5) / n
+    rho = np.sqrt(np.maximum(1.0 - z * z, 0.0)); az = np.arange(n) * _GOLDEN_ANGLE
+    return center + s.gen_radius * np.column_stack((rho * np.cos(az), rho * np.sin(az), z))
+
+def _gen_grid(s):
+    axes = [np.linspace(a, b, n) for a, b, n in zip(s.gen_grid_min, s.gen_grid_max, s.gen_grid_steps)]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+def _curve_points(obj):
+    # 曲线求值后的折线顶点（世界坐标，按顶点顺序；多条样条首尾相接）
+    dg = bpy.context.evaluated_depsgraph_get()
+    ev = obj.evaluated_get(dg)
+    mesh = ev.to_mesh()
+    try:
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+    finally:
+        ev.to_mesh_clear()
+    co = co.reshape(-1, 3).astype(np.float64)
+    mw = np.array(obj.matrix_world, dtype=np.float64)
+    return co @ mw[:3, :3].T + mw[:3, 3]
+
+def _gen_curve(s):
+    if s.gen_curve is None:
+        raise ValueError("请选择曲线对象")
+    pts = _curve_points(s.gen_curve)
+    if len(pts) < 2:
+        raise ValueError("曲线求值后顶点不足")
+    cum = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(pts, axis=0), axis=1))))
+    u = np.linspace(0.0, cum[-1], s.gen_count) if s.gen_count > 1 else np.zeros(1)
+    return np.column_stack([np.interp(u, cum, pts[:, k]) for k in range(3)])
+
+def _generator_count(s):
+    if s.gen_type == 'ORBIT':
+        return s.gen_rings * s.gen_count
+    if s.gen_type == 'GRID':
+        return int(np.prod(tuple(s.gen_grid_steps)))
+    return s.gen_count
+
+def _generate_poses(s):
+    # → (N, 6) float64；只在渲染 / 烘焙时求值，不产生 HTXR_PoseItem
+    center = _gen_center(s)
+    pos = {'ORBIT': lambda: _gen_orbit(s, center), 'HEMISPHERE': lambda: _gen_hemisphere(s, center),
+           'GRID': lambda: _gen_grid(s), 'CURVE': lambda: _gen_curve(s)}[s.gen_type]()
+    if s.gen_orient == 'FIXED':
+        rot = np.broadcast_to(np.array(s.gen_rotation, dtype=np.float64), pos.shape)
+    elif s.gen_orient == 'TANGENT' and s.gen_type == 'CURVE' and len(pos) > 1:
+        rot = _look_at_euler(pos, pos + np.gradient(pos, axis=0), s.gen_roll)
+    else:
+        rot = _look_at_euler(pos, center, s.gen_roll)
+    # 去掉 ±π 跳变：线性插值做视频时相邻视点之间不会绕远路
+    return np.hstack((pos, np.unwrap(rot, axis=0)))
+
+class HTXR_OT_PoseGenerate(Operator):
+    bl_idname = "htxr.pose_generate"; bl_label = "生成到姿态列表"
+    bl_description = "按生成器参数计算姿态并写入列表（便于逐个微调）；大批量请直接把姿态来源设为『生成器』"
+    append: BoolProperty(name="追加到列表末尾", default=False)
+    def execute(self, context):
+        s = context.scene.htxr
+        try:
+            arr = _generate_poses(s)
+        except ValueError as e:
+            self.report({'ERROR'}, f"生成失败：{e}"); return {'CANCELLED'}
+        _fill_poses(s.poses, arr.astype(np.float32), None, append=self.append)
+        s.pose_index = max(0, min(s.pose_index, len(s.poses) - 1))
+        self.report({'INFO'}, f"已生成 {len(arr)} 个姿态。")
+        return {'FINISHED'}
+
+class HTXR_OT_PoseImport(Operator):
+    bl_idname = "htxr.pose_import"; bl_label = "导入姿态"
+    bl_description = "从 CSV / JSON / NumPy（.npy / .npz）批量导入姿态到列表"
+    filepath: StringProperty(subtype='FILE_PATH')
+    filter_glob: StringProperty(default="*.csv;*.json;*.npy;*.npz", options={'HIDDEN'})
+    append: BoolProperty(name="追加到列表末尾", default=False)
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self); return {'RUNNING_MODAL'}
+    def execute(self, context):
+        s = context.scene.htxr
+        try:
+            arr, names = _read_pose_file(self.filepath)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.report({'ERROR'}, f"导入失败：{e}"); return {'CANCELLED'}
+        t0 = time.perf_counter()
+        _fill_poses(s.poses, arr, names, append=self.append)
+        s.pose_index = max(0, min(s.pose_index, len(s.poses) - 1))
+        self.report({'INFO'}, f"已导入 {len(arr)} 个姿态（{time.perf_counter() - t0:.2f}s）。")
+        return {'FINISHED'}
+
+class HTXR_OT_PoseExport(Operator):
+    bl_idname = "htxr.pose_export"; bl_label = "导出姿态"
+    bl_description = "把姿态列表导出为 CSV / JSON / NumPy（按扩展名选择格式，默认 .npz）"
+    filepath: StringProperty(subtype='FILE_PATH')
+    filter_glob: StringProperty(default="*.csv;*.json;*.npy;*.npz", options={'HIDDEN'})
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = "poses.npz"
+        context.window_manager.fileselect_add(self); return {'RUNNING_MODAL'}
+    def execute(self, context):
+        s = context.scene.htxr
+        path = self.filepath
+        if os.path.splitext(path)[1].lower() not in _POSE_FILE_EXTS:
+            path += ".npz"
+        try:
+            _write_pose_file(path, _pose_array(s.poses), [p.name for p in s.poses])
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"导出失败：{e}"); return {'CANCELLED'}
+        self.report({'INFO'}, f"已导出 {len(s.poses)} 个姿态 → {path}")
+        return {'FINISHED'}
+
+# =========================
+# 渲染公共：输出命名 / 覆盖设置
+# =========================
+def _pose_filepath(out_dir, s, i):
+    # 第 i 个姿态（从 1 开始）的输出路径，不含扩展名（由 Blender 按文件格式追加）
+    return os.path.join(out_dir, f"{s.filename_prefix}{i:0{s.padding}d}")
+
+def _apply_samples(scene, samples):
+    if scene.render.engine == 'CYCLES' and hasattr(scene, "cycles"):
+        scene.cycles.samples = samples
+    else:
+        ev = getattr(scene, "eevee", None)
+        if ev and hasattr(ev, "taa_render_samples"):
+            ev.taa_render_samples = samples
+
+def _apply_render_override(scene, res_x, res_y, samples):
+    scene.render.resolution_x = res_x; scene.render.resolution_y = res_y; scene.render.resolution_percentage = 100
+    _apply_samples(scene, samples)
+
+def _current_samples(scene):
+    if scene.render.engine == 'CYCLES' and hasattr(scene, "cycles"):
+        return scene.cycles.samples
+    ev = getattr(scene, "eevee", None)
+    return getattr(ev, "taa_render_samples", None) if ev else None
+
+def _effective_still(scene, s):
+    # 图片批次实际使用的 ((宽, 高, 百分比), 采样)，考虑『覆盖图片渲染设置』
+    r = scene.render
+    if s.apply_override:
+        return (s.res_x, s.res_y, 100), s.samples
+    return (r.resolution_x, r.resolution_y, r.resolution_percentage), _current_samples(scene)
+
+def _still_output_path(scene, filepath):
+    # write_still 实际写出的文件（Blender 按当前文件格式追加扩展名）
+    r = scene.render
+    return filepath + r.file_extension if r.use_file_extension else filepath
+
+# =========================
+# 多机位：机位快照 / 摆放 / 镜头参数
+# =========================
+_LENS_KEYS = ("lens", "sensor_width", "shift_x", "shift_y")
+
+def _rig_specs(s):
+    # 启用的机位 → 纯数据快照（渲染期间改列表不影响本批；可直接写进工作进程任务）。
+    # 未开启多机位时为 [None]；同一相机对象的机位相邻，切换之间只改镜头参数
+    if not s.use_rigs:
+        return [None]
+    specs = [{
+        "name": bpy.path.clean_name(r.name), "camera": r.camera.name if r.camera else None,
+        "lens": {k: getattr(r, k) for k in _LENS_KEYS} if r.use_lens else {},
+        "offset": tuple(r.offset),
+    } for r in s.rigs if r.enabled]
+    if len({r["name"] for r in specs}) != len(specs):
+        raise ValueError("机位后缀重复，输出文件会互相覆盖")
+    specs.sort(key=lambda r: r["camera"] or "")
+    return specs
+
+def _rig_suffix(rig):
+    return f"_{rig['name']}" if rig else ""
+
+def _job_key(i, rig):
+    # 清单 / 别名 / 工作进程协议里的任务键：无机位时即姿态序号
+    return f"{i}{_rig_suffix(rig)}"
+
+def _rig_camera(main_cam, rig):
+    return bpy.data.objects.get(rig["camera"]) if rig and rig["camera"] else main_cam
+
+def _lens_state(cam):
+    return {k: getattr(cam.data, k) for k in _LENS_KEYS}
+
+def _place_rig(main_cam, rig, loc, rot, lens_base):
+    # 按机位摆放相机并设置镜头，返回本次渲染用的相机。lens_base 记录各相机原始镜头参数
+    # （首次用到时填入），未覆盖镜头的机位恢复原值；为 None 时不碰镜头
+    cam = _rig_camera(main_cam, rig)
+    cam.rotation_mode = 'XYZ'
+    cam.rotation_euler = rot
+    if rig and any(rig["offset"]):
+        cam.location = Vector(loc) + Euler(rot, 'XYZ').to_matrix() @ Vector(rig["offset"])
+    else:
+        cam.location = loc
+    if lens_base is not None:
+        base = lens_base.setdefault(cam.name, _lens_state(cam))
+        for k, v in dict(base, **(rig["lens"] if rig else {})).items():
+            if getattr(cam.data, k) != v:
+                setattr(cam.data, k, v)
+    return cam
+
+# =========================
+# 增量渲染：输出目录内的清单（manifest）
+# =========================
+_MANIFEST_NAME = ".htxr_manifest.json"
+
+_KEY_DEPTH = 4          # ID 内嵌结构（节点 → 接口 → 默认值等）的递归层数
+_KEY_MAX_ITEMS = 256    # 更长的集合只记长度；网格几何另按数组哈希
+# 姿态列表与插件设置、活动相机、输出路径、3D 游标与工具设置等编辑状态
+_KEY_SKIP = {"rna_type", "htxr", "camera", "filepath", "frame_path", "cursor", "tool_settings"}
+_KEY_CAMERA_TRANSFORM = {"location", "rotation_euler", "rotation_quaternion", "rotation_axis_angle", "rotation_mode",
+                         "matrix_world", "matrix_basis", "matrix_local", "matrix_parent_inverse"}
+
+def _rna_hash(h, struct, depth, skip=()):
+    # 逐个 RNA 属性把值送进哈希：只读的标量（用户数、运行时标记等）不影响像素，跳过；
+    # 指向其他 ID 的指针只记名字（被引用的 ID 若参与求值会单独哈希），内嵌 ID（如材质节点树）整体展开
+    for prop in struct.bl_rna.properties:
+        pid = prop.identifier
+        if pid in _KEY_SKIP or pid in skip or pid.startswith("active_") or (prop.is_readonly and prop.type not in {'POINTER', 'COLLECTION'}):
+            continue
+        try:
+            value = getattr(struct, pid)
+        except (AttributeError, RuntimeError, TypeError):
+            continue
+        h.update(pid.encode())
+        if prop.type == 'POINTER':
+            _rna_hash_item(h, value, depth)
+        elif prop.type == 'COLLECTION':
+            h.update(str(len(value)).encode())
+            if len(value) <= _KEY_MAX_ITEMS:
+                for item in value:
+                    _rna_hash_item(h, item, depth)
+        elif getattr(prop, "is_array", False) and prop.type != 'STRING':
+            h.update(np.asarray(value, dtype=np.float64).tobytes())
+        else:
+            h.update(repr(value).encode())
+
+def _rna_hash_item(h, value, depth):
+    if value is None:
+        h.update(b"\0")
+    elif isinstance(value, bpy.types.ID) and not getattr(value, "is_embedded_data", False):
+        h.update(value.name_full.encode())
+    elif depth and hasattr(value, "bl_rna"):
+        _rna_hash(h, value, depth - 1)
+
+def _mesh_hash(h, me):
+    # 网格几何按数组批量哈希，不逐顶点走 RNA
+    for coll, attr, n, dtype in ((me.vertices, "co", 3, np.float32), (me.loops, "vertex_index", 1, np.int32),
+                                 (me.polygons, "loop_total", 1, np.int32)):
+        buf = np.empty(len(coll) * n, dtype=dtype); coll.foreach_get(attr, buf)
+        h.update(buf.tobytes())
+
+def _scene_content_token(scene):
+    # 影响像素的场景输入：渲染层依赖图求值到的全部 ID（场景设置、物体、网格、材质、灯光、世界……）的内容哈希。
+    # 插件设置与姿态列表（Scene.htxr）、相机物体的位置 / 旋转（逐姿态设置）不计入，
+    # 所以编辑、保存姿态只影响被改动的那几张；未保存的场景改动同样能感知
+    vl = next((v for v in scene.view_layers if v.use), scene.view_layers[0])
+    ids = {i.original for i in vl.depsgraph.ids} or {scene, *scene.objects}
+    h = hashlib.sha1()
+    for idb in sorted(ids, key=lambda i: (type(i).__name__, i.name_full)):
+        h.update(f"{type(idb).__name__}:{idb.name_full}".encode())
+        skip = _KEY_CAMERA_TRANSFORM if isinstance(idb, bpy.types.Object) and idb.type == 'CAMERA' else ()
+        _rna_hash(h, idb, _KEY_DEPTH, skip)
+        if isinstance(idb, bpy.types.Mesh):
+            _mesh_hash(h, idb)
+    return h.hexdigest()
+
+def _render_key(scene, cam, s, token):
+    # 与具体姿态无关、但影响输出图像的输入，每批只算一次
+    r = scene.render; cd = cam.data
+    res, samples = _effective_still(scene, s)
+    key = {
+        "engine": r.engine, "res": res, "samples": samples,
+        "format": (r.image_settings.file_format, r.image_settings.color_depth),
+        "lens": (cd.type, cd.lens, cd.sensor_fit, cd.sensor_width, cd.sensor_height,
+                 cd.shift_x, cd.shift_y, cd.clip_start, cd.clip_end, cd.ortho_scale),
+        "dof": (cd.dof.use_dof, cd.dof.focus_distance, cd.dof.aperture_fstop),
+        "scene": token,
+    }
+    return json.dumps(key, sort_keys=True, default=str)
+
+def _pose_digest(render_key, loc, rot):
+    h = hashlib.sha1(render_key.encode("utf-8"))
+    h.update(struct.pack("<6d", *loc, *rot))
+    return h.hexdigest()
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, _MANIFEST_NAME), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("poses", {}) if data.get("version") == 1 else {}
+
+def _save_manifest(out_dir, poses):
+    # 先写临时文件再替换，崩溃时不会留下半截清单
+    path = os.path.join(out_dir, _MANIFEST_NAME); tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "poses": poses}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _is_up_to_date(manifest, index, digest, out_path):
+    e = manifest.get(str(index))
+    return bool(e) and e.get("hash") == digest and e.get("file") == os.path.basename(out_path) \
+        and os.path.isfile(out_path)
+
+def _stale_poses(scene, cam, s, out_dir, manifest, pose_arr, rigs=(None,)):
+    # 返回 (待渲染 [(i, loc, rot, filepath, digest, rig)], 跳过数)；同一姿态的各机位相邻
+    token = _scene_content_token(scene)
+    keys = [(rig, _render_key(scene, _rig_camera(cam, rig), s, token) + (json.dumps(rig, sort_keys=True) if rig else ""))
+            for rig in rigs]
+    jobs, skipped = [], 0
+    for i, row in enumerate(pose_arr.tolist(), start=1):
+        loc, rot = tuple(row[:3]), tuple(row[3:])
+        for rig, key in keys:
+            filepath, digest = _pose_filepath(out_dir, s, i) + _rig_suffix(rig), _pose_digest(key, loc, rot)
+            if s.skip_unchanged and _is_up_to_date(manifest, _job_key(i, rig), digest,
+                                                   _still_output_path(scene, filepath)):
+                skipped += 1; continue
+            jobs.append((i, loc, rot, filepath, digest, rig))
+    return jobs, skipped
+
+# =========================
+# 重复姿态：KD 树聚类 / 别名（代表渲一次，其余复制图片）
+# =========================
+def _duplicate_reps(pose_arr, pos_tol, ang_tol):
+    # 每个姿态的代表（0 起）。按列表顺序贪心聚类：位置在 pos_tol 内、旋转夹角在 ang_tol 内的
+    # 后续姿态归入先出现的代表；KD 树范围查询，只与邻域比较，不做 N² 两两比较
+    n = len(pose_arr)
+    reps = np.arange(n)
+    if n < 2:
+        return reps
+    pos = pose_arr[:, :3].tolist()
+    kd = KDTree(n)
+    for i, co in enumerate(pos):
+        kd.insert(co, i)
+    kd.balance()
+    q = _euler_to_quat(pose_arr[:, 3:])
+    cos_half = math.cos(0.5 * ang_tol)  # 夹角 = 2·acos(|q_i·q_j|)
+    taken = np.zeros(n, dtype=bool)
+    for i, co in enumerate(pos):
+        if taken[i]:
+            continue
+        taken[i] = True
+        nb = np.array([j for _co, j, _d in kd.find_range(co, pos_tol) if j > i], dtype=np.int64)
+        if not len(nb):
+            continue
+        nb = nb[~taken[nb]]
+        nb = nb[np.abs(q[nb] @ q[i]) >= cos_half]
+        reps[nb] = i; taken[nb] = True
+    return reps
+
+def _copy_alias(scene, manifest, src_out, job):
+    # 别名姿态：复制代表的输出图片，并按别名自己的哈希记入清单
+    i, _loc, _rot, filepath, digest, rig = job
+    dst = _still_output_path(scene, filepath)
+    shutil.copyfile(src_out, dst)
+    manifest[_job_key(i, rig)] = {"hash": digest, "file": os.path.basename(dst)}
+
+def _alias_batch(scene, s, out_dir, jobs, pose_arr, manifest):
+    # → (要渲染的 jobs, {代表任务键: [别名 job]}, 立即复制的张数)；多机位时别名复制代表同一机位的图片。
+    # 代表不在本批（已是最新或被预检剔除）时直接复制其现有图片；没有图片则别名照常渲染
+    reps = _duplicate_reps(pose_arr, s.dedup_pos_tol, s.dedup_ang_tol)
+    in_batch = {_job_key(j[0], j[5]) for j in jobs}
+    render, aliases, copied = [], {}, 0
+    for j in jobs:
+        r = int(reps[j[0] - 1]) + 1
+        rk = _job_key(r, j[5])
+        if r == j[0]:
+            render.append(j)
+        elif rk in in_batch:
+            aliases.setdefault(rk, []).append(j)
+        else:
+            src = _still_output_path(scene, _pose_filepath(out_dir, s, r) + _rig_suffix(j[5]))
+            try:
+                _copy_alias(scene, manifest, src, j); copied += 1
+            except OSError:
+                render.append(j)
+    if copied:
+        try:
+            _save_manifest(out_dir, manifest)
+        except OSError as e:
+            print(f"[HTXR] 写入清单失败：{e}")
+    return render, aliases, copied
+
+class HTXR_OT_PoseDedup(Operator):
+    bl_idname = "htxr.pose_dedup"; bl_label = "查找重复姿态…"
+    bl_description = "按位置 / 角度容差聚类近乎相同的姿态，预览后删除重复项或设为别名（渲染时复制代表的图片）"
+    action: EnumProperty(
+        name="处理方式",
+        items=[
+            ('ALIAS', "设为别名", "保留列表，渲染时重复姿态复制代表的图片"),
+            ('REMOVE', "删除重复项", "从姿态列表中删除重复姿态，只保留代表"),
+        ],
+        default='ALIAS', options={'SKIP_SAVE'}
+    )
+    def _clusters(self, s):
+        reps = _duplicate_reps(_batch_poses(s), s.dedup_pos_tol, s.dedup_ang_tol)
+        dup = np.nonzero(reps != np.arange(len(reps)))[0]
+        return reps, dup
+    def invoke(self, context, event):
+        s = context.scene.htxr
+        try:
+            t0 = time.perf_counter()
+            reps, dup = self._clusters(s)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"读取姿态失败：{e}"); return {'CANCELLED'}
+        if not len(dup):
+            self.report({'INFO'}, f"{len(reps)} 个姿态中没有重复（{time.perf_counter() - t0:.2f}s）。"); return {'FINISHED'}
+        self._summary = (len(reps), len(np.unique(reps[dup])), len(dup),
+                         [(int(j) + 1, int(reps[j]) + 1) for j in dup[:6]], time.perf_counter() - t0)
+        return context.window_manager.invoke_props_dialog(self, width=420)
+    def draw(self, context):
+        summary = getattr(self, "_summary", None)
+        col = self.layout.column()
+        if summary:
+            n, groups, ndup, examples, sec = summary
+            col.label(text=f"{n} 个姿态中有 {ndup} 个重复，归入 {groups} 个代表（{sec:.2f}s）", icon='INFO')
+            col.label(text="例：" + "，".join(f"{j}→{r}" for j, r in examples) + (" …" if ndup > len(examples) else ""))
+        col.prop(self, "action", expand=True)
+        if self.action == 'REMOVE' and context.scene.htxr.pose_source != 'SCENE':
+            col.label(text="外部文件 / 生成器来源只能设为别名", icon='ERROR')
+    def execute(self, context):
+        s = context.scene.htxr
+        if self.action == 'ALIAS':
+            s.dedup_alias = True
+            self.report({'INFO'}, "已开启『重复姿态只渲一次』：渲染时重复姿态复制代表的图片。")
+            return {'FINISHED'}
+        if s.pose_source != 'SCENE':
+            self.report({'ERROR'}, "外部文件 / 生成器来源不能删除，请改用别名。"); return {'CANCELLED'}
+        reps, dup = self._clusters(s)
+        keep = reps == np.arange(len(reps))
+        names = [p.name for p in s.poses]
+        # 重建列表：比逐个 remove（每次移动后续元素）更快
+        _fill_poses(s.poses, _pose_array(s.poses)[keep].astype(np.float32),
+                    [n for n, k in zip(names, keep) if k])
+        s.pose_index = max(0, min(s.pose_index, len(s.poses) - 1))
+        self.report({'INFO'}, f"已删除 {len(dup)} 个重复姿态，剩余 {len(s.poses)} 个。")
+        return {'FINISHED'}
+
+# =========================
+# 预览通道：耗时预估 / 联系表
+# =========================
+_PREVIEW_DIRNAME = ".htxr_preview"
+_ESTIMATES_NAME = "estimates.json"
+
+def _render_pixels(scene):
+    r = scene.render
+    return r.resolution_x * r.resolution_y * (r.resolution_percentage / 100.0) ** 2
+
+def _save_estimates(out_dir, entries):
+    path = os.path.join(out_dir, _PREVIEW_DIRNAME, _ESTIMATES_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "poses": entries}, f)
+
+def _load_estimates(out_dir, scene, s, pose_arr):
+    # 预览通道记录 → 全质量单张耗时估计（秒）：采样时间按像素数 × 采样数线性放大；
+    # 姿态已改动的条目作废
+    try:
+        with open(os.path.join(out_dir, _PREVIEW_DIRNAME, _ESTIMATES_NAME), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    (rx, ry, pct), samples = _effective_still(scene, s)
+    px = rx * ry * (pct / 100.0) ** 2
+    est = {}
+    for key, e in data.get("poses", {}).items():
+        i = int(key)
+        if not 1 <= i <= len(pose_arr):
+            continue
+        if np.abs(pose_arr[i - 1] - e["pose"]).max() > 1e-5:
+            continue
+        scale = px / max(e["pixels"], 1.0) * (samples or e["samples"]) / max(e["samples"], 1)
+        est[i] = e["sync"] + e["sample"] * scale
+    return est
+
+def _downscale_area(a, f):
+    # 整数倍面积平均降采样：(H, W, C) → (H//f, W//f, C)
+    if f <= 1:
+        return a
+    h, w = a.shape[0] // f, a.shape[1] // f
+    return a[:h * f, :w * f].reshape(h, f, w, f, -1).mean(axis=(1, 3))
+
+def _read_image_pixels(path, raw=False):
+    # 读回磁盘图像为 (H, W, 4) float32（Blender 像素自下而上）；raw 时按非颜色数据读取，
+    # 16 位 PNG 不做线性化，像素值即文件中的编码值
+    img = bpy.data.images.load(path, check_existing=False)
+    try:
+        if raw:
+            img.colorspace_settings.name = 'Non-Color'
+        w, h = img.size
+        px = np.empty(w * h * 4, dtype=np.float32)
+        img.pixels.foreach_get(px)
+    finally:
+        bpy.data.images.remove(img)
+    return px.reshape(h, w, 4)
+
+def _write_image_pixels(path, px, file_format='PNG'):
+    h, w = px.shape[:2]
+    img = bpy.data.images.new("HTXR_Write", w, h, alpha=True)
+    try:
+        img.pixels.foreach_set(np.ascontiguousarray(px, dtype=np.float32).ravel())
+        img.filepath_raw = path; img.file_format = file_format
+        img.save()
+    finally:
+        bpy.data.images.remove(img)
+
+def _build_contact_sheet(paths, out_path, max_cell=320, max_width=8192, gap=4):
+    # 按姿态顺序逐行排布缩略图（左上为第一个）；缺失的格子留空。联系表是 8 位 sRGB 字节图，缩略图一律取显示编码值：
+    # PNG 等按原始编码读取（16 位不线性化），线性的 EXR / HDR 先做 sRGB 编码，否则整张偏暗
+    n = len(paths)
+    cols = math.ceil(math.sqrt(n)); rows = math.ceil(n / cols)
+    cell_w = max(16, min(max_cell, max_width // cols - gap))
+    sheet = None
+    for k, p in enumerate(paths):
+        if not os.path.isfile(p):
+            continue
+        thumb = _read_image_pixels(p, raw=True)
+        if os.path.splitext(p)[1].lower() in (".exr", ".hdr"):
+            thumb[..., :3] = _linear_to_srgb(thumb[..., :3])
+        thumb = _downscale_area(thumb, max(1, math.ceil(thumb.shape[1] / cell_w)))
+        if sheet is None:
+            th, tw = thumb.shape[:2]
+            sheet = np.full((rows * (th + gap) + gap, cols * (tw + gap) + gap, 4), (0.1, 0.1, 0.1, 1.0), np.float32)
+        r, c = divmod(k, cols)
+        y0 = sheet.shape[0] - (r + 1) * (th + gap)
+        x0 = gap + c * (tw + gap)
+        sheet[y0:y0 + min(th, thumb.shape[0]), x0:x0 + min(tw, thumb.shape[1])] = thumb[:th, :tw]
+    if sheet is None:
+        raise RuntimeError("没有可用的预览图")
+    _write_image_pixels(out_path, sheet)
+    return out_path
+
+# =========================
+# 分块渲染：渲染边框拆块 + 逐行流式 PNG 拼接
+# =========================
+_TILE_DIRNAME = ".htxr_tiles"
+
+def _tile_plan(res, s):
+    # res = (宽, 高, 百分比) → (宽, 高, 列数, 各块边框 [(xmin, xmax, ymin, ymax)])，
+    # 自上而下逐行、行内自左而右。边框取像素边界 +0.25 像素：Blender 截断或四舍五入都落在同一像素
+    w, h = res[0] * res[2] // 100, res[1] * res[2] // 100
+    cols, rows = min(s.tile_cols, w), min(s.tile_rows, h)
+    if s.tile_memory_mb:
+        rows = max(rows, min(h, math.ceil(math.ceil(w / cols) * h * 16 / (s.tile_memory_mb << 20))))
+    frac = lambda px, n: 0.0 if px <= 0 else 1.0 if px >= n else (px + 0.25) / n
+    xs = [round(w * k / cols) for k in range(cols + 1)]
+    ys = [round(h * k / rows) for k in range(rows + 1)]  # 自上而下
+    return w, h, cols, [(frac(xs[c], w), frac(xs[c + 1], w), frac(h - ys[r + 1], h), frac(h - ys[r], h))
+                        for r in range(rows) for c in range(cols)]
+
+def _set_border(render, border):
+    # border 为 None 时关闭边框
+    render.use_border = border is not None
+    if border:
+        render.use_crop_to_border = True
+        render.border_min_x, render.border_max_x, render.border_min_y, render.border_max_y = border
+
+def _tile_filepath(tile_dir, filepath, k):
+    return os.path.join(tile_dir, f"{os.path.basename(filepath)}_tile{k:03d}")
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data)))
+
+class _PngStreamWriter:
+    # 逐行写 PNG：行数据送入 zlib 流，压缩输出随即写成 IDAT 块，整幅图像从不整体驻留内存
+    _COLOR_TYPE = {1: 0, 2: 4, 3: 2, 4: 6}
+
+    def __init__(self, path, width, height, channels, depth):
+        self._width, self._height, self._rows = width, height, 0
+        self._dtype = np.dtype(">u2") if depth == 16 else np.dtype(np.uint8)
+        self._z = zlib.compressobj(6)
+        self._f = open(path, "wb")
+        self._f.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(self._f, b"IHDR", struct.pack(">IIBBBBB", width, height, depth, self._COLOR_TYPE[channels], 0, 0, 0))
+
+    def write_rows(self, rows):
+        # rows：(n, 宽, 通道) 整数数组，自上而下；每行前加滤波类型 0
+        n = rows.shape[0]
+        data = np.zeros((n, 1 + rows[0].size * self._dtype.itemsize), np.uint8)
+        data[:, 1:] = rows.astype(self._dtype).view(np.uint8).reshape(n, -1)
+        out = self._z.compress(data.tobytes())
+        if out:
+            _png_chunk(self._f, b"IDAT", out)
+        self._rows += n
+
+    def close(self):
+        if self._rows != self._height:
+            raise RuntimeError(f"拼接行数 {self._rows} 与图像高度 {self._height} 不符")
+        _png_chunk(self._f, b"IDAT", self._z.flush())
+        _png_chunk(self._f, b"IEND", b"")
+        self._f.close()
+
+    def abort(self):
+        self._f.close()
+
+def _stitch_tiles(paths, cols, out_path, width, height, channels, depth, chunk=256):
+    # paths 按 _tile_plan 顺序。一次只读入一行分块，读一块就量化成整数放进该行缓冲，
+    # 再按 chunk 行送进流式写出器：全分辨率浮点缓冲从不驻留内存
+    maxv = 65535 if depth == 16 else 255
+    dtype = np.uint16 if depth == 16 else np.uint8
+    part = out_path + ".part"
+    writer = _PngStreamWriter(part, width, height, channels, depth)
+    try:
+        for r in range(0, len(paths), cols):
+            band, x = None, 0
+            for p in paths[r:r + cols]:
+                px = _read_image_pixels(p, raw=True)[::-1, :, :channels]  # Blender 自下而上 → PNG 自上而下
+                if band is None:
+                    band = np.empty((px.shape[0], width, channels), dtype)
+                if px.shape[0] != band.shape[0] or x + px.shape[1] > width:
+                    raise RuntimeError(f"分块尺寸不符：{os.path.basename(p)} {px.shape[1]}×{px.shape[0]}")
+                band[:, x:x + px.shape[1]] = np.clip(np.rint(px * maxv), 0, maxv)
+                x += px.shape[1]
+                del px
+            if x != width:
+                raise RuntimeError(f"第 {r // cols + 1} 行分块总宽 {x} 与图像宽度 {width} 不符")
+            for y in range(0, band.shape[0], chunk):
+                writer.write_rows(band[y:y + chunk])
+            del band
+        writer.close()
+    except BaseException:
+        writer.abort()
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    os.replace(part, out_path)
+    for p in paths:
+        os.remove(p)
+    return out_path
+
+def _stitch_format(scene):
+    # 拼接写出的 (通道数, 位深)；非 PNG 输出返回 None
+    st = scene.render.image_settings
+    if st.file_format != 'PNG':
+        return None
+    return {'BW': 1, 'RGB': 3, 'RGBA': 4}[st.color_mode], int(st.color_depth)
+
+# =========================
+# 多尺寸输出：整图只渲一次，其余尺寸由后台线程面积平均降采样
+# =========================
+_SIZES_INDEX = "htxr_sizes.json"
+
+def _parse_sizes(text, res_x, res_y, pct=100):
+    # "1920, 1280, 320" → [(宽, 高, 子目录名)]，从大到小；高度按渲染宽高比，不小于渲染宽度的忽略
+    w0, h0 = res_x * pct // 100, res_y * pct // 100
+    widths = {int(v) for v in text.replace("，", ",").split(",") if v.strip()}
+    return [(w, max(1, round(h0 * w / w0)), f"{w}px") for w in sorted(widths, reverse=True) if 0 < w < w0]
+
+def _size_index_order(key):
+    # 清单键 “12” / “12_left” → 按姿态序号、再按机位后缀排序
+    head, _sep, tail = key.partition("_")
+    return (int(head) if head.isdigit() else 0, tail)
+
+def _resize_axis(a, m, axis):
+    # 沿 axis 把 n 个像素面积平均为 m 个（任意比例）：对前缀和在输出像素边界处线性取值再做差分
+    n = a.shape[axis]
+    if n == m:
+        return a
+    a = np.moveaxis(a, axis, 0)
+    c = np.concatenate((np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0, dtype=np.float64)))
+    x = np.arange(m + 1) * (n / m)
+    k = np.minimum(x.astype(np.int64), n - 1)
+    frac = (x - k).reshape((-1,) + (1,) * (a.ndim - 1))
+    edge = c[k] + frac * a[k]
+    return np.moveaxis(((edge[1:] - edge[:-1]) * (m / n)).astype(np.float32), 0, axis)
+
+def _resize_area(a, w, h):
+    # (H, W, C) → (h, w, C) 面积平均：先用整数倍块平均把尺寸降到目标的 1~2 倍（丢弃不足一块的边缘），
+    # 再按任意比例逐轴平均
+    a = _downscale_area(a, max(1, min(a.shape[1] // w, a.shape[0] // h)))
+    return _resize_axis(_resize_axis(a, h, 0), w, 1)
+
+def _srgb_to_linear(v):
+    v = np.clip(v, 0.0, 1.0)
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+def _linear_to_srgb(v):
+    v = np.clip(v, 0.0, 1.0)
+    return np.where(v <= 0.0031308, v * 12.92, 1.055 * v ** (1 / 2.4) - 0.055).astype(np.float32)
+
+def _derive_sizes(px, targets, channels, depth):
+    # 后台线程：px 为整图 (H, W, 4) float32（自下而上，sRGB 编码值）；targets = [(宽, 高, [输出路径, ...])]，
+    # 同一尺寸的多个路径（别名）写一次再复制。颜色通道先转线性再面积平均、写出前重新编码，
+    # 否则暗部被拉暗、高对比边缘发灰；alpha 本身是线性的，直接平均。只用 NumPy 与 zlib，不碰 bpy
+    maxv = 65535 if depth == 16 else 255
+    px = np.concatenate((_srgb_to_linear(px[..., :3]), px[..., 3:]), axis=2)
+    written = []
+    for w, h, paths in targets:
+        small = _resize_area(px, w, h)
+        small = np.concatenate((_linear_to_srgb(small[..., :3]), small[..., 3:]), axis=2)[::-1, :, :channels]
+        part = paths[0] + ".part"
+        writer = _PngStreamWriter(part, w, h, channels, depth)
+        try:
+            writer.write_rows(np.clip(np.rint(small * maxv), 0, maxv))
+            writer.close()
+        except BaseException:
+            writer.abort(); os.remove(part)
+            raise
+        os.replace(part, paths[0])
+        for p in paths[1:]:
+            shutil.copyfile(paths[0], p)
+        written.append(paths[0])
+    return written
+
+# =========================
+# 渲染前预检：整场景一棵 BVH，逐姿态射线检测
+# =========================
+_PREFLIGHT_NAME = "htxr_preflight.json"
+_PREFLIGHT_REASONS = {"INSIDE": "在几何体内部", "BLOCKED": "近处被遮挡", "BACKGROUND": "只看到背景"}
+_PREFLIGHT_GEOMETRY = {'MESH', 'CURVE', 'FONT', 'SURFACE', 'META'}
+_AXIS_DIRS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+def _scene_bvh(depsgraph):
+    # 求值后的全部几何体（网格 / 曲线 / 文字 / 曲面 / 融球，含集合与几何节点实例）合并为一棵 BVH，整批姿态共用
+    verts, tris, base, cache = [], [], 0, {}
+    for inst in depsgraph.object_instances:
+        ob = inst.object
+        if ob.type not in _PREFLIGHT_GEOMETRY or ob.original.hide_render:
+            continue
+        key = ob.as_pointer()
+        if key not in cache:
+            me = ob.to_mesh()
+            try:
+                if me is None:  # 无法转成网格（如空曲线）
+                    cache[key] = None; continue
+                me.calc_loop_triangles()
+                co = np.empty(len(me.vertices) * 3, dtype=np.float32); me.vertices.foreach_get("co", co)
+                tri = np.empty(len(me.loop_triangles) * 3, dtype=np.int32); me.loop_triangles.foreach_get("vertices", tri)
+            finally:
+                ob.to_mesh_clear()
+            cache[key] = (co.reshape(-1, 3).astype(np.float64), tri.reshape(-1, 3))
+        if cache[key] is None:
+            continue
+        co, tri = cache[key]
+        if not len(tri):
+            continue
+        mw = np.array(inst.matrix_world, dtype=np.float64)
+        verts.append(co @ mw[:3, :3].T + mw[:3, 3]); tris.append(tri + base); base += len(co)
+    if not verts:
+        return None
+    return BVHTree.FromPolygons(np.vstack(verts).tolist(), np.vstack(tris).tolist(), all_triangles=True)
+
+def _frustum_rays(scene, cam, n):
+    # 相机局部坐标下穿过画面的 n×n 射线 (起点, 单位方向)；全景相机返回 None
+    cd = cam.data
+    if cd.type == 'PANO':
+        return None
+    tr, br, bl, tl = (np.array(v, dtype=np.float64) for v in cd.view_frame(scene=scene))
+    t = (np.arange(n) + 0.5) / n
+    top, bottom = tl + np.outer(t, tr - tl), bl + np.outer(t, br - bl)
+    pts = (bottom[None] + (top - bottom)[None] * t[:, None, None]).reshape(-1, 3)
+    if cd.type == 'ORTHO':
+        return pts * (1.0, 1.0, 0.0), np.broadcast_to((0.0, 0.0, -1.0), pts.shape)
+    return np.zeros_like(pts), pts / np.linalg.norm(pts, axis=1, keepdims=True)
+
+def _preflight_pose(bvh, loc, rot, rays, clip, near, block_ratio):
+    # 返回问题原因（_PREFLIGHT_REASONS 的键）或 None
+    origin = Vector(loc)
+    # 六个轴向全部先打到背面：相机被闭合网格包住
+    back = 0
+    for d in _AXIS_DIRS:
+        d = Vector(d)
+        hit, normal, _i, _dist = bvh.ray_cast(origin, d)
+        if hit is not None and normal.dot(d) > 0.0:
+            back += 1
+    if back == len(_AXIS_DIRS):
+        return "INSIDE"
+    if rays is None:
+        return None
+    m = np.array(Euler(rot, 'XYZ').to_matrix(), dtype=np.float64)
+    c0, c1 = clip
+    origins = np.asarray(loc) + rays[0] @ m.T; dirs = rays[1] @ m.T
+    hits = near_hits = 0
+    for o, d in zip(origins.tolist(), dirs.tolist()):
+        d = Vector(d)
+        hit, _n, _i, dist = bvh.ray_cast(Vector(o) + d * c0, d, c1 - c0)  # 与渲染一致：裁剪范围外的不算
+        if hit is None:
+            continue
+        hits += 1
+        if dist < near:
+            near_hits += 1
+    if hits == 0:
+        return "BACKGROUND"
+    if near_hits >= block_ratio * len(dirs):
+        return "BLOCKED"
+    return None
+
+def _run_preflight(context, scene, cam, s, jobs):
+    # jobs 为 [(i, loc, rot, ...)]；返回 ({i: 原因}, 用时秒)。BVH 只建一次；场景里没有可检测的几何体时原因表为 None
+    t0 = time.perf_counter()
+    bvh = _scene_bvh(context.evaluated_depsgraph_get())
+    if bvh is None:
+        return None, time.perf_counter() - t0
+    rays = _frustum_rays(scene, cam, s.preflight_grid)
+    clip = (cam.data.clip_start, cam.data.clip_end)
+    flagged = {}
+    for j in {j[0]: j for j in jobs}.values():  # 多机位时同一姿态只检一次
+        reason = _preflight_pose(bvh, j[1], j[2], rays, clip, s.preflight_near, s.preflight_block_ratio)
+        if reason:
+            flagged[j[0]] = reason
+    return flagged, time.perf_counter() - t0
+
+def _pose_cost(out_dir, scene, s, pose_arr):
+    # 单张全质量耗时：优先预览通道逐姿态预估，其次最近一批图片性能记录的平均值；都没有时为 ({}, None)
+    est = _load_estimates(out_dir, scene, s, pose_arr)
+    try:
+        p = json.loads(s.profile_last) if s.profile_last else None
+    except ValueError:
+        p = None
+    mean = p["mean"] if p and p.get("kind") == "still" else (sum(est.values()) / len(est) if est else None)
+    return est, mean
+
+def _apply_preflight(op, context, scene, cam, s, jobs, out_dir, pose_arr, skip):
+    # 检测 jobs、写出 htxr_preflight.json 并报告；skip 为真时返回剔除问题姿态后的 jobs
+    flagged, elapsed = _run_preflight(context, scene, cam, s, jobs)
+    if flagged is None:
+        # 建不出 BVH 时无从判断，不能把全部姿态都当成“只看到背景”跳过
+        op.report({'WARNING'}, "预检：场景中没有可检测的几何体，已跳过预检，全部姿态照常渲染。" if skip
+                  else "预检：场景中没有可检测的几何体，无法预检。")
+        return jobs
+    try:
+        with open(os.path.join(out_dir, _PREFLIGHT_NAME), "w", encoding="utf-8") as f:
+            json.dump({"checked": len({j[0] for j in jobs}), "flagged": {str(i): r for i, r in flagged.items()}}, f)
+    except OSError as e:
+        print(f"[HTXR] 写入预检结果失败：{e}")
+    msg = f"预检 {len({j[0] for j in jobs})} 个姿态（{elapsed:.2f}s）："
+    if not flagged:
+        op.report({'INFO'}, msg + "未发现问题。"); return jobs
+    counts = {}
+    for r in flagged.values():
+        counts[r] = counts.get(r, 0) + 1
+    msg += "，".join(f"{_PREFLIGHT_REASONS[r]} {n}" for r, n in counts.items())
+    first = sorted(flagged)[:12]
+    msg += f"（姿态 {', '.join(map(str, first))}{' …' if len(flagged) > len(first) else ''}）"
+    if not skip:
+        op.report({'WARNING'}, msg + "。"); return jobs
+    est, mean = _pose_cost(out_dir, scene, s, pose_arr)
+    saved = sum(est.get(j[0], mean or 0.0) for j in jobs if j[0] in flagged) if (est or mean) else None
+    msg += f"，已跳过；预计节省 {saved / 3600.0:.2f} 小时渲染" if saved is not None else "，已跳过"
+    op.report({'WARNING'}, msg + "。")
+    return [j for j in jobs if j[0] not in flagged]
+
+class HTXR_OT_Preflight(Operator):
+    bl_idname = "htxr.preflight"; bl_label = "预检全部姿态"
+    bl_description = "不渲染，只用射线检测列出在几何体内部、近处被遮挡或只看到背景的姿态"
+    def execute(self, context):
+        scene = context.scene; s = scene.htxr
+        cam = s.camera or scene.camera or context.view_layer.objects.active
+        if cam is None or cam.type != 'CAMERA':
+            self.report({'ERROR'}, "请在面板中选择一个摄像机。"); return {'CANCELLED'}
+        try:
+            pose_arr = _batch_poses(s)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"读取姿态失败：{e}"); return {'CANCELLED'}
+        if len(pose_arr) == 0:
+            self.report({'WARNING'}, "姿态列表为空。"); return {'CANCELLED'}
+        out_dir = bpy.path.abspath(s.output_dir).rstrip("\\/"); os.makedirs(out_dir, exist_ok=True)
+        jobs = [(i, tuple(row[:3]), tuple(row[3:])) for i, row in enumerate(pose_arr.tolist(), start=1)]
+        _apply_preflight(self, context, scene, cam, s, jobs, out_dir, pose_arr, skip=False)
+        return {'FINISHED'}
+
+# =========================
+# 性能记录：逐张 / 逐帧耗时与资源
+# =========================
+_PROFILE_NAME = "htxr_profile"
+_PROFILE_FIELDS = ("batch", "kind", "index", "sync_s", "render_s", "post_s", "total_s",
+                   "peak_rss_mb", "render_peak_mb", "samples", "file_bytes", "stats")
+_RE_STATS_PEAK = re.compile(r"Peak(?: Memory)?:\s*([\d.]+)\s*([KMG]?)", re.I)
+_RE_STATS_SAMPLE = re.compile(r"(?:Sample|Rendering)\s+(\d+)\s*/\s*(\d+)", re.I)
+
+def _peak_rss_mb():
+    # 本进程历史峰值常驻内存（MB）；取不到时返回 None
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / (1048576.0 if sys.platform == "darwin" else 1024.0)  # macOS 单位为字节
+    try:
+        import ctypes
+        from ctypes import wintypes
+        class _PMC(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                       [(n, ctypes.c_size_t) for n in (
+                           "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                           "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                           "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        pmc = _PMC(); pmc.cb = ctypes.sizeof(pmc)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(pmc), pmc.cb):
+            return pmc.PeakWorkingSetSize / 1048576.0
+    except (AttributeError, OSError):
+        pass
+    return None
+
+def _parse_render_stats(stats):
+    # 渲染状态文本 → (渲染峰值内存 MB, 实际完成采样数)，缺项为 None
+    peak = samples = None
+    m = _RE_STATS_PEAK.search(stats)
+    if m:
+        peak = float(m.group(1)) * {"K": 1 / 1024.0, "G": 1024.0}.get(m.group(2).upper(), 1.0)
+    m = None
+    for m in _RE_STATS_SAMPLE.finditer(stats):
+        pass
+    if m:
+        samples = int(m.group(1))
+    return peak, samples
+
+class _RenderProfile:
+    # 每条记录立即追加到 <输出目录>/htxr_profile.jsonl（中途崩溃也保留已渲部分）；
+    # 批次结束另写只含本批次的 htxr_profile.csv，并返回面板用的摘要
+    def __init__(self, out_dir, kind, samples):
+        self.batch = time.strftime("%Y%m%d-%H%M%S")
+        self.kind, self.samples, self.rows = kind, samples, []
+        self.base = os.path.join(out_dir, _PROFILE_NAME)
+
+    def record(self, index, timing, stats, out_path=None):
+        sync, render, post = timing
+        render_peak, samples = _parse_render_stats(stats)
+        row = {
+            "batch": self.batch, "kind": self.kind, "index": index,
+            "sync_s": round(sync, 4), "render_s": round(render, 4), "post_s": round(post, 4),
+            "total_s": round(sync + render + post, 4),
+            "peak_rss_mb": _peak_rss_mb(), "render_peak_mb": render_peak,
+            "samples": samples if samples is not None else self.samples,
+            "file_bytes": os.path.getsize(out_path) if out_path and os.path.isfile(out_path) else None,
+            "stats": stats,
+        }
+        self.rows.append(row)
+        try:
+            with open(self.base + ".jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[HTXR] 写入性能记录失败：{e}")
+
+    def close(self):
+        if not self.rows:
+            return None
+        try:
+            with open(self.base + ".csv", "w", encoding="utf-8", newline="") as f:
+                w = csv.DictWriter(f, fieldnames=_PROFILE_FIELDS)
+                w.writeheader(); w.writerows(self.rows)
+        except OSError as e:
+            print(f"[HTXR] 写入性能记录失败：{e}")
+        t = np.array([[r["sync_s"], r["render_s"], r["post_s"], r["total_s"]] for r in self.rows])
+        rss = [r["peak_rss_mb"] for r in self.rows if r["peak_rss_mb"] is not None]
+        return {
+            "batch": self.batch, "kind": self.kind, "count": len(self.rows),
+            "mean": float(t[:, 3].mean()), "p95": float(np.percentile(t[:, 3], 95)),
+            "sync": float(t[:, 0].mean()), "render": float(t[:, 1].mean()), "post": float(t[:, 2].mean()),
+            "peak_rss_mb": max(rss) if rss else None, "report": self.base + ".jsonl",
+        }
+
+# =========================
+# 采样预算：整批总时长 / 噪声阈值 → 逐张的 Cycles 自适应采样与采样时间上限
+# =========================
+_BUDGET_NAME = "htxr_budget.jsonl"
+_BUDGET_MIN_TIME = 1.0  # 每张至少分到的采样秒数：预算吃紧时仍保证每张都出图
+
+def _budget_unsupported(scene):
+    # 采样预算依赖 Cycles 的自适应采样与 time_limit（Blender 3.0+）；不可用时返回原因
+    if scene.render.engine != 'CYCLES' or not hasattr(scene, "cycles"):
+        return "采样预算只支持 Cycles。"
+    if not hasattr(scene.cycles, "time_limit"):
+        return "当前 Blender 的 Cycles 没有采样时间上限（time_limit）。"
+    return None
+
+class _SampleBudget:
+    # 总时长模式：每张开始前，剩余预算先扣除剩余各张的预计非采样开销（同步 + 采样后的降噪 / 写文件，按已渲各张实测，
+    # 不计含完整场景同步的首张），再按权重（预览通道的耗时预估，没有则均分）分给剩余各张。
+    # 自适应采样提前收敛省下的时间自然留给后面的姿态。每张的分配与实际用量追加到 htxr_budget.jsonl
+    def __init__(self, s, out_dir, weights):
+        self.mode, self.threshold = s.budget_mode, s.budget_noise
+        self.budget = s.budget_minutes * 60.0
+        self.deadline = time.perf_counter() + self.budget
+        self.weights = weights
+        self.overheads, self.rows, self.limit = [], [], None
+        self.batch = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(out_dir, _BUDGET_NAME)
+
+    def remaining(self):
+        return self.deadline - time.perf_counter()
+
+    def start(self, scene, k, parts=1):
+        # 第 k 张（批次内顺序）开始前调用；parts 为该张拆成的渲染次数（分块）
+        cy = scene.cycles
+        cy.use_adaptive_sampling = True
+        cy.adaptive_threshold = self.threshold
+        if self.mode != 'TIME':
+            return
+        overhead = self.overheads[1:] or self.overheads
+        overhead = sum(overhead) / len(overhead) if overhead else 0.0
+        pool = self.remaining() - overhead * (len(self.weights) - k)
+        self.limit = max(pool * self.weights[k] / sum(self.weights[k:]), _BUDGET_MIN_TIME)
+        cy.time_limit = self.limit / parts
+
+    def record(self, index, timing, stats):
+        sync, render, post = timing
+        self.overheads.append(sync + post)
+        row = {
+            "batch": self.batch, "index": index, "mode": self.mode, "threshold": self.threshold,
+            "time_limit_s": round(self.limit, 3) if self.limit is not None else None,
+            "sampling_s": round(render, 3), "overhead_s": round(sync + post, 3),
+            "samples": _parse_render_stats(stats)[1], "remaining_s": round(self.remaining(), 3),
+        }
+        self.rows.append(row)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+        except OSError as e:
+            print(f"[HTXR] 写入采样预算记录失败：{e}")
+
+    def summary(self, elapsed):
+        samples = [r["samples"] for r in self.rows if r["samples"] is not None]
+        text = f"采样预算（{'总时长 ' + _fmt_duration(self.budget) if self.mode == 'TIME' else '噪声阈值'}，" \
+               f"阈值 {self.threshold:g}）：实际用时 {_fmt_duration(elapsed)}"
+        if samples:
+            text += f"，每张采样 {min(samples)}~{max(samples)}（平均 {sum(samples) / len(samples):.0f}）"
+        return text + f"，明细 {self.path}"
+
+# =========================
+# 后台任务池：后台移动文件（本地暂存 → 输出目录）、多尺寸降采样
+# =========================
+class _TaskPool:
+    # 有界队列 + 若干后台线程执行 fn(*args)，只做文件与 NumPy 运算、不碰 bpy（如把本地暂存的图片移到
+    # 网络盘，网络盘的慢写入不再卡住下一张渲染）。完成项 (tag, 返回值) 进 done、失败信息进 errors，
+    # 由主线程取走；队列满时调用方应暂缓提交
+    def __init__(self, fn, workers, capacity):
+        self._fn = fn
+        self._q = queue.Queue(maxsize=capacity)
+        self.done, self.errors = deque(), deque()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for th in self._threads:
+            th.start()
+
+    def full(self):
+        return self._q.full()
+
+    def submit(self, tag, label, *args):
+        self._q.put((tag, label, args))
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            try:
+                if item is None:
+                    return
+                tag, label, args = item
+                try:
+                    self.done.append((tag, self._fn(*args)))
+                except Exception as e:  # 任何异常都不能让线程退出：否则队列不再消化，背压与 close() 会一直等待
+                    self.errors.append(f"{label}：{e}")
+            finally:
+                self._q.task_done()
+
+    def close(self):
+        # 等待队列做完并结束线程
+        for _ in self._threads:
+            self._q.put(None)
+        for th in self._threads:
+            th.join()
+
+def _move_file(src, dst):
+    try:
+        os.replace(src, dst)  # 同一文件系统：直接改名
+    except OSError:
+        part = dst + ".part"  # 跨设备：先写临时名再替换，中断时不留半截文件
+        shutil.copyfile(src, part); os.replace(part, dst); os.remove(src)
+    return dst
+
+# =========================
+# 场景状态：批次开始时快照、结束（含取消 / 出错）时原样写回；图片、视频批次与任务入口共用
+# =========================
+_STATE_CYCLES_KEYS = ("samples", "use_denoising", "use_adaptive_sampling", "adaptive_threshold", "time_limit")
+_STATE_IMAGE_KEYS = ("color_mode", "color_depth", "exr_codec", "compression", "quality")  # 切换文件格式时会被改写
+_STATE_RENDER_KEYS = (
+    "filepath", "resolution_x", "resolution_y", "resolution_percentage", "fps", "fps_base",
+    "use_persistent_data", "use_border", "use_crop_to_border",
+    "border_min_x", "border_max_x", "border_min_y", "border_max_y",
+    "use_overwrite", "use_placeholder", "use_file_extension",
+)
+
+class _SceneState:
+    def __init__(self, scene):
+        r = scene.render
+        cy, ev = getattr(scene, "cycles", None), getattr(scene, "eevee", None)
+        self.scene, self.camera = scene, scene.camera
+        self.render = {k: getattr(r, k) for k in _STATE_RENDER_KEYS}
+        self.file_format = r.image_settings.file_format
+        self.image = {k: getattr(r.image_settings, k) for k in _STATE_IMAGE_KEYS if hasattr(r.image_settings, k)}
+        self.ffmpeg = (r.ffmpeg.format, r.ffmpeg.codec) if hasattr(r, "ffmpeg") else None
+        self.cycles = {k: getattr(cy, k) for k in _STATE_CYCLES_KEYS if hasattr(cy, k)} if cy else {}
+        self.eevee_taa = getattr(ev, "taa_render_samples", None) if ev else None
+        self.frame_range = (scene.frame_start, scene.frame_end)
+
+    def restore(self, camera=True):
+        scene = self.scene; r = scene.render
+        r.image_settings.file_format = self.file_format  # 先还原格式：ffmpeg 设置、位深等只在对应格式下有意义
+        for k, v in self.image.items():
+            try:
+                setattr(r.image_settings, k, v)
+            except TypeError:
+                pass  # 原格式下的取值在当前版本不可用
+        for k, v in self.render.items():
+            setattr(r, k, v)
+        if self.ffmpeg:
+            r.ffmpeg.format, r.ffmpeg.codec = self.ffmpeg
+        for k, v in self.cycles.items():
+            setattr(scene.cycles, k, v)
+        if self.eevee_taa is not None:
+            scene.eevee.taa_render_samples = self.eevee_taa
+        scene.frame_start, scene.frame_end = self.frame_range
+        if camera:
+            scene.camera = self.camera
+
+# =========================
+# 模态渲染队列（非阻塞：计时器驱动 + render_complete / render_cancel 回调）
+# =========================
+def _render_op(context, **kw):
+    # 有窗口时异步渲染（INVOKE，回调推进队列）；blender -b 下没有窗口，阻塞渲染，回调照常触发
+    mode = 'INVOKE_DEFAULT' if context.window else 'EXEC_DEFAULT'
+    return 'CANCELLED' not in bpy.ops.render.render(mode, scene=context.scene.name, **kw)
+
+def _cancel_render_job():
+    # 取消正在运行的渲染任务（与渲染窗口里按 Esc 相同）；当前版本没有该操作或无法执行时返回 False
+    try:
+        return 'CANCELLED' not in bpy.ops.render.cancel()
+    except (AttributeError, RuntimeError):
+        return False
+
+def _fmt_duration(sec):
+    sec = int(max(sec, 0))
+    return f"{sec // 3600}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+
+class _ModalRenderMixin:
+    # 子类实现 _start_next(context) -> bool、_restore(context)、_report_done(elapsed)；
+    # 可选 _poll(context)：每个计时周期调用，返回 False 时本周期不启动下一次渲染（背压）。
+    # _total / _done 以 _unit 计（张 / 帧），状态栏据此显示吞吐与剩余时间
+    _timer = None
+    _unit = "张"
+    _label = "渲染"
+    _max_start_failures = 25
+    _single_job = False  # True：整批是一个渲染任务（动画），Esc 需要中断正在运行的任务，而不是等它结束
+
+    def _begin_modal(self, context, total, profile=None):
+        self._total, self._done = total, 0
+        self._busy, self._stop, self._start_failures = False, None, 0
+        self._cancel_pending = False
+        self._t0 = time.perf_counter()
+        self._profile = profile
+        self._t_pre = self._t_sample = self._t_sample_last = self._t_post = self._t_write = None
+        self._stats = self._sample_stats = ""
+        h = bpy.app.handlers
+        h.render_pre.append(self._on_pre)
+        h.render_stats.append(self._on_stats)
+        h.render_post.append(self._on_post)
+        h.render_write.append(self._on_write)
+        h.render_complete.append(self._on_complete)
+        h.render_cancel.append(self._on_cancel)
+        if context.window is None:
+            return self._run_blocking(context)
+        wm = context.window_manager
+        wm.progress_begin(0, total)
+        self._timer = wm.event_timer_add(0.2, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    # ---- 渲染回调：pre / stats / post / write 可能在渲染线程触发，这里只改 Python 状态 ----
+    # 分段计时：render_pre →（状态文本首次出现 “sample”：场景同步结束）→（最后一次出现：采样结束）→ render_post。
+    # Blender 在图片存盘之后才触发 render_post（render_write 紧随其后），两者之差量不到写文件，
+    # 所以写文件耗时并入“采样后”一段：降噪、合成与写文件
+    def _on_pre(self, *args):
+        self._t_pre, self._t_post, self._t_write = time.perf_counter(), None, None
+        self._t_sample = self._t_sample_last = None
+        self._stats = self._sample_stats = ""
+
+    def _on_stats(self, stats, *args):
+        self._stats = str(stats)
+        if "sample" in self._stats.lower():
+            self._sample_stats = self._stats  # 最后一条带采样进度的状态：结束时的 “Finished” 不含采样数
+            if self._t_pre is not None:
+                self._t_sample_last = time.perf_counter()
+                if self._t_sample is None:
+                    self._t_sample = self._t_sample_last
+
+    def _on_post(self, *args):
+        self._t_post = time.perf_counter()
+
+    def _on_write(self, *args):
+        self._t_write = time.perf_counter()
+
+    def _take_timing(self):
+        # 取出本次渲染的 (同步, 采样, 采样后：降噪 / 合成 / 写文件) 秒数并清空；没收到 render_pre 时返回 None
+        if self._t_pre is None:
+            return None
+        t_post = self._t_post or self._t_write or time.perf_counter()
+        t_sample = min(self._t_sample or t_post, t_post)
+        t_last = min(max(self._t_sample_last or t_sample, t_sample), t_post)
+        timing = (t_sample - self._t_pre, t_last - t_sample, t_post - t_last)
+        self._t_pre = None
+        return timing
+
+    def _on_complete(self, *args):
+        self._busy = False
+
+    def _on_cancel(self, *args):
+        self._busy = False; self._stop = 'CANCEL'
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._stop = 'CANCEL'  # 当前这一次渲染结束后停止
+            if self._busy and self._single_job:
+                self._cancel_pending = True
+                _cancel_render_job()
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        self._update_status(context)
+        if self._cancel_pending and self._busy:
+            _cancel_render_job()  # 上次没能取消（任务还没进入可取消状态），每个计时周期重试
+        if not self._poll(context) or self._busy:
+            return {'PASS_THROUGH'}
+        if self._stop or self._done >= self._total:
+            return self._finish(context)
+
+        self._busy = True
+        if self._start_next(context):
+            self._start_failures = 0
+        else:
+            # 上一个渲染任务可能尚未完全退出，下个计时周期重试
+            self._busy = False; self._start_failures += 1
+            if self._start_failures > self._max_start_failures:
+                self._stop = 'ERROR'
+        return {'PASS_THROUGH'}
+
+    def _run_blocking(self, context):
+        # 无窗口（blender -b）：没有计时器与模态事件，逐个阻塞渲染；每次渲染返回时回调已把进度推进。
+        # 渲染报错也要走完 _finish（摘除回调、还原场景）
+        try:
+            while not self._stop and self._done < self._total:
+                if not self._poll(context):
+                    time.sleep(0.05); continue
+                self._busy = True
+                if not self._start_next(context) or self._busy:
+                    self._busy = False; self._stop = 'ERROR'
+        except RuntimeError as e:
+            self.report({'ERROR'}, f"渲染出错：{e}"); self._stop = 'ERROR'
+        return self._finish(context)
+
+    def _update_status(self, context):
+        context.window_manager.progress_update(self._done)
+        if not context.workspace:
+            return
+        text = f"HTXR {self._label} {self._done}/{self._total}"
+        elapsed = time.perf_counter() - self._t0
+        if self._done:
+            rate = self._done / elapsed * 60.0
+            text += f" · {rate:.1f} {self._unit}/分钟 · 剩余约 {_fmt_duration(self._eta(elapsed))}"
+        context.workspace.status_text_set(text + "    Esc 取消")
+
+    def _eta(self, elapsed):
+        return (self._total - self._done) * elapsed / self._done
+
+    def _poll(self, context):
+        return True
+
+    def _close_profile(self):
+        # 取消时也写出已有记录；摘要存进场景供面板显示
+        summary = self._profile.close() if self._profile else None
+        if summary:
+            self._scene.htxr.profile_last = json.dumps(summary)
+            self.report({'INFO'}, f"性能记录：{summary['count']} 条，平均 {summary['mean']:.2f}s，"
+                                  f"p95 {summary['p95']:.2f}s → {summary['report']}")
+
+    def _finish(self, context):
+        h = bpy.app.handlers
+        for handlers, fn in ((h.render_pre, self._on_pre),
+                             (h.render_stats, self._on_stats),
+                             (h.render_post, self._on_post),
+                             (h.render_write, self._on_write),
+                             (h.render_complete, self._on_complete),
+                             (h.render_cancel, self._on_cancel)):
+            if fn in handlers:
+                handlers.remove(fn)
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer); self._timer = None
+        wm.progress_end()
+        if context.workspace:
+            context.workspace.status_text_set(None)
+        self._restore(context)
+        self._close_profile()
+
+        elapsed = time.perf_counter() - self._t0
+        if self._stop == 'ERROR':
+            self.report({'ERROR'}, f"无法启动渲染，已停止：完成 {self._done}/{self._total} {self._unit}，场景设置已还原。")
+            return {'CANCELLED'}
+        if self._stop == 'CANCEL':
+            self.report({'WARNING'}, f"已取消：完成 {self._done}/{self._total} {self._unit}，场景设置已还原。")
+            return {'CANCELLED'}
+        self._report_done(elapsed)
+        return {'FINISHED'}
+
+# =========================
+# 渲染：图片（模态队列，每个计时周期渲染一个姿态）
+# =========================
+class _StillBatch(_ModalRenderMixin):
+    # 图片批次本体，不依赖面板：面板操作与任务入口（run_job）共用；pass_mode 由子类提供
+    _unit = "张"; _label = "图片渲染"
+
+    def execute(self, context):
+        scene = context.scene; s = scene.htxr
+        cam = s.camera or scene.camera or context.view_layer.objects.active
+        if cam is None or cam.type != 'CAMERA':
+            self.report({'ERROR'}, "请在面板中选择一个摄像机。"); return {'CANCELLED'}
+        try:
+            pose_arr, rigs = _batch_poses(s), _rig_specs(s)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"无法开始渲染：{e}"); return {'CANCELLED'}
+        if len(pose_arr) == 0:
+            self.report({'WARNING'}, "姿态列表为空。"); return {'CANCELLED'}
+        if not rigs:
+            self.report({'ERROR'}, "多机位批次没有启用的机位。"); return {'CANCELLED'}
+        if s.tile_render and self.pass_mode != 'PREVIEW' and _stitch_format(scene) is None:
+            self.report({'ERROR'}, "分块渲染只支持 PNG 输出格式。"); return {'CANCELLED'}
+        if s.budget_mode != 'OFF' and self.pass_mode != 'PREVIEW' and _budget_unsupported(scene):
+            self.report({'ERROR'}, _budget_unsupported(scene)); return {'CANCELLED'}
+        if s.multi_size and self.pass_mode != 'PREVIEW':
+            if _stitch_format(scene) is None:
+                self.report({'ERROR'}, "多尺寸输出只支持 PNG 输出格式。"); return {'CANCELLED'}
+            try:
+                sizes = _parse_sizes(s.multi_sizes, *_effective_still(scene, s)[0])
+            except ValueError:
+                self.report({'ERROR'}, f"无法解析多尺寸宽度：{s.multi_sizes}"); return {'CANCELLED'}
+            if not sizes:
+                self.report({'ERROR'}, "多尺寸输出没有小于渲染宽度的尺寸。"); return {'CANCELLED'}
+
+        out_dir = bpy.path.abspath(s.output_dir).rstrip("\\/"); os.makedirs(out_dir, exist_ok=True)
+        self._preview = self.pass_mode == 'PREVIEW'
+        self._pose_arr = pose_arr
+        self._out_dir, self._job_est = out_dir, None
+        # 开始时固定姿态快照：渲染期间编辑列表不影响本次队列
+        if self._preview:
+            self._preview_dir = os.path.join(out_dir, _PREVIEW_DIRNAME); os.makedirs(self._preview_dir, exist_ok=True)
+            self._jobs = [
+                (i, tuple(row[:3]), tuple(row[3:]), _pose_filepath(self._preview_dir, s, i), None, None)
+                for i, row in enumerate(pose_arr.tolist(), start=1)
+            ]
+            self._skipped = 0
+            if s.preflight != 'OFF':
+                self._jobs = _apply_preflight(self, context, scene, cam, s, self._jobs, out_dir, pose_arr,
+                                              s.preflight == 'SKIP')
+                if not self._jobs:
+                    return {'FINISHED'}
+        else:
+            self._manifest = _load_manifest(out_dir)
+            self._jobs, self._skipped = _stale_poses(scene, cam, s, out_dir, self._manifest, pose_arr, rigs)
+            if s.preflight != 'OFF' and self._jobs:
+                self._jobs = _apply_preflight(self, context, scene, cam, s, self._jobs, out_dir, pose_arr,
+                                              s.preflight == 'SKIP')
+            self._aliases, self._alias_copied = {}, 0
+            if s.dedup_alias and self._jobs:
+                self._jobs, self._aliases, self._alias_copied = _alias_batch(
+                    scene, s, out_dir, self._jobs, pose_arr, self._manifest)
+            if not self._jobs:
+                copied = f"，复制别名 {self._alias_copied} 张" if self._alias_copied else ""
+                self.report({'INFO'}, f"没有需要渲染的姿态（未变化 {self._skipped} 个{copied}）。"); return {'FINISHED'}
+            if self.pass_mode == 'ORDERED':
+                est = _load_estimates(out_dir, scene, s, pose_arr)
+                if not est:
+                    self.report({'ERROR'}, "没有可用的耗时预估：请先运行预览通道。"); return {'CANCELLED'}
+                # 最长的先渲：尾部剩下的都是短任务，剩余时间估计更稳
+                fallback = sum(est.values()) / len(est)
+                self._jobs.sort(key=lambda j: est.get(j[0], fallback), reverse=True)
+                self._job_est = [est.get(j[0], fallback) for j in self._jobs]
+
+        # 备份
+        self._state = _SceneState(scene)
+        self._scene, self._cam = scene, cam
+        self._timings = []
+        # 多机位：记录用到的各相机原始镜头参数与（主相机以外的）变换，结束时还原
+        self._lens_base = {} if rigs[0] is not None and not self._preview else None
+        self._rig_cams = {c.name: (tuple(c.location), tuple(c.rotation_euler), c.rotation_mode)
+                          for c in {_rig_camera(cam, r) for r in rigs if r} if c != cam} \
+            if self._lens_base is not None else {}
+
+        scene.camera = cam
+        if s.apply_override:
+            _apply_render_override(scene, s.res_x, s.res_y, s.samples)
+        if self._preview:
+            r = scene.render
+            r.resolution_percentage = max(1, round(r.resolution_percentage * s.preview_scale / 100))
+            _apply_samples(scene, s.preview_samples)
+            if hasattr(scene, "cycles"):
+                scene.cycles.use_denoising = s.preview_denoise
+            r.image_settings.file_format = 'PNG'  # 联系表需要读回预览图
+            self._preview_px, self._preview_files = _render_pixels(scene), {}
+        self._post, self._sizer = deque(), None
+        if s.multi_size and not self._preview:
+            self._sizes, self._size_fmt, self._size_index = sizes, _stitch_format(scene), {}
+            for _w, _h, sub in sizes:
+                os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+            self._sizer = _TaskPool(_derive_sizes, s.multi_size_workers, s.multi_size_workers)
+        self._budget = None
+        if s.budget_mode != 'OFF' and not self._preview:
+            weights = self._job_est
+            if not weights:
+                est = _load_estimates(out_dir, scene, s, pose_arr)
+                fallback = sum(est.values()) / len(est) if est else 1.0
+                weights = [est.get(j[0], fallback) for j in self._jobs]
+            self._budget = _SampleBudget(s, out_dir, weights)
+        cam.rotation_mode = 'XYZ'
+        self._static = s.static_scene
+        if self._static:
+            if scene.render.engine != 'CYCLES':
+                self.report({'WARNING'}, "持久数据只对 Cycles 生效，当前引擎仍会逐张同步场景。")
+            scene.render.use_persistent_data = True
+            # 只允许相机对象 / 相机数据变化；场景本身（输出路径等）与渲染结果图像不计
+            self._static_ok = {cam.as_pointer(), cam.data.as_pointer()}
+            for c in (bpy.data.objects.get(n) for n in self._rig_cams):
+                self._static_ok |= {c.as_pointer(), c.data.as_pointer()}
+            self._foreign = set()
+            bpy.app.handlers.depsgraph_update_post.append(self._on_depsgraph)
+        self._writer = None
+        if s.async_write and not self._preview:
+            self._staging = bpy.path.abspath(s.staging_dir).rstrip("\\/") if s.staging_dir \
+                else os.path.join(tempfile.gettempdir(), "htxr_staging")
+            os.makedirs(self._staging, exist_ok=True)
+            self._writer = _TaskPool(_move_file, s.async_workers, s.async_queue)
+        self._tiles = None
+        if s.tile_render and not self._preview:
+            r = scene.render
+            w, h, self._tile_cols, self._tiles = _tile_plan(
+                (r.resolution_x, r.resolution_y, r.resolution_percentage), s)
+            self._tile_size, self._tile_fmt = (w, h), _stitch_format(scene)
+            self._tile, self._tile_timing = 0, None
+            self._tile_dir = os.path.join(self._staging if self._writer else out_dir, _TILE_DIRNAME)
+            os.makedirs(self._tile_dir, exist_ok=True)
+        profile = _RenderProfile(out_dir, "still", _current_samples(scene)) \
+            if s.profile_report and not self._preview else None
+        return self._begin_modal(context, len(self._jobs), profile)
+
+    def _start_next(self, context):
+        i, loc, rot, filepath, _digest, rig = self._jobs[self._done]
+        scene = self._scene
+        scene.camera = _place_rig(self._cam, rig, loc, rot, self._lens_base)
+        if self._budget and not (self._tiles and self._tile):
+            self._budget.start(scene, self._done, len(self._tiles) if self._tiles else 1)
+        tile = ""
+        if self._tiles:
+            _set_border(scene.render, self._tiles[self._tile])
+            scene.render.filepath = _tile_filepath(self._tile_dir, filepath, self._tile)
+            tile = f" 块 {self._tile + 1}/{len(self._tiles)}"
+        else:
+            scene.render.filepath = self._render_target(filepath)
+        self.report({'INFO'}, f"渲染 {_job_key(i, rig)}{tile}（{self._done + 1}/{self._total}）→ {filepath}")
+        return _render_op(context, write_still=True)
+
+    def _eta(self, elapsed):
+        if self._budget and self._budget.mode == 'TIME':
+            return max(self._budget.remaining(), 0.0)
+        if not self._job_est:
+            return super()._eta(elapsed)
+        # 有预估时按“已完成预估量 / 实际耗时”校正剩余预估量
+        done_est = sum(self._job_est[:self._done])
+        return sum(self._job_est[self._done:]) * elapsed / done_est if done_est > 0 else 0.0
+
+    def _on_depsgraph(self, scene, depsgraph=None):
+        if depsgraph is None:
+            return
+        for u in depsgraph.updates:
+            idb = getattr(u.id, "original", None) or u.id
+            if idb.as_pointer() in self._static_ok or isinstance(idb, (bpy.types.Scene, bpy.types.Image)):
+                continue
+            self._foreign.add(f"{type(idb).__name__} “{idb.name}”")
+
+    def _render_target(self, filepath):
+        # 后台移动文件时 Blender 写到本地暂存目录，完成后由后台线程移到 filepath
+        return os.path.join(self._staging, os.path.basename(filepath)) if self._writer else filepath
+
+    def _on_complete(self, *args):
+        # 回调里只记状态；拼接、读写图像等 bpy 操作放到主线程的 _poll / _restore（_process_post）
+        job = self._jobs[self._done]
+        timing = self._take_timing()
+        if self._tiles:
+            # 各块计时累加为整张；最后一块渲完才算完成一张
+            if timing:
+                self._tile_timing = [a + b for a, b in zip(self._tile_timing or (0.0,) * 3, timing)]
+            self._tile += 1
+            if self._tile < len(self._tiles):
+                self._busy = False; return
+            self._tile, timing, self._tile_timing = 0, self._tile_timing, None
+        self._busy = False; self._done += 1
+        self._post.append((job, timing and list(timing), self._stats, self._sample_stats))
+
+    def _process_post(self):
+        recorded = False
+        while self._post:
+            job, timing, stats, sample_stats = self._post.popleft()
+            i, _loc, _rot, filepath, _digest, rig = job
+            out = _still_output_path(self._scene, filepath)
+            written = _still_output_path(self._scene, self._render_target(filepath))
+            if self._tiles:
+                t0 = time.perf_counter()
+                tiles = [_still_output_path(self._scene, _tile_filepath(self._tile_dir, filepath, k))
+                         for k in range(len(self._tiles))]
+                try:
+                    _stitch_tiles(tiles, self._tile_cols, written, *self._tile_size, *self._tile_fmt)
+                except (OSError, RuntimeError) as e:
+                    self.report({'ERROR'}, f"{_job_key(i, rig)} 分块拼接失败：{e}")
+                if timing:
+                    timing[2] += time.perf_counter() - t0
+            if timing:
+                sync, render, write = timing
+                self._timings.append((i, sync, render + write))
+                if self._profile:
+                    self._profile.record(i if rig is None else _job_key(i, rig), timing, stats, written)
+                if self._budget:
+                    self._budget.record(_job_key(i, rig), timing, sample_stats)
+            if self._preview:
+                self._preview_files[i] = out; continue
+            if not os.path.isfile(written):
+                continue
+            if self._writer:
+                if self._sizer:
+                    self._submit_sizes(written, self._size_names(job))  # 趁图片还在本地暂存目录读回
+                self._writer.submit(job, os.path.basename(out), written, out); continue
+            self._record_output(job, out); recorded = True
+        if recorded:
+            self._save_manifest()
+
+    def _record_output(self, job, out):
+        i, _loc, _rot, _fp, digest, rig = job
+        key = _job_key(i, rig)
+        self._manifest[key] = {"hash": digest, "file": os.path.basename(out)}
+        aliases = self._aliases.get(key, ())
+        for alias in aliases:
+            try:
+                _copy_alias(self._scene, self._manifest, out, alias); self._alias_copied += 1
+            except OSError as e:
+                print(f"[HTXR] 复制别名图片失败：{e}")
+        if self._sizer and not self._writer:
+            self._submit_sizes(out, self._size_names(job))
+
+    def _size_names(self, job):
+        # [(清单键, 文件名)]：代表在前，别名共用同一次降采样
+        key = _job_key(job[0], job[5])
+        return [(key, os.path.basename(_still_output_path(self._scene, job[3])))] + [
+            (_job_key(a[0], a[5]), os.path.basename(_still_output_path(self._scene, a[3]))) for a in self._aliases.get(key, ())]
+
+    def _save_manifest(self):
+        try:
+            _save_manifest(self._out_dir, self._manifest)
+        except OSError as e:
+            print(f"[HTXR] 写入清单失败：{e}")
+
+    def _drain_writer(self):
+        w, recorded = self._writer, False
+        while w.done:
+            job, out = w.done.popleft()
+            self._record_output(job, out); recorded = True
+        if recorded:
+            self._save_manifest()
+
+    def _submit_sizes(self, out, names):
+        # 主线程读回整图像素（后台移动文件时读本地暂存文件，不碰输出目录），交给降采样线程
+        try:
+            px = _read_image_pixels(out, raw=True)
+        except RuntimeError as e:
+            self._sizer.errors.append(f"{os.path.basename(out)}：{e}"); return
+        targets = [(w, h, [os.path.join(self._out_dir, sub, name) for _key, name in names]) for w, h, sub in self._sizes]
+        self._sizer.submit(names, names[0][1], px, targets, *self._size_fmt)
+
+    def _drain_sizes(self):
+        while self._sizer.done:
+            names, _paths = self._sizer.done.popleft()
+            for key, name in names:
+                entry = self._size_index.setdefault(key, {})
+                entry["full"] = name
+                entry.update({sub: f"{sub}/{name}" for _w, _h, sub in self._sizes})
+
+    def _poll(self, context):
+        # 主线程：先处理已完成的渲染，再看写出 / 降采样队列，满时暂缓下一张（背压）
+        self._process_post()
+        if self._writer:
+            self._drain_writer()
+        if self._sizer:
+            self._drain_sizes()
+        return not (self._writer and self._writer.full()) and not (self._sizer and self._sizer.full())
+
+    def _restore(self, context):
+        s = self._scene.htxr
+        self._process_post()
+        if self._writer:
+            # 批次结束（含取消）：等待排队的图片全部写出，再记清单、报告失败项
+            self._writer.close(); self._drain_writer()
+            errors = list(self._writer.errors)
+            if errors:
+                for e in errors:
+                    print(f"[HTXR] 写出失败：{e}")
+                self.report({'ERROR'}, f"{len(errors)} 张图片写出失败（暂存文件保留在 {self._staging}）："
+                                       + "；".join(errors[:3]))
+            self._writer = None
+        if self._sizer:
+            self._finish_sizes()
+        if self._tiles:
+            shutil.rmtree(self._tile_dir, ignore_errors=True)
+        self._state.restore(camera=s.restore_scene_camera)
+        for name, st in (self._lens_base or {}).items():
+            c = bpy.data.objects.get(name)
+            if c:
+                for k, v in st.items():
+                    setattr(c.data, k, v)
+        for name, (loc, rot, mode) in self._rig_cams.items():
+            c = bpy.data.objects.get(name)
+            if c:
+                c.location, c.rotation_euler, c.rotation_mode = loc, rot, mode
+        if self._static:
+            if self._on_depsgraph in bpy.app.handlers.depsgraph_update_post:
+                bpy.app.handlers.depsgraph_update_post.remove(self._on_depsgraph)
+            if self._foreign:
+                self.report({'WARNING'}, "静态场景模式期间有相机以外的数据变化，持久数据可能已失效："
+                                         + "、".join(sorted(self._foreign)[:8]))
+
+    def _finish_sizes(self):
+        # 等降采样做完；合并写出尺寸索引（htxr_sizes.json），用最小尺寸生成联系表
+        self._sizer.close(); self._drain_sizes()
+        errors = list(self._sizer.errors)
+        if errors:
+            for e in errors:
+                print(f"[HTXR] 多尺寸输出失败：{e}")
+            self.report({'ERROR'}, f"{len(errors)} 张图片多尺寸输出失败：" + "；".join(errors[:3]))
+        self._sizer = None
+        if not self._size_index:
+            return
+        path = os.path.join(self._out_dir, _SIZES_INDEX)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        poses = data.get("poses", {}); poses.update(self._size_index)
+        data = {"version": 1, "sizes": [sub for _w, _h, sub in self._sizes], "poses": poses}
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+        except OSError as e:
+            self.report({'ERROR'}, f"写入尺寸索引失败：{e}"); return
+        if not self._scene.htxr.multi_size_sheet:
+            return
+        smallest = self._sizes[-1][2]
+        keys = sorted((k for k, v in poses.items() if smallest in v), key=_size_index_order)
+        sheet = os.path.join(self._out_dir, "contact_sheet.png")
+        try:
+            _build_contact_sheet([os.path.join(self._out_dir, poses[k][smallest]) for k in keys], sheet)
+        except (OSError, RuntimeError) as e:
+            self.report({'ERROR'}, f"联系表生成失败：{e}"); return
+        self.report({'INFO'}, f"多尺寸输出：{'、'.join(sub for _w, _h, sub in self._sizes)}；索引 {path}，联系表 {sheet}")
+
+    def _report_done(self, elapsed):
+        if self._preview:
+            self._finish_preview(elapsed); return
+        skipped = f"，跳过未变化 {self._skipped} 张" if self._skipped else ""
+        skipped += f"，复制别名 {self._alias_copied} 张" if self._alias_copied else ""
+        self.report({'INFO'}, f"图片批量渲染完成：{self._total} 张{skipped}，用时 {_fmt_duration(elapsed)}。")
+        if self._timings:
+            # 首张（冷启动，含完整场景同步）对比第 2 张起的稳态平均；这不是关闭持久数据的对照，
+            # 要量化持久数据的收益需开 / 关静态场景各跑一批比较稳态值
+            _i, sync0, samp0 = self._timings[0]
+            msg = f"同步/采样：首张（冷启动）{sync0:.2f}s / {samp0:.2f}s"
+            rest = self._timings[1:]
+            if rest:
+                msg += (f"，稳态（第 2 张起平均）{sum(t[1] for t in rest) / len(rest):.2f}s"
+                        f" / {sum(t[2] for t in rest) / len(rest):.2f}s")
+            self.report({'INFO'}, msg + ("（静态场景模式）" if self._static else ""))
+        if self._budget:
+            self.report({'INFO'}, self._budget.summary(elapsed))
+
+    def _finish_preview(self, elapsed):
+        s = self._scene.htxr
+        poses = {i: (*loc, *rot) for i, loc, rot, _fp, _d, _r in self._jobs}
+        entries = {
+            str(i): {"pose": poses[i], "sync": sync, "sample": sample,
+                     "pixels": self._preview_px, "samples": s.preview_samples}
+            for i, sync, sample in self._timings
+        }
+        sheet = os.path.join(self._out_dir, "preview_contact_sheet.png")
+        try:
+            _save_estimates(self._out_dir, entries)
+            _build_contact_sheet([self._preview_files.get(j[0], "") for j in self._jobs], sheet)
+        except (OSError, RuntimeError) as e:
+            self.report({'ERROR'}, f"预览通道结果写出失败：{e}"); return
+        est = _load_estimates(self._out_dir, self._scene, s, self._pose_arr)
+        total = _fmt_duration(sum(est.values())) if est else "未知"
+        self.report({'INFO'}, f"预览通道完成（{_fmt_duration(elapsed)}）：联系表 {sheet}；"
+                              f"全质量单进程预估 {total}。确认无误后点『全质量（按预估耗时）』。")
+
+class HTXR_OT_RenderSequence(_StillBatch, Operator):
+    bl_idname = "htxr.render_sequence"; bl_label = "按序渲染图片"
+
+    pass_mode: EnumProperty(
+        name="渲染通道",
+        items=[
+            ('NORMAL', "按序", "按姿态列表顺序渲染全质量图片"),
+            ('PREVIEW', "预览通道", "低分辨率、少采样渲染全部姿态，生成联系表与耗时预估"),
+            ('ORDERED', "按预估耗时", "按预览通道得到的耗时预估从长到短渲染全质量图片"),
+        ],
+        default='NORMAL', options={'SKIP_SAVE'}
+    )
+
     def invoke(self, context, event):
+        if self.pass_mode != 'ORDERED':
+            return self.execute(context)
         s = context.scene.htxr
-        if not (0 <= s.pose_index < len(s.poses)):
-            self.report({'WARNING'}, "请先选中一条姿态。"); return {'CANCELLED'}
-        p = s.poses[s.pose_index]
-        self.name, self.loc, self.rot_deg = p.name, p.loc[:], tuple(math.degrees(a) for a in p.rot)
+        out_dir = bpy.path.abspath(s.output_dir).rstrip("\\/")
+        try:
+            self._dialog_est = _load_estimates(out_dir, context.scene, s, _batch_poses(s))
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"读取姿态失败：{e}"); return {'CANCELLED'}
+        if not self._dialog_est:
+            self.report({'ERROR'}, "没有可用的耗时预估：请先运行预览通道（姿态改动后需重跑）。"); return {'CANCELLED'}
         return context.window_manager.invoke_props_dialog(self, width=420)
+
     def draw(self, context):
-        l = self.layout; l.use_property_split = True
-        l.prop(self, "name"); l.prop(self, "loc"); l.prop(self, "rot_deg")
-    def execute(self, context):
-        s = context.scene.htxr; p = s.poses[s.pose_index]
-        p.name = self.name; p.loc = self.loc; p.rot = tuple(math.radians(a) for a in self.rot_deg)
-        return {'FINISHED'}
+        if self.pass_mode != 'ORDERED':
+            return
+        est = getattr(self, "_dialog_est", None)
+        if not est:
+            return
+        col = self.layout.column()
+        longest = max(est, key=est.get)
+        col.label(text="按预估耗时从长到短渲染全质量图片。", icon='SORTTIME')
+        col.label(text=f"有预估的姿态：{len(est)} 个，单进程预估总时长 {_fmt_duration(sum(est.values()))}")
+        col.label(text=f"最长：姿态 {longest}，约 {_fmt_duration(est[longest])}")
 
 # =========================
-# 渲染：图片（带进度）
+# 渲染：分布式（多个 blender -b 工作进程）
 # =========================
-class HTXR_OT_RenderSequence(Operator):
-    bl_idname = "htxr.render_sequence"; bl_label = "按序渲染图片"
+_WORKER_FLAG = "--htxr-worker"
+_ENCODE_FLAG = "--htxr-encode"
+
+def _lpt_shards(items, weights, n):
+    # 最长处理时间优先（LPT）：按预估耗时从长到短，依次分给当前总负载最小的进程
+    known = [w for w in weights if w is not None]
+    fallback = sum(known) / len(known) if known else 1.0
+    order = sorted(range(len(items)), key=lambda k: weights[k] if weights[k] is not None else fallback, reverse=True)
+    shards = [[] for _ in range(n)]
+    heap = [(0.0, k) for k in range(n)]
+    for idx in order:
+        load, k = heapq.heappop(heap)
+        shards[k].append(items[idx])
+        heapq.heappush(heap, (load + (weights[idx] if weights[idx] is not None else fallback), k))
+    return shards
+
+def _pump_worker_output(shard, stream, q):
+    # 后台线程：持续读取工作进程 stdout，避免管道写满阻塞子进程
+    for line in stream:
+        q.put((shard, line.rstrip("\r\n")))
+    stream.close()
+
+class _WorkerPoolMixin:
+    # 一组后台 Blender 子进程：启动、解析 “HTXR:<TAG> <idx> <rest>” 协议行、终止。
+    # 子类实现 _on_worker_line(shard, tag, idx, rest) -> bool（False 表示不认识，记入日志）
+    _timer = None
+
+    def _pool_init(self, work_dir):
+        self._work_dir = work_dir; os.makedirs(work_dir, exist_ok=True)
+        self._procs, self._readers, self._logs = [], [], []
+        self._queue = queue.Queue()
+
+    def _snapshot(self):
+        # 当前内存中的工程另存一份给工作进程，不影响当前文件
+        path = os.path.join(self._work_dir, "snapshot.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True, check_existing=False)
+        return path
+
+    def _spawn(self, cmd):
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding="utf-8", errors="replace",
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+        k = len(self._procs)
+        reader = threading.Thread(target=_pump_worker_output, args=(k, proc.stdout, self._queue), daemon=True)
+        reader.start()
+        self._procs.append(proc); self._readers.append(reader); self._logs.append(deque(maxlen=20))
+        return k
+
+    def _write_job(self, name, job):
+        path = os.path.join(self._work_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        return path
+
+    def _drain(self):
+        while True:
+            try:
+                shard, line = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            parts = line[5:].split(" ", 2) if line.startswith("HTXR:") else ()
+            if len(parts) < 3 or not self._on_worker_line(shard, *parts):
+                self._logs[shard].append(line)
+        self._after_drain()
+
+    def _after_drain(self):
+        pass
+
+    def _kill_workers(self):
+        for p in self._procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in self._procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    def _close_pool(self, context):
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer); self._timer = None
+        wm.progress_end()
+        if context.workspace:
+            context.workspace.status_text_set(None)
+        self._kill_workers()
+        for r in self._readers:
+            r.join(timeout=2.0)
+        self._drain()
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+        for k, p in enumerate(self._procs):
+            if p.returncode != 0 and self._logs[k]:
+                print(f"[HTXR] 工作进程 {k} 退出码 {p.returncode}，最后输出：")
+                for line in self._logs[k]:
+                    print("    " + line)
+
+    def _start_timer(self, context, total):
+        wm = context.window_manager
+        wm.progress_begin(0, total)
+        self._timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+
+class HTXR_OT_RenderDistributed(_WorkerPoolMixin, Operator):
+    bl_idname = "htxr.render_distributed"; bl_label = "分布式渲染图片"
+    bl_description = "保存 .blend 快照，把姿态列表分片给多个后台 Blender 进程并行渲染，输出命名与『按序渲染图片』相同"
+
     def execute(self, context):
         scene = context.scene; s = scene.htxr
         cam = s.camera or scene.camera or context.view_layer.objects.active
         if cam is None or cam.type != 'CAMERA':
             self.report({'ERROR'}, "请在面板中选择一个摄像机。"); return {'CANCELLED'}
+        try:
+            pose_arr, rigs = _batch_poses(s), _rig_specs(s)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"无法开始渲染：{e}"); return {'CANCELLED'}
+        if len(pose_arr) == 0:
+            self.report({'WARNING'}, "姿态列表为空。"); return {'CANCELLED'}
+        if not rigs:
+            self.report({'ERROR'}, "多机位批次没有启用的机位。"); return {'CANCELLED'}
+        if s.tile_render and _stitch_format(scene) is None:
+            self.report({'ERROR'}, "分块渲染只支持 PNG 输出格式。"); return {'CANCELLED'}
+        script = os.path.abspath(__file__)
+        if not os.path.isfile(script):
+            self.report({'ERROR'}, "找不到插件脚本文件，请以插件方式安装后再使用分布式渲染。"); return {'CANCELLED'}
+        blender = bpy.path.abspath(s.dist_blender_path) if s.dist_blender_path else bpy.app.binary_path
+        ignored = [label for on, label in ((s.profile_report, "性能记录"), (s.budget_mode != 'OFF', "采样预算"),
+                                           (s.multi_size, "多尺寸输出"), (s.async_write, "后台移动文件")) if on]
+        if ignored:
+            self.report({'WARNING'}, f"分布式渲染不支持{'、'.join(ignored)}，本次不生效；需要时请用“按序渲染图片”。")
 
         out_dir = bpy.path.abspath(s.output_dir).rstrip("\\/"); os.makedirs(out_dir, exist_ok=True)
-        # 备份
-        orig_cam, orig_fp = scene.camera, scene.render.filepath
-        orig_res = (scene.render.resolution_x, scene.render.resolution_y, scene.render.resolution_percentage)
-        cycles_samples = getattr(scene.cycles, "samples", None) if hasattr(scene, "cycles") else None
-        ev = getattr(scene, "eevee", None); eevee_taa = getattr(ev, "taa_render_samples", None) if ev else None
+        self._scene, self._out_dir, self._manifest = scene, out_dir, _load_manifest(out_dir)
+        jobs, skipped = _stale_poses(scene, cam, s, out_dir, self._manifest, pose_arr, rigs)
+        if s.preflight != 'OFF' and jobs:
+            jobs = _apply_preflight(self, context, scene, cam, s, jobs, out_dir, pose_arr, s.preflight == 'SKIP')
+        self._aliases, self._alias_copied = {}, 0
+        if s.dedup_alias and jobs:
+            jobs, self._aliases, self._alias_copied = _alias_batch(scene, s, out_dir, jobs, pose_arr, self._manifest)
+        if not jobs:
+            self.report({'INFO'}, f"没有需要渲染的姿态（未变化 {skipped} 个）。"); return {'FINISHED'}
+        self._digests = {_job_key(i, rig): digest for i, _loc, _rot, _fp, digest, rig in jobs}
+        self._pool_init(os.path.join(out_dir, ".htxr_dist"))
+        snapshot = self._snapshot()
 
-        scene.camera = cam
-        if s.apply_override:
-            scene.render.resolution_x = s.res_x; scene.render.resolution_y = s.res_y; scene.render.resolution_percentage = 100
-            if scene.render.engine == 'CYCLES' and hasattr(scene, "cycles"):
-                scene.cycles.samples = s.samples
-            elif ev and hasattr(ev, "taa_render_samples"):
-                ev.taa_render_samples = s.samples
-
-        total = len(s.poses)
-        if total == 0:
-            self.report({'WARNING'}, "姿态列表为空。"); 
-            scene.camera = orig_cam if s.restore_scene_camera else scene.camera
-            scene.render.filepath = orig_fp
-            return {'CANCELLED'}
+        # 分块：每块是一个独立工作项（index 为 “键@块号”），同一姿态的各块分给不同进程并行，
+        # 主进程收齐一张的全部块后拼接
+        self._tiles = None
+        if s.tile_render:
+            w, h, self._tile_cols, self._tiles = _tile_plan(_effective_still(scene, s)[0], s)
+            self._tile_size, self._tile_fmt = (w, h), _stitch_format(scene)
+            self._tile_dir = os.path.join(self._work_dir, "tiles"); os.makedirs(self._tile_dir, exist_ok=True)
+            self._filepaths = {_job_key(i, rig): fp for i, _loc, _rot, fp, _d, rig in jobs}
+            self._tiles_got, self._stitched, self._stitch_failed = {}, 0, {}
+        tiles = self._tiles or (None,)
+        total = len(jobs) * len(tiles)
 
-        wm = context.window_manager
-        wm.progress_begin(0, total)
+        # 同一姿态的各机位作为一个整体分片：进程内连续渲染，只换相机
+        groups = {}
+        for i, loc, rot, filepath, _digest, rig in jobs:
+            for k, border in enumerate(tiles):
+                item = {"index": _job_key(i, rig), "loc": list(loc), "rot": list(rot), "filepath": filepath}
+                if rig:
+                    item["rig"] = rig
+                if border:
+                    item.update(index=f"{item['index']}@{k}", border=list(border),
+                                filepath=_tile_filepath(self._tile_dir, filepath, k))
+                groups.setdefault((i, k), []).append(item)
+        n = min(s.dist_workers, len(groups))
+        threads = s.dist_threads or max(1, (os.cpu_count() or 1) // n)
+        est = _load_estimates(out_dir, scene, s, pose_arr)
+        if est:
+            shards = _lpt_shards(list(groups), [est.get(i) and est[i] * len(g) / len(tiles)
+                                                for (i, _k), g in groups.items()], n)
+        else:
+            # 交错分片：相邻姿态往往复杂度相近，交错分配让各进程负载更均衡
+            shards = [list(groups)[k::n] for k in range(n)]
+        shards = [[it for i in shard for it in groups[i]] for shard in shards]
+        base = {
+            "scene": scene.name, "camera": cam.name,
+            "apply_override": s.apply_override, "res_x": s.res_x, "res_y": s.res_y, "samples": s.samples,
+            "static_scene": s.static_scene,
+        }
+
+        self._total = total
+        self._done, self._failed, self._recorded = {}, {}, False
+        for k in range(n):
+            job_path = self._write_job(f"shard_{k:03d}.json", dict(base, items=shards[k]))
+            try:
+                self._spawn([blender, "-b", snapshot, "-t", str(threads), "--python", script, "--", _WORKER_FLAG, job_path])
+            except OSError as e:
+                self._kill_workers()
+                shutil.rmtree(self._work_dir, ignore_errors=True)
+                self.report({'ERROR'}, f"无法启动工作进程：{e}"); return {'CANCELLED'}
+
+        self._start_timer(context, total)
+        skipped = f"（跳过未变化 {skipped} 个）" if skipped else ""
+        balanced = "，按预估耗时均衡分片" if est else ""
+        self.report({'INFO'}, f"已启动 {n} 个工作进程（每进程 {threads} 线程），共 {total} 张{skipped}{balanced}。")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._finish(context, cancelled=True); return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        self._drain()
+        finished = len(self._done) + len(self._failed)
+        context.window_manager.progress_update(finished)
+        if context.workspace:
+            context.workspace.status_text_set(
+                f"HTXR 分布式渲染 {finished}/{self._total}（失败 {len(self._failed)}）  Esc 取消"
+            )
+        if all(p.poll() is not None for p in self._procs):
+            self._finish(context, cancelled=False)
+            return {'FINISHED'}
+        return {'PASS_THROUGH'}
+
+    def _on_worker_line(self, shard, tag, idx, rest):
+        if tag == "DONE":
+            self._done[idx] = rest
+            if self._tiles:
+                idx = self._tile_done(idx)
+                if idx is None:
+                    return True
+                rest = self._filepaths[idx]
+            out = _still_output_path(self._scene, rest)
+            if os.path.isfile(out):
+                self._manifest[idx] = {"hash": self._digests[idx], "file": os.path.basename(out)}
+                self._recorded = True
+                for alias in self._aliases.get(idx, ()):
+                    try:
+                        _copy_alias(self._scene, self._manifest, out, alias); self._alias_copied += 1
+                    except OSError as e:
+                        print(f"[HTXR] 复制别名图片失败：{e}")
+        elif tag == "FAIL":
+            self._failed[idx] = rest
+        else:
+            return False
+        return True
+
+    def _tile_done(self, idx):
+        # 收到一块：该张的全部块到齐后拼接，返回该张的清单键；否则返回 None
+        key, k = idx.rsplit("@", 1)
+        got = self._tiles_got.setdefault(key, set()); got.add(int(k))
+        if len(got) < len(self._tiles):
+            return None
+        fp = self._filepaths[key]
+        tiles = [_still_output_path(self._scene, _tile_filepath(self._tile_dir, fp, j)) for j in range(len(self._tiles))]
         try:
-            cam.rotation_mode = 'XYZ'
-            for i, pose in enumerate(s.poses, start=1):
-                cam.location = pose.loc
-                cam.rotation_euler = pose.rot
-                fname = f"{s.filename_prefix}{i:0{s.padding}d}"
-                scene.render.filepath = os.path.join(out_dir, fname)
-                self.report({'INFO'}, f"渲染 {i}/{total} → {scene.render.filepath}")
-                bpy.ops.render.render(write_still=True)
-                wm.progress_update(i)
-        finally:
-            wm.progress_end()
-            scene.render.filepath = orig_fp
-            if s.apply_override:
-                scene.render.resolution_x, scene.render.resolution_y, scene.render.resolution_percentage = orig_res
-                if scene.render.engine == 'CYCLES' and hasattr(scene, "cycles") and cycles_samples is not None:
-                    scene.cycles.samples = cycles_samples
-                elif ev and eevee_taa is not None and hasattr(ev, "taa_render_samples"):
-                    ev.taa_render_samples = eevee_taa
-            if s.restore_scene_camera:
-                scene.camera = orig_cam
-
-        self.report({'INFO'}, "图片批量渲染完成。")
-        return {'FINISHED'}
+            _stitch_tiles(tiles, self._tile_cols, _still_output_path(self._scene, fp), *self._tile_size, *self._tile_fmt)
+        except (OSError, RuntimeError) as e:
+            self._stitch_failed[key] = str(e); return None
+        self._stitched += 1
+        return key
+
+    def _after_drain(self):
+        if not self._recorded:
+            return
+        self._recorded = False
+        try:
+            _save_manifest(self._out_dir, self._manifest)
+        except OSError as e:
+            print(f"[HTXR] 写入清单失败：{e}")
+
+    def _finish(self, context, cancelled):
+        self._close_pool(context)
+        codes = [p.returncode for p in self._procs]
+        missing = self._total - len(self._done) - len(self._failed)
+        for idx, msg in sorted(self._failed.items()):
+            print(f"[HTXR] 姿态 {idx} 渲染失败：{msg}")
+        stitch_failed = self._stitch_failed if self._tiles else {}
+        for key, msg in sorted(stitch_failed.items()):
+            print(f"[HTXR] 姿态 {key} 分块拼接失败：{msg}")
+
+        summary = f"成功 {len(self._done)}，失败 {len(self._failed)}，未完成 {missing}"
+        summary += f"（按块计），拼接 {self._stitched} 张，拼接失败 {len(stitch_failed)}" if self._tiles else ""
+        summary += f"，复制别名 {self._alias_copied}" if self._alias_copied else ""
+        summary += f"；进程退出码 {codes}"
+        if cancelled:
+            self.report({'WARNING'}, f"分布式渲染已取消：{summary}")
+        elif self._failed or stitch_failed or missing or any(codes):
+            self.report({'WARNING'}, f"分布式渲染结束（有错误，详见控制台）：{summary}")
+        else:
+            self.report({'INFO'}, f"分布式渲染完成：{summary}")
 
 # =========================
-# 视频：把姿态平均插入到序列帧
+# 相机路径：姿态 → 逐帧变换（NumPy 向量化，一次算完整段）
 # =========================
-class HTXR_OT_InsertKeyframesFromPoses(Operator):
-    bl_idname = "htxr.insert_keyframes_from_poses"
-    bl_label = "将姿态平均插入到序列帧"
-    bl_description = "把姿态平均分布到起始帧~结束帧，自动线性插值"
+_PATH_ACTION_NAME = "HTXR_Path"
+
+def _pose_array(poses):
+    # (N, 6)：loc xyz + rot xyz（弧度），foreach_get 批量读取
+    n = len(poses)
+    loc = np.empty(n * 3, dtype=np.float32); rot = np.empty(n * 3, dtype=np.float32)
+    poses.foreach_get("loc", loc); poses.foreach_get("rot", rot)
+    return np.hstack((loc.reshape(n, 3), rot.reshape(n, 3))).astype(np.float64)
+
+def _pose_key_frames(n, frame_start, total_frames):
+    # 与『平均插入关键帧』一致：第 i 个姿态落在 round(frame_start + step * i)，返回相对起始帧的偏移
+    step = (total_frames - 1) / (n - 1)
+    return np.round(frame_start + step * np.arange(n)) - frame_start
+
+def _frame_transforms(pose_arr, total_frames, frame_start=0):
+    # (total_frames, 6)：逐帧线性插值；同一帧落了多个姿态时保留最后一个（同 keyframe_insert 覆盖）
+    key = _pose_key_frames(len(pose_arr), frame_start, total_frames)
+    _, last = np.unique(key[::-1], return_index=True)
+    keep = len(key) - 1 - last
+    t = np.arange(total_frames, dtype=np.float64)
+    return np.column_stack([np.interp(t, key[keep], pose_arr[keep, c]) for c in range(6)])
+
+# ---- 四元数工具（w, x, y, z），按行向量化 ----
+def _quat_mul(a, b):
+    aw, ax, ay, az = np.moveaxis(a, -1, 0); bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack((aw*bw - ax*bx - ay*by - az*bz,
+                     aw*bx + ax*bw + ay*bz - az*by,
+                     aw*by - ax*bz + ay*bw + az*bx,
+                     aw*bz + ax*by - ay*bx + az*bw), axis=-1)
+
+def _quat_conj(q):
+    return q * np.array([1.0, -1.0, -1.0, -1.0])
+
+def _euler_to_quat(e):
+    # Blender XYZ 欧拉：R = Rz · Ry · Rx
+    c, s = np.cos(0.5 * e).T, np.sin(0.5 * e).T
+    (cx, cy, cz), (sx, sy, sz) = c, s
+    return np.stack((cx*cy*cz + sx*sy*sz,
+                     sx*cy*cz - cx*sy*sz,
+                     cx*sy*cz + sx*cy*sz,
+                     cx*cy*sz - sx*sy*cz), axis=-1)
+
+def _quat_to_euler(q):
+    w, x, y, z = q.T
+    r20 = 2.0 * (x*z - w*y); r21 = 2.0 * (y*z + w*x); r22 = 1.0 - 2.0 * (x*x + y*y)
+    r10 = 2.0 * (x*y + w*z); r00 = 1.0 - 2.0 * (y*y + z*z)
+    return np.column_stack((np.arctan2(r21, r22), np.arcsin(np.clip(-r20, -1.0, 1.0)), np.arctan2(r10, r00)))
+
+def _quat_log(q):
+    # 单位四元数的对数，返回纯虚部 (n, 3)
+    v = q[:, 1:]; n = np.linalg.norm(v, axis=1)
+    scale = np.where(n > 1e-12, np.arctan2(n, q[:, 0]) / np.maximum(n, 1e-12), 1.0)
+    return v * scale[:, None]
+
+def _quat_exp(v):
+    n = np.linalg.norm(v, axis=1)
+    scale = np.where(n > 1e-12, np.sin(n) / np.maximum(n, 1e-12), 1.0)
+    return np.column_stack((np.cos(n), v * scale[:, None]))
+
+def _slerp(a, b, t):
+    d = np.sum(a * b, axis=1)
+    b = np.where(d[:, None] < 0.0, -b, b); d = np.abs(d)
+    theta = np.arccos(np.clip(d, -1.0, 1.0)); sn = np.sin(theta)
+    lin = sn < 1e-6  # 夹角极小时退化为线性插值
+    sn = np.where(lin, 1.0, sn)
+    w0 = np.where(lin, 1.0 - t, np.sin((1.0 - t) * theta) / sn)
+    w1 = np.where(lin, t, np.sin(t * theta) / sn)
+    q = w0[:, None] * a + w1[:, None] * b
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+class _CameraPath:
+    # 姿态路径引擎：Catmull-Rom 位置样条（Hermite 形式，α=0 均匀 / 0.5 向心）+ Slerp/Squad 旋转。
+    # 构建时一次性生成弧长查找表，逐帧采样只做向量化查表与求值。
+    LUT_PER_SEGMENT = 64
+
+    def __init__(self, pose_arr, alpha, squad):
+        P = pose_arr[:, :3]; n = len(P)
+        self.segments = n - 1
+        # 端点外插虚拟控制点；段 k 使用 ext[k..k+3]
+        ext = np.vstack((2.0 * P[0] - P[1], P, 2.0 * P[-1] - P[-2]))
+        d = np.maximum(np.linalg.norm(np.diff(ext, axis=0), axis=1) ** alpha, 1e-6)
+        p0, p1, p2, p3 = ext[:-3], ext[1:-2], ext[2:-1], ext[3:]
+        d0, d1, d2 = d[:-2, None], d[1:-1, None], d[2:, None]
+        self._p1, self._p2 = p1, p2
+        self._m1 = d1 * ((p1 - p0) / d0 - (p2 - p0) / (d0 + d1) + (p2 - p1) / d1)
+        self._m2 = d1 * ((p2 - p1) / d1 - (p3 - p1) / (d1 + d2) + (p3 - p2) / d2)
+
+        # 相邻四元数取同一半球，避免绕远路（欧拉插值的翻转问题也在这里消失）
+        q = _euler_to_quat(pose_arr[:, 3:])
+        sign = np.where(np.sum(q[1:] * q[:-1], axis=1) < 0.0, -1.0, 1.0)
+        q = q * np.cumprod(np.concatenate(([1.0], sign)))[:, None]
+        self._q, self._squad, self._e0 = q, squad, pose_arr[0, 3:]
+        if squad and n > 2:
+            inv = _quat_conj(q[1:-1])
+            a = -0.25 * (_quat_log(_quat_mul(inv, q[2:])) + _quat_log(_quat_mul(inv, q[:-2])))
+            self._s = np.vstack((q[:1], _quat_mul(q[1:-1], _quat_exp(a)), q[-1:]))
+        else:
+            self._s = q
+
+        # 弧长表：旋转折算为路程（转 180° 记作一个平均段长），纯旋转的段也能分到时间
+        u = np.linspace(0.0, self.segments, self.segments * self.LUT_PER_SEGMENT + 1)
+        pos, rot = self.positions(u), self.rotations(u)
+        dp = np.linalg.norm(np.diff(pos, axis=0), axis=1)
+        da = 2.0 * np.arccos(np.clip(np.abs(np.sum(rot[1:] * rot[:-1], axis=1)), 0.0, 1.0))
+        length = dp.sum()
+        w = (length / self.segments if length > 1e-9 else 1.0) / math.pi
+        self._lut_u = u
+        self._lut_s = np.concatenate(([0.0], np.cumsum(dp + w * da)))
+
+    def _split(self, u):
+        k = np.minimum(np.floor(u).astype(np.intp), self.segments - 1)
+        return k, u - k
+
+    def positions(self, u):
+        k, t = self._split(u); t = t[:, None]
+        t2 = t * t; t3 = t2 * t
+        return ((2*t3 - 3*t2 + 1) * self._p1[k] + (t3 - 2*t2 + t) * self._m1[k]
+                + (3*t2 - 2*t3) * self._p2[k] + (t3 - t2) * self._m2[k])
+
+    def rotations(self, u):
+        k, t = self._split(u)
+        a = _slerp(self._q[k], self._q[k + 1], t)
+        if not self._squad:
+            return a
+        return _slerp(a, _slerp(self._s[k], self._s[k + 1], t), 2.0 * t * (1.0 - t))
+
+    def sample(self, count, constant_speed):
+        # (count, 6)：匀速时按弧长表反查参数 u，否则每段分配相同帧数（第 i 个姿态落在 u = i）
+        if constant_speed and self._lut_s[-1] > 1e-12:
+            u = np.interp(np.linspace(0.0, self._lut_s[-1], count), self._lut_s, self._lut_u)
+        else:
+            u = np.linspace(0.0, self.segments, count)
+        e = np.unwrap(_quat_to_euler(self.rotations(u)), axis=0)
+        e += 2.0 * np.pi * np.round((self._e0 - e[0]) / (2.0 * np.pi))
+        return np.hstack((self.positions(u), e))
+
+_PATH_CACHE = {"key": None, "path": None}
+
+def _camera_path(pose_arr, s):
+    # 姿态或样条设置不变时复用同一引擎（含弧长表）
+    key = (hashlib.sha1(pose_arr.tobytes()).hexdigest(), s.path_spline, s.path_rotation)
+    if _PATH_CACHE["key"] != key:
+        alpha = 0.5 if s.path_spline == 'CENTRIPETAL' else 0.0
+        _PATH_CACHE["path"] = _CameraPath(pose_arr, alpha, s.path_rotation == 'SQUAD')
+        _PATH_CACHE["key"] = key
+    return _PATH_CACHE["path"]
+
+def _path_transforms(s, total_frames, frame_start):
+    pose_arr = _batch_poses(s)
+    if s.path_interp == 'LINEAR':
+        return _frame_transforms(pose_arr, total_frames, frame_start)
+    return _camera_path(pose_arr, s).sample(total_frames, s.path_timing == 'CONSTANT')
+
+def _build_path_action(transforms, frame_start, name=_PATH_ACTION_NAME):
+    # 每帧一个关键帧，keyframe_points.add + foreach_set 批量写入，10 万帧也在瞬间完成
+    f = len(transforms)
+    act = bpy.data.actions.new(name)
+    co = np.empty(f * 2, dtype=np.float32)
+    co[0::2] = np.arange(frame_start, frame_start + f, dtype=np.float32)
+    for c in range(6):
+        fc = act.fcurves.new("location" if c < 3 else "rotation_euler", index=c % 3, action_group="HTXR")
+        fc.keyframe_points.add(f)
+        co[1::2] = transforms[:, c]
+        fc.keyframe_points.foreach_set("co", co)
+        fc.update()
+    return act
+
+def _attach_path_action(cam, transforms, frame_start):
+    # 临时替换相机的活动动作；返回还原所需状态，用户原有动作本身不做任何修改
+    ad = cam.animation_data
+    state = {
+        "cam": cam, "had_anim": ad is not None, "action": ad.action if ad else None,
+        "loc": cam.location.copy(), "rot": cam.rotation_euler.copy(), "rotation_mode": cam.rotation_mode,
+    }
+    cam.rotation_mode = 'XYZ'
+    state["temp"] = _build_path_action(transforms, frame_start)
+    (ad or cam.animation_data_create()).action = state["temp"]
+    return state
+
+def _detach_path_action(state):
+    cam = state["cam"]
+    if state["had_anim"]:
+        cam.animation_data.action = state["action"]
+    else:
+        cam.animation_data_clear()
+    bpy.data.actions.remove(state["temp"])
+    cam.rotation_mode = state["rotation_mode"]
+    cam.location = state["loc"]; cam.rotation_euler = state["rot"]
+
+# =========================
+# 静止帧（保持）检测：相机停住且场景无其他动画的连续帧只渲一次
+# =========================
+_HOLD_TOL = 1e-5  # 位置（米）与旋转（弧度）的容差
+# 随时间变化、无法从关键帧判断的修改器：模拟、粒子、缓存、按帧变形
+_HOLD_TIME_MODIFIERS = {'CLOTH', 'SOFT_BODY', 'FLUID', 'DYNAMIC_PAINT', 'OCEAN', 'PARTICLE_SYSTEM', 'EXPLODE',
+                        'MESH_CACHE', 'MESH_SEQUENCE_CACHE', 'WAVE', 'BUILD'}
+_HOLD_TIME_NODES = {'GeometryNodeInputSceneTime', 'GeometryNodeSimulationInput', 'GeometryNodeSimulationOutput'}
+
+def _camera_frame_transforms(cam, frames):
+    # 相机自身关键帧 → (F, 6) 逐帧变换（fcurve.evaluate，不切换场景帧）；
+    # 有父级、约束、驱动器、NLA 或非 XYZ 旋转时无法这样预算，返回 None
+    ad = cam.animation_data
+    if cam.parent or len(cam.constraints) or cam.rotation_mode != 'XYZ':
+        return None
+    if ad and (len(ad.drivers) or len(ad.nla_tracks)):
+        return None
+    out = np.empty((len(frames), 6))
+    for c in range(6):
+        path, idx = ("location", c) if c < 3 else ("rotation_euler", c - 3)
+        fc = ad.action.fcurves.find(path, index=idx) if ad and ad.action else None
+        out[:, c] = [fc.evaluate(f) for f in frames] if fc else getattr(cam, path)[idx]
+    return out
+
+def _keys_flat(fc):
+    # 关键帧值与控制柄高度全部相同：曲线在任何帧都是常量
+    n = len(fc.keyframe_points)
+    co = np.empty(n * 2); left = np.empty(n * 2); right = np.empty(n * 2)
+    fc.keyframe_points.foreach_get("co", co)
+    fc.keyframe_points.foreach_get("handle_left", left); fc.keyframe_points.foreach_get("handle_right", right)
+    ys = np.concatenate((co[1::2], left[1::2], right[1::2]))
+    return bool(np.all(ys == ys[0])), co[0::2]
+
+def _animatable_ids():
+    # bpy.data 中所有 ID 集合里的数据块，外加材质 / 世界 / 灯光等内嵌的节点树（节点上的关键帧存在节点树上）
+    for prop in bpy.data.bl_rna.properties:
+        if prop.type != 'COLLECTION':
+            continue
+        for idb in getattr(bpy.data, prop.identifier):
+            if not isinstance(idb, bpy.types.ID):
+                break
+            yield idb
+            nt = getattr(idb, "node_tree", None)
+            if isinstance(nt, bpy.types.ID) and nt.is_embedded_data:
+                yield nt
+
+def _time_dependence(scene):
+    # 关键帧以外可能随帧变化的内容 → 原因字符串；没有时返回 None
+    if scene.rigidbody_world and scene.rigidbody_world.enabled:
+        return "场景启用了刚体模拟"
+    se = scene.sequence_editor
+    if scene.render.use_sequencer and se and len(se.strips if hasattr(se, "strips") else se.sequences):
+        return "场景使用序列编辑器合成"
+    if any(cf.users for cf in bpy.data.cache_files):
+        return "场景引用了缓存文件（Alembic / USD）"
+    for img in bpy.data.images:
+        if img.source in {'SEQUENCE', 'MOVIE'} and img.users:
+            return f"图像 {img.name} 是序列 / 影片"
+    for vol in getattr(bpy.data, "volumes", ()):
+        if vol.is_sequence and vol.users:
+            return f"体积 {vol.name} 是序列"
+    for gp in getattr(bpy.data, "grease_pencils", ()):
+        if gp.users and any(len(layer.frames) > 1 for layer in gp.layers):
+            return f"蜡笔 {gp.name} 有逐帧绘制"
+    for ob in bpy.data.objects:
+        for md in ob.modifiers:
+            if md.type in _HOLD_TIME_MODIFIERS:
+                return f"物体 {ob.name} 有 {md.type} 修改器"
+            if md.type == 'NODES' and md.node_group and _node_tree_timed(md.node_group, set()):
+                return f"物体 {ob.name} 的几何节点依赖场景时间"
+        if any(c.type == 'TRANSFORM_CACHE' for c in ob.constraints):
+            return f"物体 {ob.name} 有变换缓存约束"
+    return None
+
+def _scene_motion(scene, cam, f0, f1):
+    # 除相机位置 / 旋转外，f0..f1 内逐帧“可能与上一帧不同”的掩码 (f1-f0+1,)；
+    # 有模拟、缓存、驱动器等无法从关键帧判断的内容时返回原因字符串。
+    # 驱动器的变量可以间接依赖时间，一律视为随帧变化
+    reason = _time_dependence(scene)
+    if reason:
+        return reason
+    moving = np.zeros(f1 - f0 + 1, dtype=bool)
+    def mark(lo, hi):  # (lo, hi] 之间的帧可能变化
+        moving[max(int(math.floor(lo)) + 1 - f0, 0):max(int(math.ceil(hi)) + 1 - f0, 0)] = True
+    for idb in _animatable_ids():
+        ad = getattr(idb, "animation_data", None)
+        if ad is None:
+            continue
+        if any(not d.mute for d in ad.drivers):
+            return f"{idb.name} 有驱动器"
+        for track in ad.nla_tracks:
+            if not track.mute:
+                for strip in track.strips:
+                    mark(strip.frame_start - 1, strip.frame_end)
+        for fc in (ad.action.fcurves if ad.action else ()):
+            if fc.mute or not len(fc.keyframe_points):
+                continue
+            if idb == cam and fc.data_path in ("location", "rotation_euler"):
+                continue
+            if len(fc.modifiers) or fc.extrapolation == 'LINEAR':
+                flat, xs = False, (-math.inf, math.inf)
+            else:
+                flat, xs = _keys_flat(fc)
+            if not flat:
+                mark(max(min(xs), f0 - 1), min(max(xs), f1))
+    return moving
 
+def _node_tree_timed(tree, seen):
+    seen.add(tree.name)
+    for node in tree.nodes:
+        if node.bl_idname in _HOLD_TIME_NODES:
+            return True
+        sub = getattr(node, "node_tree", None)
+        if sub and sub.name not in seen and _node_tree_timed(sub, seen):
+            return True
+    return False
+
+def _hold_sources(transforms, moving, tol=_HOLD_TOL):
+    # → src：第 i 帧复用第 src[i] 帧的像素（src[i] == i 表示需要渲染）。
+    # 与本段第一帧比较而不是与上一帧比较，缓慢漂移不会累积成可见的跳变
+    src = np.arange(len(transforms)); head = 0
+    for i in range(1, len(transforms)):
+        if not moving[i] and np.abs(transforms[i] - transforms[head]).max() <= tol:
+            src[i] = head
+        else:
+            head = i
+    return src
+
+def _plan_holds(scene, s, cam):
+    # → (src, None) 或 (None, 不能跳过的原因)；frames 为 s.frame_start 起的 s.total_frames 帧
+    f0, f1 = s.frame_start, s.frame_start + s.total_frames - 1
+    if s.video_direct_path:
+        transforms = _path_transforms(s, s.total_frames, f0)
+    else:
+        transforms = _camera_frame_transforms(cam, range(f0, f1 + 1))
+        if transforms is None:
+            return None, "相机有父级 / 约束 / 驱动器 / NLA 或非 XYZ 旋转，无法预先计算逐帧变换"
+    moving = _scene_motion(scene, cam, f0, f1)
+    if isinstance(moving, str):
+        return None, moving
+    return _hold_sources(transforms, moving), None
+
+# =========================
+# 视频：把姿态平均插入到序列帧
+# =========================
+class _KeyframeBatch:
+    # 姿态 → 相机关键帧（面板操作与 run_job 共用）
     def execute(self, context):
         scene = context.scene; s = scene.htxr
         cam = s.camera or scene.camera or context.view_layer.objects.active
         if cam is None or cam.type != 'CAMERA':
             self.report({'ERROR'}, "请在面板中选择一个摄像机。"); return {'CANCELLED'}
-        if len(s.poses) < 2:
+        try:
+            pose_arr = _batch_poses(s)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"读取姿态失败：{e}"); return {'CANCELLED'}
+        if len(pose_arr) < 2:
             self.report({'ERROR'}, "至少需要 2 个姿态用于插值。"); return {'CANCELLED'}
 
         frame_start = s.frame_start
         frame_end   = s.frame_start + s.total_frames - 1
         scene.frame_start, scene.frame_end = frame_start, frame_end
-        step = (frame_end - frame_start) / (len(s.poses) - 1)
+        step = (frame_end - frame_start) / (len(pose_arr) - 1)
 
         cam.rotation_mode = 'XYZ'
         # 清除已有关键帧（仅清相机TRS更安全：先清动画，再插）
         cam.animation_data_clear()
 
-        for i, pose in enumerate(s.poses):
+        if s.path_interp != 'LINEAR':
+            transforms = _path_transforms(s, s.total_frames, frame_start)
+            cam.animation_data_create().action = _build_path_action(transforms, frame_start, name=f"{cam.name}Action")
+            self.report({'INFO'}, f"已按样条路径烘焙关键帧：{s.total_frames} 帧，帧区间 {frame_start}~{frame_end}。")
+            return {'FINISHED'}
+
+        for i, row in enumerate(pose_arr.tolist()):
             f = round(frame_start + step * i)
-            cam.location = pose.loc
-            cam.rotation_euler = pose.rot
+            cam.location = row[:3]
+            cam.rotation_euler = row[3:]
             cam.keyframe_insert(data_path="location", frame=f)
             cam.keyframe_insert(data_path="rotation_euler", frame=f)
 
@@ -271,14 +3154,21 @@ class HTXR_OT_InsertKeyframesFromPoses(Operator):
                 for kp in fc.keyframe_points:
                     kp.interpolation = 'LINEAR'
 
-        self.report({'INFO'}, f"已插入关键帧：{len(s.poses)} 个，帧区间 {frame_start}~{frame_end}。")
+        self.report({'INFO'}, f"已插入关键帧：{len(pose_arr)} 个，帧区间 {frame_start}~{frame_end}。")
         return {'FINISHED'}
 
+class HTXR_OT_InsertKeyframesFromPoses(_KeyframeBatch, Operator):
+    bl_idname = "htxr.insert_keyframes_from_poses"
+    bl_label = "将姿态平均插入到序列帧"
+    bl_description = "把姿态平均分布到起始帧~结束帧，自动线性插值；样条模式下按路径引擎逐帧烘焙"
+
 # =========================
-# 视频渲染（带进度）
+# 视频渲染（模态，带进度）
 # =========================
-class HTXR_OT_RenderVideo(Operator):
-    bl_idname = "htxr.render_video"; bl_label = "渲染视频到文件夹"
+class _VideoBatch(_ModalRenderMixin):
+    # 视频批次本体（面板操作与 run_job 共用）
+    _unit = "帧"; _label = "视频渲染"; _single_job = True
+
     def execute(self, context):
         scene = context.scene; s = scene.htxr
         cam = s.camera or scene.camera or context.view_layer.objects.active
@@ -286,25 +3176,25 @@ class HTXR_OT_RenderVideo(Operator):
             self.report({'ERROR'}, "请在面板中选择一个摄像机。"); return {'CANCELLED'}
         if s.total_frames < 2:
             self.report({'ERROR'}, "总帧数至少为 2。"); return {'CANCELLED'}
+        if s.video_direct_path and _pose_count(s) < 2:
+            self.report({'ERROR'}, "至少需要 2 个可读取的姿态用于插值。"); return {'CANCELLED'}
+        if s.budget_mode != 'OFF' and _budget_unsupported(scene):
+            self.report({'ERROR'}, _budget_unsupported(scene)); return {'CANCELLED'}
 
         out_dir = bpy.path.abspath(s.output_dir).rstrip("\\/"); os.makedirs(out_dir, exist_ok=True)
         base = os.path.splitext(s.video_filename)[0] or "render"
-        outfile = os.path.join(out_dir, base)
+        self._outfile = os.path.join(out_dir, base)
+        self._hold_src = None
+        if s.video_skip_holds:
+            src, reason = _plan_holds(scene, s, cam)
+            if reason:
+                self.report({'WARNING'}, f"未跳过静止帧：{reason}。")
+            elif (src != np.arange(len(src))).any():
+                self._hold_src = src
 
         # 备份
-        orig = {
-            "camera": scene.camera,
-            "filepath": scene.render.filepath,
-            "fps": scene.render.fps,
-            "fps_base": scene.render.fps_base,
-            "res": (scene.render.resolution_x, scene.render.resolution_y, scene.render.resolution_percentage),
-            "file_format": scene.render.image_settings.file_format,
-            "ff_fmt": getattr(scene.render, "ffmpeg", None).format if hasattr(scene.render, "ffmpeg") else None,
-            "ff_codec": getattr(scene.render, "ffmpeg", None).codec if hasattr(scene.render, "ffmpeg") else None,
-            "samples": getattr(scene.cycles, "samples", None) if hasattr(scene, "cycles") else None,
-            "eevee_taa": getattr(getattr(scene, "eevee", None), "taa_render_samples", None) if hasattr(scene, "eevee") else None,
-            "frame_range": (scene.frame_start, scene.frame_end),
-        }
+        self._state = _SceneState(scene)
+        self._scene = scene
 
         # 应用
         scene.camera = cam
@@ -313,15 +3203,7 @@ class HTXR_OT_RenderVideo(Operator):
         scene.render.fps = s.fps
         scene.render.fps_base = 1.0
         if s.video_apply_override:
-            scene.render.resolution_x = s.video_res_x
-            scene.render.resolution_y = s.video_res_y
-            scene.render.resolution_percentage = 100
-            if scene.render.engine == 'CYCLES' and hasattr(scene, "cycles"):
-                scene.cycles.samples = s.video_samples
-            else:
-                ev = getattr(scene, "eevee", None)
-                if ev and hasattr(ev, "taa_render_samples"):
-                    ev.taa_render_samples = s.video_samples
+            _apply_render_override(scene, s.video_res_x, s.video_res_y, s.video_samples)
 
         # FFMPEG / MP4(H.264)
         scene.render.image_settings.file_format = 'FFMPEG'
@@ -330,47 +3212,457 @@ class HTXR_OT_RenderVideo(Operator):
             ff.format = 'MPEG4'
             ff.codec = 'H264'
 
-        scene.render.filepath = outfile
+        scene.render.filepath = self._outfile
+        frames = list(range(scene.frame_start, scene.frame_end + 1))
+        self._seq_mode = self._hold_src is not None
+        if self._seq_mode:
+            frames = self._setup_holds(scene, s, os.path.join(out_dir, f"{base}_frames"), frames)
+        if s.budget_mode != 'OFF':
+            # 动画是一次渲染任务，中途无法逐帧重新分配：总时长按实际要渲的帧均分，自适应采样照常提前收敛
+            cy = scene.cycles
+            cy.use_adaptive_sampling, cy.adaptive_threshold = True, s.budget_noise
+            if s.budget_mode == 'TIME':
+                cy.time_limit = max(s.budget_minutes * 60.0 / max(len(frames), 1),
+                                    _BUDGET_MIN_TIME)
+        self._path = None
+        if s.video_direct_path:
+            transforms = _path_transforms(s, s.total_frames, s.frame_start)
+            self._path = _attach_path_action(cam, transforms, s.frame_start)
+        self._frames, self._frame_k = frames, 0
+        profile = _RenderProfile(out_dir, "frame", _current_samples(scene)) if s.profile_report else None
+        return self._begin_modal(context, len(frames), profile)
 
-        # 进度条：用帧回调 + Blender 自带进度
-        wm = context.window_manager
-        total = scene.frame_end - scene.frame_start + 1
-        wm.progress_begin(0, total)
+    def _setup_holds(self, scene, s, frames_dir, frames):
+        # 改为渲染序列帧（与流水线同一目录与格式），最后编码成视频。每帧先渲到临时名 frame_######_part，
+        # 写完即改为正式名：中途崩溃或取消只会留下 _part，正式名的文件总是完整的，重跑与复用都据此判断。
+        # 不需要渲的帧（静止帧、上次已渲出的帧）放空的 _part 占位，关闭覆盖后 Blender 的动画渲染会跳过它们。
+        # 返回实际要渲染的帧
+        os.makedirs(frames_dir, exist_ok=True)
+        settings, img_ext, self._decoder = _PIPELINE_FORMATS[s.pipeline_format]
+        r = scene.render
+        for key, value in settings.items():
+            setattr(r.image_settings, key, value)
+        r.use_file_extension, r.use_overwrite, r.use_placeholder = True, False, False
+        r.filepath = os.path.join(frames_dir, "frame_######_part")
+        self._res = (round(r.resolution_x * r.resolution_percentage / 100), round(r.resolution_y * r.resolution_percentage / 100))
+        self._files = [os.path.join(frames_dir, f"frame_{f:06d}{img_ext}") for f in frames]
+        self._parts = [os.path.join(frames_dir, f"frame_{f:06d}_part{img_ext}") for f in frames]
+        src = self._hold_src.tolist()
+        self._seq_frames, self._part_of = frames, {}
+        self._holds = [i for i, j in enumerate(src) if i != j and not _frame_ready(self._files[i])]
+        self._held = len(self._holds)
+        self._encoder, self._encoded, self._encode_error, self._write_errors = None, False, None, []
+        render = []
+        for i, f in enumerate(frames):
+            if src[i] == i and not _frame_ready(self._files[i]):
+                render.append(f); self._part_of[f] = i
+                if os.path.exists(self._parts[i]):
+                    os.remove(self._parts[i])  # 上次中断留下的半截文件
+            else:
+                open(self._parts[i], "wb").close()
+        return render
 
-        def _progress_cb(_scene):
+    def _on_write(self, *args):
+        super()._on_write(*args)
+        # 只做文件改名（不碰 bpy），可在渲染线程执行；当前帧即 _frames[_frame_k]（下一帧 render_pre 时才前移）
+        if self._seq_mode and self._frame_k < len(self._frames):
+            i = self._part_of[self._frames[self._frame_k]]
             try:
-                cur = max(_scene.frame_current - _scene.frame_start + 1, 0)
-                wm.progress_update(min(cur, total))
-            except Exception:
-                pass
+                os.replace(self._parts[i], self._files[i])
+            except OSError as e:
+                self._write_errors.append(f"第 {self._seq_frames[i]} 帧：{e}")
+
+    def _fill_holds(self):
+        # 段首帧已完整渲出的静止帧复制其文件（先写临时名再替换）；可重复调用
+        left = []
+        for i in self._holds:
+            src = self._files[self._hold_src[i]]
+            if _frame_ready(src):
+                _copy_frame(src, self._files[i])
+            else:
+                left.append(i)
+        self._holds = left
+
+    def _cleanup_parts(self):
+        # 占位与没写完的临时文件
+        for part in self._parts:
+            if os.path.exists(part):
+                os.remove(part)
+
+    def _encode_step(self):
+        # 序列帧渲完后：补齐静止帧，启动编码进程并逐周期轮询；返回 True 表示编码已结束
+        if self._encoded:
+            return True
+        if self._encoder is None:
+            try:
+                self._fill_holds()
+                s = self._scene.htxr
+                self._encoder = _SequenceEncoder(self._seq_frames, self._files, s, self._decoder, self._res,
+                                                 self._outfile + ".mp4")
+            except OSError as e:
+                self._encoded, self._encode_error = True, str(e); return True
+            self._label = "视频编码"
+            return False
+        if self._encoder.running():
+            return False
+        self._encode_error, self._encoder, self._encoded = self._encoder.result(), None, True
+        return True
+
+    def _poll(self, context):
+        # 序列帧模式：整段渲完（未取消）后在计时周期里编码，编码结束前不收尾；取消时终止编码进程
+        if not self._seq_mode:
+            return True
+        if not self._busy and (self._stop == 'DONE' or (self._stop is None and self._done >= self._total)):
+            return self._encode_step()  # 也包括所有帧都已存在、无需渲染的情况
+        if self._stop == 'CANCEL' and self._encoder:
+            self._encoder.kill(); self._encoder = None
+        return True
+
+    def _start_next(self, context):
+        return _render_op(context, animation=True)
+
+    # 动画渲染是单个任务：每帧 render_post 计数，任务结束即整段完成；
+    # 上一帧的计时在下一帧 render_pre（或任务结束）时落盘
+    def _on_pre(self, *args):
+        self._record_frame()
+        super()._on_pre(*args)
+
+    def _on_post(self, *args):
+        super()._on_post(*args)
+        self._done = min(self._done + 1, self._total)
+
+    def _on_complete(self, *args):
+        # 任务结束前按过 Esc：保持已取消，不把整段记为完成
+        self._record_frame()
+        self._busy = False
+        if self._stop != 'CANCEL':
+            self._done = self._total; self._stop = 'DONE'
+
+    def _record_frame(self):
+        timing = self._take_timing()
+        if timing and self._profile and self._frame_k < len(self._frames):
+            self._profile.record(self._frames[self._frame_k], timing, self._stats)
+        if timing:
+            self._frame_k += 1
+
+    def _restore(self, context):
+        if self._seq_mode:
+            try:
+                self._fill_holds(); self._cleanup_parts()
+            except OSError as e:
+                self._write_errors.append(f"复制静止帧失败：{e}")
+        self._state.restore()
+        if self._path:
+            _detach_path_action(self._path); self._path = None
+
+    def _report_done(self, elapsed):
+        if not self._seq_mode:
+            self.report({'INFO'}, f"视频渲染完成：{self._outfile}.mp4（用时 {_fmt_duration(elapsed)}）"); return
+        if self._write_errors:
+            self.report({'ERROR'}, f"{len(self._write_errors)} 帧序列帧写出失败，未编码：" + "；".join(self._write_errors[:3]))
+            return
+        while not self._encode_step():
+            time.sleep(0.1)  # 无窗口（blender -b）时没有计时周期，在这里等编码结束
+        if self._encode_error:
+            self.report({'ERROR'}, f"序列帧已渲完（跳过静止帧 {self._held} 帧），但编码失败：{self._encode_error}"); return
+        self.report({'INFO'}, f"视频渲染完成：{self._outfile}.mp4（用时 {_fmt_duration(time.perf_counter() - self._t0)}，"
+                              f"跳过静止帧 {self._held} 帧，复用段首帧像素）")
+
+class HTXR_OT_RenderVideo(_VideoBatch, Operator):
+    bl_idname = "htxr.render_video"; bl_label = "渲染视频到文件夹"
+
+# =========================
+# 视频流水线：多进程渲染无损序列帧 → 边渲边编码
+# =========================
+_FRAME_CHUNK = 8  # 每次分给同一进程的连续帧数；块交错分配，整体大致按帧序完成，便于流式编码
+
+# 序列格式 → (工作进程 image_settings, 扩展名, ffmpeg 输入解码器)
+_PIPELINE_FORMATS = {
+    'PNG': ({"file_format": 'PNG', "color_mode": 'RGB', "color_depth": '16', "compression": 15}, ".png", "png"),
+    'OPEN_EXR': ({"file_format": 'OPEN_EXR', "color_mode": 'RGB', "color_depth": '16', "exr_codec": 'ZIP'}, ".exr", "exr"),
+}
+
+def _frame_ready(path):
+    return os.path.isfile(path) and os.path.getsize(path) > 0
+
+def _copy_frame(src, dst):
+    # 先写临时名再替换：中断时不会留下被当作已完成的半截帧
+    part = dst + ".part"
+    shutil.copyfile(src, part); os.replace(part, dst)
+
+def _ffmpeg_cmd(ffmpeg, decoder, fps, outfile):
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+           "-f", "image2pipe", "-framerate", str(fps), "-c:v", decoder]
+    if decoder == "exr":
+        cmd += ["-apply_trc", "iec61966_2_1"]  # 线性 EXR → sRGB
+    return cmd + ["-i", "-", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", "18", "-r", str(fps), outfile]
 
+class _EncodeFeed:
+    # 渲染（主线程登记完成帧）与编码（后台线程按帧序写入 ffmpeg stdin）共享的状态；
+    # 纯 Python 对象，后台线程不接触任何 bpy 数据
+    def __init__(self, frames, files, ready):
+        self.frames, self.files, self.ready = frames, files, set(ready)
+        self.abort = threading.Event()
+        self.encoded, self.error = 0, None
+
+    def run(self, stdin):
         try:
-            bpy.app.handlers.frame_change_post.append(_progress_cb)
-            bpy.ops.render.render(animation=True)
+            for f, path in zip(self.frames, self.files):
+                while f not in self.ready:
+                    if self.abort.is_set():
+                        return
+                    time.sleep(0.05)
+                with open(path, "rb") as fh:
+                    stdin.write(fh.read())
+                self.encoded += 1
+        except OSError as e:
+            self.error = str(e)
         finally:
-            wm.progress_end()
             try:
-                bpy.app.handlers.frame_change_post.remove(_progress_cb)
-            except Exception:
+                stdin.close()
+            except OSError:
                 pass
-            # 还原
-            scene.camera = orig["camera"]
-            scene.render.filepath = orig["filepath"]
-            scene.render.fps = orig["fps"]; scene.render.fps_base = orig["fps_base"]
-            scene.render.resolution_x, scene.render.resolution_y, scene.render.resolution_percentage = orig["res"]
-            scene.render.image_settings.file_format = orig["file_format"]
-            if hasattr(scene.render, "ffmpeg"):
-                scene.render.ffmpeg.format = orig["ff_fmt"] if orig["ff_fmt"] else scene.render.ffmpeg.format
-                scene.render.ffmpeg.codec  = orig["ff_codec"] if orig["ff_codec"] else scene.render.ffmpeg.codec
-            if scene.render.engine == 'CYCLES' and hasattr(scene, "cycles") and orig["samples"] is not None:
-                scene.cycles.samples = orig["samples"]
+
+class _SequenceEncoder:
+    # 把已渲好的序列帧编码成视频的后台进程：有 ffmpeg 时由后台线程按帧序经管道送入，
+    # 否则启动后台 Blender 用序列编辑器编码。主线程只在计时周期里调用 running()，界面不冻结
+    def __init__(self, frames, files, s, decoder, res, outfile):
+        ffmpeg = bpy.path.abspath(s.ffmpeg_path) if s.ffmpeg_path else shutil.which("ffmpeg")
+        frames_dir = os.path.dirname(files[0])
+        self._log_path = os.path.join(frames_dir, "ffmpeg.log" if ffmpeg else "encode.log")
+        self._log = open(self._log_path, "wb")
+        self._feed = self._feeder = None
+        flags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        try:
+            if ffmpeg:
+                self._proc = subprocess.Popen(_ffmpeg_cmd(ffmpeg, decoder, s.fps, outfile), stdin=subprocess.PIPE,
+                                              stdout=subprocess.DEVNULL, stderr=self._log, creationflags=flags)
+                self._feed = _EncodeFeed(frames, files, frames)
+                self._feeder = threading.Thread(target=self._feed.run, args=(self._proc.stdin,), daemon=True)
+                self._feeder.start()
+            else:
+                job_path = os.path.join(frames_dir, "encode.json")
+                with open(job_path, "w", encoding="utf-8") as f:
+                    json.dump({"files": files, "fps": s.fps, "res": res, "outfile": outfile}, f, ensure_ascii=False)
+                blender = bpy.path.abspath(s.dist_blender_path) if s.dist_blender_path else bpy.app.binary_path
+                self._proc = subprocess.Popen([blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__),
+                                               "--", _ENCODE_FLAG, job_path],
+                                              stdout=self._log, stderr=subprocess.STDOUT, creationflags=flags)
+        except OSError:
+            self._log.close()
+            raise
+
+    def running(self):
+        return (self._feeder is not None and self._feeder.is_alive()) or self._proc.poll() is None
+
+    def kill(self):
+        if self._feed:
+            self._feed.abort.set()
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait(); self._log.close()
+
+    def result(self):
+        # 进程结束后调用：返回错误信息或 None
+        self._proc.wait(); self._log.close()
+        if self._feed:
+            error = self._feed.error or (self._proc.returncode and f"ffmpeg 退出码 {self._proc.returncode}")
+        else:
+            with open(self._log_path, encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+            fail = [line.split(" ", 2)[-1] for line in lines if line.startswith("HTXR:FAIL")]
+            error = None if any(line.startswith("HTXR:ENCODED") for line in lines) else (fail[-1] if fail else "序列编辑器编码失败")
+        return f"{error}，详见 {self._log_path}" if error else None
+
+class HTXR_OT_RenderVideoPipeline(_WorkerPoolMixin, Operator):
+    bl_idname = "htxr.render_video_pipeline"; bl_label = "序列帧流水线渲染视频"
+    bl_description = ("多个后台进程并行渲染无损序列帧（已存在的帧跳过），"
+                      "同时由 ffmpeg 按帧序流式编码；找不到 ffmpeg 时渲完再用序列编辑器编码")
+
+    def execute(self, context):
+        scene = context.scene; s = scene.htxr
+        cam = s.camera or scene.camera or context.view_layer.objects.active
+        if cam is None or cam.type != 'CAMERA':
+            self.report({'ERROR'}, "请在面板中选择一个摄像机。"); return {'CANCELLED'}
+        if s.video_direct_path and _pose_count(s) < 2:
+            self.report({'ERROR'}, "至少需要 2 个可读取的姿态用于插值。"); return {'CANCELLED'}
+        script = os.path.abspath(__file__)
+        if not os.path.isfile(script):
+            self.report({'ERROR'}, "找不到插件脚本文件，请以插件方式安装后再使用流水线渲染。"); return {'CANCELLED'}
+        self._blender = bpy.path.abspath(s.dist_blender_path) if s.dist_blender_path else bpy.app.binary_path
+        self._script = script
+
+        out_dir = bpy.path.abspath(s.output_dir).rstrip("\\/"); os.makedirs(out_dir, exist_ok=True)
+        base, ext = os.path.splitext(s.video_filename)
+        self._video = os.path.join(out_dir, (base or "render") + (ext or ".mp4"))
+        frames_dir = os.path.join(out_dir, f"{base or 'render'}_frames"); os.makedirs(frames_dir, exist_ok=True)
+        settings, img_ext, decoder = _PIPELINE_FORMATS[s.pipeline_format]
+        frames = list(range(s.frame_start, s.frame_start + s.total_frames))
+        stems = [os.path.join(frames_dir, f"frame_{f:06d}") for f in frames]
+        files = [stem + img_ext for stem in stems]
+        # 静止帧：源帧 → [(静止帧, 文件)]，不派给工作进程，源帧完成后复制其文件
+        self._files, self._holds = dict(zip(frames, files)), {}
+        if s.video_skip_holds:
+            src, reason = _plan_holds(scene, s, cam)
+            if reason:
+                self.report({'WARNING'}, f"未跳过静止帧：{reason}。")
+            else:
+                for i, j in enumerate(src.tolist()):
+                    if i != j and not _frame_ready(files[i]):
+                        self._holds.setdefault(frames[j], []).append((frames[i], files[i]))
+        held = {f for pairs in self._holds.values() for f, _path in pairs}
+        todo = [(f, stem) for f, stem, path in zip(frames, stems, files) if not _frame_ready(path) and f not in held]
+        self._feed = _EncodeFeed(frames, files, [f for f, path in zip(frames, files) if _frame_ready(path)])
+        self._skipped, self._to_render, self._held = len(frames) - len(todo) - len(held), len(todo), len(held)
+        self._fps = s.fps
+        r = scene.render
+        self._res = ((s.video_res_x, s.video_res_y) if s.video_apply_override else
+                     (round(r.resolution_x * r.resolution_percentage / 100), round(r.resolution_y * r.resolution_percentage / 100)))
+
+        self._pool_init(os.path.join(out_dir, ".htxr_video"))
+        self._failed, self._encoded_ok, self._encode_k, self._encode_error = {}, False, None, None
+        for f in list(self._holds):
+            if f in self._feed.ready:
+                self._fill_holds(f)  # 源帧上次已渲出
+        if todo:
+            snapshot = self._snapshot()
+            chunks = [todo[k:k + _FRAME_CHUNK] for k in range(0, len(todo), _FRAME_CHUNK)]
+            n = min(s.dist_workers, len(chunks))
+            threads = s.dist_threads or max(1, (os.cpu_count() or 1) // n)
+            job = {
+                "scene": scene.name, "camera": cam.name,
+                "apply_override": s.video_apply_override,
+                "res_x": s.video_res_x, "res_y": s.video_res_y, "samples": s.video_samples,
+                "static_scene": s.static_scene, "image_settings": settings,
+            }
+            if s.video_direct_path:
+                path_file = os.path.join(self._work_dir, "path.npy")
+                np.save(path_file, _path_transforms(s, s.total_frames, s.frame_start))
+                job.update(path_file=path_file, path_frame_start=s.frame_start)
+            for k in range(n):
+                items = [{"index": f, "frame": f, "filepath": stem} for chunk in chunks[k::n] for f, stem in chunk]
+                job_path = self._write_job(f"frames_{k:03d}.json", dict(job, items=items))
+                try:
+                    self._spawn([self._blender, "-b", snapshot, "-t", str(threads),
+                                 "--python", script, "--", _WORKER_FLAG, job_path])
+                except OSError as e:
+                    self._kill_workers(); shutil.rmtree(self._work_dir, ignore_errors=True)
+                    self.report({'ERROR'}, f"无法启动工作进程：{e}"); return {'CANCELLED'}
+        self._n_render = len(self._procs)
+
+        ffmpeg = bpy.path.abspath(s.ffmpeg_path) if s.ffmpeg_path else shutil.which("ffmpeg")
+        self._encoder = self._feeder = self._encoder_log = None
+        if ffmpeg:
+            try:
+                self._encoder_log_path = os.path.join(frames_dir, "ffmpeg.log")
+                self._encoder_log = open(self._encoder_log_path, "wb")
+                self._encoder = subprocess.Popen(
+                    _ffmpeg_cmd(ffmpeg, decoder, self._fps, self._video),
+                    stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._encoder_log,
+                    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+                )
+            except OSError as e:
+                if self._encoder_log:
+                    self._encoder_log.close(); self._encoder_log = None
+                self.report({'WARNING'}, f"无法启动 ffmpeg（{e}），改用序列编辑器编码。")
             else:
-                ev = getattr(scene, "eevee", None)
-                if ev and orig["eevee_taa"] is not None and hasattr(ev, "taa_render_samples"):
-                    ev.taa_render_samples = orig["eevee_taa"]
-            scene.frame_start, scene.frame_end = orig["frame_range"]
+                self._feeder = threading.Thread(target=self._feed.run, args=(self._encoder.stdin,), daemon=True)
+                self._feeder.start()
+
+        self._phase = 'RENDER'
+        self._start_timer(context, 2 * len(frames))
+        encoder = "ffmpeg 流式编码" if self._encoder else "渲完后序列编辑器编码"
+        self.report({'INFO'}, f"视频流水线：渲染 {len(todo)} 帧（跳过已存在 {self._skipped} 帧、静止帧 {self._held} 帧），{encoder}。")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self._finish(context, "已取消：已完成的帧保留在序列目录，重跑会跳过。")
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        self._drain()
+        total, rendered = len(self._feed.frames), len(self._feed.ready)
+        encoded = total if self._encoded_ok else self._feed.encoded
+        context.window_manager.progress_update(rendered + encoded)
+        if context.workspace:
+            context.workspace.status_text_set(
+                f"HTXR 视频流水线 渲染 {rendered}/{total} · 编码 {encoded}/{total}（失败 {len(self._failed)}）  Esc 取消"
+            )
+
+        if self._phase == 'RENDER':
+            if any(p.poll() is None for p in self._procs[:self._n_render]):
+                return {'PASS_THROUGH'}
+            for r in self._readers:
+                r.join(timeout=2.0)
+            self._drain()
+            if len(self._feed.ready) < total:
+                return self._finish(context, f"有 {total - len(self._feed.ready)} 帧渲染失败或缺失（详见控制台），"
+                                             "已完成的帧保留，重跑会跳过。")
+            self._phase = 'ENCODE'
+            if self._encoder is None:
+                job_path = self._write_job("encode.json", {
+                    "files": self._feed.files, "fps": self._fps, "res": self._res, "outfile": self._video,
+                })
+                try:
+                    self._encode_k = self._spawn([self._blender, "-b", "--factory-startup",
+                                                  "--python", self._script, "--", _ENCODE_FLAG, job_path])
+                except OSError as e:
+                    return self._finish(context, f"无法启动编码进程：{e}")
+            return {'PASS_THROUGH'}
+
+        # ENCODE
+        if self._encoder is not None:
+            if self._feeder.is_alive() or self._encoder.poll() is None:
+                return {'PASS_THROUGH'}
+            if self._feed.error or self._encoder.returncode != 0:
+                return self._finish(context, f"ffmpeg 编码失败（{self._feed.error or self._encoder.returncode}），"
+                                             f"详见 {self._encoder_log_path}。")
+            return self._finish(context, None)
+        if self._procs[self._encode_k].poll() is None:
+            return {'PASS_THROUGH'}
+        self._drain()
+        return self._finish(context, None if self._encoded_ok else
+                            f"序列编辑器编码失败：{self._encode_error or '详见控制台'}。")
+
+    def _on_worker_line(self, shard, tag, idx, rest):
+        if tag == "DONE":
+            self._feed.ready.add(int(idx)); self._fill_holds(int(idx))
+        elif tag == "FAIL" and shard == self._encode_k:
+            self._encode_error = rest
+        elif tag == "FAIL":
+            self._failed[int(idx)] = rest
+        elif tag == "ENCODED":
+            self._encoded_ok = True
+        else:
+            return False
+        return True
+
+    def _fill_holds(self, f):
+        # 主线程：源帧就绪后把文件复制给其后的静止帧，再登记为就绪（编码线程按帧序读取）
+        for g, path in self._holds.pop(f, ()):
+            try:
+                _copy_frame(self._files[f], path)
+            except OSError as e:
+                self._failed[g] = f"复制静止帧失败：{e}"; continue
+            self._feed.ready.add(g)
 
-        self.report({'INFO'}, f"视频渲染完成：{outfile}.mp4")
+    def _finish(self, context, error):
+        self._feed.abort.set()
+        if self._encoder is not None:
+            if error and self._encoder.poll() is None:
+                self._encoder.kill()
+            self._encoder.wait()
+            self._feeder.join(timeout=2.0)
+            self._encoder_log.close()
+        self._close_pool(context)
+        for f, msg in sorted(self._failed.items()):
+            print(f"[HTXR] 第 {f} 帧渲染失败：{msg}")
+        if error:
+            self.report({'WARNING'}, f"视频流水线：{error}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"视频流水线完成：{self._video}（渲染 {self._to_render} 帧，跳过已存在 {self._skipped} 帧、"
+                              f"静止帧 {self._held} 帧）")
         return {'FINISHED'}
 
 # =========================
@@ -387,11 +3679,69 @@ def draw_main_block(layout, s):
     col = box2.column(align=True); col.enabled = s.apply_override
     col.prop(s, "res_x"); col.prop(s, "res_y"); col.prop(s, "samples")
     box2.prop(s, "restore_scene_camera")
+    box2.prop(s, "skip_unchanged")
+    box2.prop(s, "static_scene")
+    box2.prop(s, "async_write")
+    col = box2.column(align=True); col.enabled = s.async_write
+    row = col.row(align=True); row.prop(s, "async_workers"); row.prop(s, "async_queue")
+    col.prop(s, "staging_dir")
+    box2.prop(s, "multi_size")
+    col = box2.column(align=True); col.enabled = s.multi_size
+    col.prop(s, "multi_sizes")
+    row = col.row(align=True); row.prop(s, "multi_size_workers"); row.prop(s, "multi_size_sheet")
+    box2.prop(s, "budget_mode")
+    if s.budget_mode != 'OFF':
+        col = box2.column(align=True)
+        if s.budget_mode == 'TIME':
+            col.prop(s, "budget_minutes")
+        col.prop(s, "budget_noise")
+    box2.prop(s, "tile_render")
+    col = box2.column(align=True); col.enabled = s.tile_render
+    row = col.row(align=True); row.prop(s, "tile_cols"); row.prop(s, "tile_rows")
+    col.prop(s, "tile_memory_mb")
+    if s.tile_render:
+        w, h, cols, tiles = _tile_plan(_effective_still(s.id_data, s)[0], s)
+        col.label(text=f"{w}×{h} → {len(tiles)} 块（{cols} 列 × {len(tiles) // cols} 行）", icon='MESH_GRID')
 
     layout.separator()
     row = layout.row(); row.scale_y = 1.4
     row.operator("htxr.render_sequence", icon='RENDER_STILL')
 
+    box4 = layout.box(); box4.label(text="预览通道（先排查问题姿态，再按耗时渲染）", icon='IMAGE_DATA')
+    row = box4.row(align=True); row.prop(s, "preview_scale"); row.prop(s, "preview_samples")
+    box4.prop(s, "preview_denoise")
+    row = box4.row(align=True)
+    row.operator("htxr.render_sequence", text="① 预览通道", icon='RESTRICT_RENDER_OFF').pass_mode = 'PREVIEW'
+    row.operator("htxr.render_sequence", text="② 全质量（按预估耗时）", icon='SORTTIME').pass_mode = 'ORDERED'
+
+    box6 = layout.box(); box6.label(text="多机位批次", icon='OUTLINER_OB_CAMERA')
+    box6.prop(s, "use_rigs")
+    if s.use_rigs:
+        row = box6.row()
+        row.template_list("HTXR_UL_rig_list", "", s, "rigs", s, "rig_index", rows=3)
+        col = row.column(align=True)
+        col.operator("htxr.rig_add", text="", icon='ADD').preset = 'SINGLE'
+        col.operator("htxr.rig_add", text="", icon='MOD_MIRROR').preset = 'STEREO'
+        col.operator("htxr.rig_remove", text="", icon='REMOVE')
+        if 0 <= s.rig_index < len(s.rigs):
+            r = s.rigs[s.rig_index]
+            col = box6.column(align=True)
+            col.prop(r, "camera"); col.prop(r, "offset"); col.prop(r, "use_lens")
+            sub = col.column(align=True); sub.enabled = r.use_lens
+            sub.prop(r, "lens"); sub.prop(r, "sensor_width"); sub.prop(r, "shift_x"); sub.prop(r, "shift_y")
+        box6.label(text=f"输出：{s.filename_prefix}<序号>_<后缀>", icon='INFO')
+
+    box5 = layout.box(); box5.label(text="渲染前预检（射线检测问题姿态）", icon='VIEWZOOM')
+    box5.prop(s, "preflight")
+    col = box5.column(align=True)
+    col.prop(s, "preflight_grid"); col.prop(s, "preflight_near"); col.prop(s, "preflight_block_ratio")
+    box5.operator("htxr.preflight", icon='VIEWZOOM')
+
+    box3 = layout.box(); box3.label(text="分布式渲染（多进程）", icon='NETWORK_DRIVE')
+    row = box3.row(align=True); row.prop(s, "dist_workers"); row.prop(s, "dist_threads")
+    box3.prop(s, "dist_blender_path")
+    box3.operator("htxr.render_distributed", icon='RENDERLAYERS')
+
 def draw_pose_list_block(layout, s, rows=5):
     row = layout.row()
     row.template_list("HTXR_UL_pose_list", "", s, "poses", s, "pose_index", rows=rows)
@@ -409,6 +3759,47 @@ def draw_pose_list_block(layout, s, rows=5):
     row = layout.row(align=True)
     row.operator("htxr.pose_from_camera", icon='EYEDROPPER')
     row.operator("htxr.pose_quick_edit", icon='GREASEPENCIL')
+    row = layout.row(align=True)
+    row.operator("htxr.pose_import", icon='IMPORT')
+    row.operator("htxr.pose_export", icon='EXPORT')
+
+    box = layout.box()
+    box.prop(s, "pose_source", expand=True)
+    if s.pose_source == 'FILE':
+        box.prop(s, "pose_file")
+        n = _pose_count(s)
+        box.label(text=f"渲染直接读取文件中的 {n} 个姿态，上方列表不参与渲染" if n else "姿态文件不可读或为空",
+                  icon='INFO' if n else 'ERROR')
+
+    box = layout.box(); box.label(text="重复姿态", icon='DUPLICATE')
+    box.use_property_split = True
+    col = box.column(align=True); col.prop(s, "dedup_pos_tol"); col.prop(s, "dedup_ang_tol")
+    box.prop(s, "dedup_alias")
+    box.operator("htxr.pose_dedup", icon='VIEWZOOM')
+
+    box = layout.box(); box.label(text="姿态生成器", icon='PARTICLE_POINT')
+    box.use_property_split = True
+    box.prop(s, "gen_type")
+    if s.gen_type == 'GRID':
+        col = box.column(align=True); col.prop(s, "gen_grid_min"); col.prop(s, "gen_grid_max"); col.prop(s, "gen_grid_steps")
+    elif s.gen_type == 'CURVE':
+        box.prop(s, "gen_curve"); box.prop(s, "gen_count")
+    else:
+        col = box.column(align=True)
+        col.prop(s, "gen_radius"); col.prop(s, "gen_count")
+        if s.gen_type == 'ORBIT':
+            col.prop(s, "gen_rings")
+        col.prop(s, "gen_elev_min"); col.prop(s, "gen_elev_max")
+    box.prop(s, "gen_target")
+    if not s.gen_target:
+        box.prop(s, "gen_center")
+    box.prop(s, "gen_orient")
+    if s.gen_orient == 'FIXED':
+        box.prop(s, "gen_rotation")
+    else:
+        box.prop(s, "gen_roll")
+    box.label(text=f"共 {_generator_count(s)} 个视点", icon='INFO')
+    box.operator("htxr.pose_generate", icon='ADD')
 
 def draw_pose_edit_block(layout, s):
     layout.use_property_split = True
@@ -427,11 +3818,18 @@ def draw_video_block(layout, s):
     box.prop(s, "total_frames")
     box.prop(s, "fps")
 
+    box3 = layout.box(); box3.label(text="路径插值", icon='CURVE_BEZCURVE')
+    box3.prop(s, "path_interp")
+    col = box3.column(align=True); col.enabled = s.path_interp == 'SPLINE'
+    col.prop(s, "path_spline"); col.prop(s, "path_rotation"); col.prop(s, "path_timing")
+
     box2 = layout.box(); box2.label(text="视频渲染设置", icon='RENDER_ANIMATION')
     box2.prop(s, "video_apply_override")
     col = box2.column(align=True); col.enabled = s.video_apply_override
     col.prop(s, "video_res_x"); col.prop(s, "video_res_y"); col.prop(s, "video_samples")
     box2.prop(s, "video_filename")
+    box2.prop(s, "video_direct_path")
+    box2.prop(s, "video_skip_holds")
 
     layout.separator()
     row = layout.row(align=True)
@@ -440,6 +3838,32 @@ def draw_video_block(layout, s):
     row.scale_y = 1.2
     row.operator("htxr.render_video", icon='RENDER_ANIMATION')
 
+    box4 = layout.box(); box4.label(text="序列帧流水线（多进程渲染 + 流式编码）", icon='SEQ_SEQUENCER')
+    box4.prop(s, "pipeline_format"); box4.prop(s, "ffmpeg_path")
+    box4.label(text="进程数 / 线程数沿用『分布式渲染』设置", icon='INFO')
+    box4.operator("htxr.render_video_pipeline", icon='RENDER_ANIMATION')
+
+def draw_profile_block(layout, s):
+    layout.use_property_split = True
+    layout.prop(s, "profile_report")
+    try:
+        p = json.loads(s.profile_last) if s.profile_last else None
+    except ValueError:
+        p = None
+    if not p:
+        layout.label(text="暂无记录：勾选后渲染一次即可。", icon='INFO'); return
+    still = p["kind"] == "still"
+    box = layout.box(); col = box.column(align=True)
+    col.label(text=f"最近一批 {p['batch']}：{p['count']} {'张' if still else '帧'}", icon='TIME')
+    col.label(text=f"平均 {p['mean']:.2f}s · p95 {p['p95']:.2f}s")
+    col.label(text=f"同步 / 采样 / 采样后（降噪、写文件）：{p['sync']:.2f} / {p['render']:.2f} / {p.get('post', 0.0):.2f}s")
+    if p.get("peak_rss_mb"):
+        col.label(text=f"进程峰值内存 {p['peak_rss_mb']:.0f} MB")
+    n = _pose_count(s) if still else s.total_frames
+    col.separator()
+    col.label(text=f"按当前 {n} {'个姿态' if still else '帧'}预计：{_fmt_duration(p['mean'] * n)}"
+                   f"（p95 估 {_fmt_duration(p['p95'] * n)}）")
+
 # =========================
 # N 面板（紧凑）
 # =========================
@@ -482,6 +3906,16 @@ class HTXR_PT_Video(Panel):
     def draw(self, context):
         draw_video_block(self.layout, context.scene.htxr)
 
+class HTXR_PT_Profile(Panel):
+    bl_label = "Profiling"
+    bl_idname = "HTXR_PT_profile"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "HTXR"
+    bl_options = {'DEFAULT_CLOSED'}
+    def draw(self, context):
+        draw_profile_block(self.layout, context.scene.htxr)
+
 # =========================
 # 属性编辑器（宽、可滚动）
 # =========================
@@ -524,41 +3958,498 @@ class HTXR_PT_Video_Props(Panel):
     def draw(self, context):
         draw_video_block(self.layout, context.scene.htxr)
 
+class HTXR_PT_Profile_Props(Panel):
+    bl_label = "HTXR · Profiling"
+    bl_idname = "HTXR_PT_profile_props"
+    bl_space_type = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_context = "render"
+    bl_options = {'DEFAULT_CLOSED'}
+    def draw(self, context):
+        draw_profile_block(self.layout, context.scene.htxr)
+
 # =========================
 # 注册
 # =========================
-classes = (
+_DATA_CLASSES = (
     HTXR_PoseItem,
+    HTXR_RigItem,
     HTXR_Settings,
+)
+
+classes = (
+    *_DATA_CLASSES,
     HTXR_UL_PoseList,
+    HTXR_UL_RigList,
     HTXR_OT_PoseAdd,
     HTXR_OT_PoseRemove,
     HTXR_OT_PoseMove,
     HTXR_OT_PoseClear,
     HTXR_OT_PoseFromCamera,
     HTXR_OT_PoseQuickEdit,
+    HTXR_OT_RigAdd,
+    HTXR_OT_RigRemove,
+    HTXR_OT_PoseImport,
+    HTXR_OT_PoseExport,
+    HTXR_OT_PoseGenerate,
+    HTXR_OT_PoseDedup,
+    HTXR_OT_Preflight,
     HTXR_OT_RenderSequence,
+    HTXR_OT_RenderDistributed,
     HTXR_OT_InsertKeyframesFromPoses,
     HTXR_OT_RenderVideo,
+    HTXR_OT_RenderVideoPipeline,
     HTXR_PT_Main,
     HTXR_PT_PoseList,
     HTXR_PT_PoseEdit,
     HTXR_PT_Video,
+    HTXR_PT_Profile,
     HTXR_PT_Main_Props,
     HTXR_PT_PoseList_Props,
     HTXR_PT_PoseEdit_Props,
     HTXR_PT_Video_Props,
+    HTXR_PT_Profile_Props,
 )
 
 def register():
     for c in classes:
         bpy.utils.register_class(c)
     bpy.types.Scene.htxr = PointerProperty(type=HTXR_Settings)
+    if _on_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_on_load_post)
 
 def unregister():
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    _POSE_LIST_CACHE.clear()
     for c in reversed(classes):
         bpy.utils.unregister_class(c)
     del bpy.types.Scene.htxr
 
+def _register_data():
+    # 只注册数据结构（任务入口用）：不注册面板、列表与操作
+    for c in _DATA_CLASSES:
+        bpy.utils.register_class(c)
+    bpy.types.Scene.htxr = PointerProperty(type=HTXR_Settings)
+
+# =========================
+# 任务入口：脚本 API run_job(spec) 与命令行
+#   blender -b scene.blend --python CameraBatcher.py -- --job job.json [--result result.json]
+# 任务描述（JSON）：
+#   {"kind": "images" | "preview" | "ordered" | "video" | "keyframes",
+#    "scene": "Scene", "camera": "Camera",
+#    "poses": "scene" | [[x, y, z, rx, ry, rz], ...] | {"file": "poses.csv"} | {"generator": {"type": "ORBIT", ...}},
+#    "output": {"dir", "prefix", "padding", "video_filename"},
+#    "override": {"res_x", "res_y", "samples"},
+#    "video": {"frame_start", "total_frames", "fps", "direct_path", "interp", "skip_holds",
+#              "res_x", "res_y", "samples"},
+#    "settings": {任意 HTXR_Settings 属性: 值}}
+# =========================
+_JOB_FLAG = "--job"
+_JOB_EXIT = {"ok": 0, "partial": 1, "error": 2, "cancelled": 3}
+_JOB_SECTIONS = {  # 分组键 → HTXR_Settings 属性
+    "output": {"dir": "output_dir", "prefix": "filename_prefix", "padding": "padding", "video_filename": "video_filename"},
+    "override": {"res_x": "res_x", "res_y": "res_y", "samples": "samples"},
+    "video": {"frame_start": "frame_start", "total_frames": "total_frames", "fps": "fps",
+              "direct_path": "video_direct_path", "interp": "path_interp", "skip_holds": "video_skip_holds",
+              "res_x": "video_res_x", "res_y": "video_res_y", "samples": "video_samples"},
+}
+
+class _Headless:
+    # 脱离 UI 运行批次类：report 收进 messages 并打印，代替信息栏
+    def __init__(self, **props):
+        self.messages = []
+        self.__dict__.update(props)
+
+    def report(self, level, message):
+        level = next(iter(level))
+        self.messages.append({"level": level, "message": message})
+        print(f"[HTXR] {level}: {message}", flush=True)
+
+class _HeadlessStill(_Headless, _StillBatch):
+    pass
+
+class _HeadlessVideo(_Headless, _VideoBatch):
+    pass
+
+class _HeadlessKeyframes(_Headless, _KeyframeBatch):
+    pass
+
+_JOB_KINDS = {
+    "images": (_HeadlessStill, {"pass_mode": 'NORMAL'}),
+    "preview": (_HeadlessStill, {"pass_mode": 'PREVIEW'}),
+    "ordered": (_HeadlessStill, {"pass_mode": 'ORDERED'}),
+    "video": (_HeadlessVideo, {}),
+    "keyframes": (_HeadlessKeyframes, {}),
+}
+
+def _job_settings(spec, tmp_dir):
+    # 任务描述 → {HTXR_Settings 属性: 值}；内联姿态写成临时 .npy，按外部文件读取，不改场景列表
+    values = {"camera": spec["camera"]} if "camera" in spec else {}
+    poses = spec.get("poses", "scene")
+    if isinstance(poses, list):
+        path = os.path.join(tmp_dir, "poses.npy")
+        np.save(path, _check_pose_array(poses))
+        values.update(pose_source='FILE', pose_file=path)
+    elif isinstance(poses, dict) and "file" in poses:
+        values.update(pose_source='FILE', pose_file=poses["file"])
+    elif isinstance(poses, dict) and "generator" in poses:
+        values["pose_source"] = 'GENERATOR'
+        values.update({f"gen_{k}": v for k, v in poses["generator"].items()})
+    elif poses == "scene":
+        values["pose_source"] = 'SCENE'
+    else:
+        raise ValueError(f"无法识别的 poses：{poses!r}")
+    for section, keys in _JOB_SECTIONS.items():
+        for k, v in spec.get(section, {}).items():
+            if k not in keys:
+                raise ValueError(f"未知的任务键：{section}.{k}")
+            values[keys[k]] = v
+    if "override" in spec:
+        values["apply_override"] = True
+    if any(k in spec.get("video", {}) for k in ("res_x", "res_y", "samples")):
+        values["video_apply_override"] = True
+    values.update(spec.get("settings", {}))
+    return values
+
+def _apply_settings(s, values):
+    # 写入 scene.htxr，返回原值供 _restore_settings 写回；对象指针属性接受对象名
+    props, backup = HTXR_Settings.bl_rna.properties, {}
+    try:
+        for k, v in values.items():
+            prop = props.get(k)
+            if prop is None or prop.type == 'COLLECTION' or prop.is_readonly:
+                raise ValueError(f"未知设置：{k}")
+            if prop.type == 'POINTER' and isinstance(v, str):
+                obj = bpy.data.objects.get(v)
+                if obj is None:
+                    raise ValueError(f"{k}：找不到对象 {v}")
+                v = obj
+            old = getattr(s, k)
+            backup[k] = old[:] if getattr(prop, "is_array", False) else old
+            try:
+                setattr(s, k, v)
+            except TypeError as e:
+                raise ValueError(f"{k}：{e}") from e
+    except ValueError:
+        _restore_settings(s, backup); raise
+    return backup
+
+def _restore_settings(s, backup):
+    for k, v in backup.items():
+        setattr(s, k, v)
+
+def _job_context(scene):
+    # 批次类用到的 context 成员；window 为 None → 阻塞渲染
+    ctx = bpy.context
+    if scene == ctx.scene:
+        view_layer, depsgraph = ctx.view_layer, ctx.evaluated_depsgraph_get
+    else:
+        view_layer = scene.view_layers[0]
+        def depsgraph():
+            dg = view_layer.depsgraph; dg.update()
+            return dg
+    return SimpleNamespace(scene=scene, view_layer=view_layer, window=None, workspace=None,
+                           window_manager=ctx.window_manager, evaluated_depsgraph_get=depsgraph)
+
+def run_job(spec, scene=None):
+    # 按任务描述阻塞运行一个批次，不需要面板或 UI 上下文；scene.htxr 的设置临时改写、结束后写回，
+    # 渲染相关场景设置由批次本身还原。返回 {"status": ok | partial | error | cancelled, "done", "total", ...}
+    if not hasattr(bpy.types.Scene, "htxr"):
+        _register_data()
+    kind = spec.get("kind", "images")
+    if scene is None:
+        scene = bpy.data.scenes.get(spec["scene"]) if "scene" in spec else bpy.context.scene
+    result = {"status": "error", "kind": kind, "scene": scene.name if scene else spec.get("scene"),
+              "done": None, "total": None, "elapsed_s": 0.0, "messages": []}
+    if scene is None or kind not in _JOB_KINDS:
+        msg = f"未知的任务类型：{kind}" if scene else f"找不到场景：{spec.get('scene')}"
+        result["messages"].append({"level": 'ERROR', "message": msg})
+        return result
+
+    cls, props = _JOB_KINDS[kind]
+    runner = cls(**props)
+    tmp_dir = tempfile.mkdtemp(prefix="htxr_job_")
+    t0 = time.perf_counter()
+    try:
+        backup = _apply_settings(scene.htxr, _job_settings(spec, tmp_dir))
+        try:
+            ret = runner.execute(_job_context(scene))
+        finally:
+            _restore_settings(scene.htxr, backup)
+    except (ValueError, OSError, RuntimeError) as e:
+        runner.report({'ERROR'}, f"任务失败：{e}"); ret = {'CANCELLED'}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if 'FINISHED' in ret:
+        status = "partial" if any(m["level"] == 'ERROR' for m in runner.messages) else "ok"
+    else:
+        status = "cancelled" if getattr(runner, "_stop", None) == 'CANCEL' else "error"
+    result.update(status=status, done=getattr(runner, "_done", None), total=getattr(runner, "_total", None),
+                  elapsed_s=round(time.perf_counter() - t0, 3), messages=runner.messages)
+    return result
+
+def _job_main(args):
+    # 每个任务输出一行 “HTXR:RESULT <序号> <JSON>”；退出码取各任务中最差的状态（见 _JOB_EXIT）
+    import argparse
+    ap = argparse.ArgumentParser(prog=f"blender -b scene.blend --python CameraBatcher.py -- {_JOB_FLAG}")
+    ap.add_argument("job", help="任务描述 JSON：单个任务或任务数组，按顺序执行")
+    ap.add_argument("--result", help="另把全部结果写成 JSON 文件")
+    a = ap.parse_args(args)
+    try:
+        with open(a.job, encoding="utf-8") as f:
+            specs = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"HTXR:FATAL 0 读取任务失败：{e}", flush=True); return _JOB_EXIT["error"]
+    if not hasattr(bpy.types.Scene, "htxr"):  # 未用 --factory-startup 且插件已启用时数据结构已注册
+        _register_data()
+    results = []
+    for k, spec in enumerate(specs if isinstance(specs, list) else [specs]):
+        results.append(run_job(spec))
+        print(f"HTXR:RESULT {k} {json.dumps(results[-1], ensure_ascii=False)}", flush=True)
+    if a.result:
+        with open(a.result, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, ensure_ascii=False, indent=2)
+    return max((_JOB_EXIT[r["status"]] for r in results), default=0)
+
+# =========================
+# 工作进程入口（blender -b snapshot.blend --python 本文件 -- --htxr-worker shard.json）
+# =========================
+def _worker_main(job_path):
+    with open(job_path, encoding="utf-8") as f:
+        job = json.load(f)
+    scene = bpy.data.scenes.get(job["scene"]) or bpy.context.scene
+    cam = bpy.data.objects.get(job["camera"])
+    if cam is None or cam.type != 'CAMERA':
+        print(f"HTXR:FATAL 0 找不到摄像机 {job['camera']}", flush=True); return 2
+
+    scene.camera = cam
+    if job["apply_override"]:
+        _apply_render_override(scene, job["res_x"], job["res_y"], job["samples"])
+    if job.get("static_scene"):
+        scene.render.use_persistent_data = True
+    if job.get("image_settings"):
+        for key, value in job["image_settings"].items():
+            setattr(scene.render.image_settings, key, value)
+        scene.render.use_file_extension = True
+    cam.rotation_mode = 'XYZ'
+    if job.get("path_file"):
+        _attach_path_action(cam, np.load(job["path_file"]), job["path_frame_start"])
+    lens_base = {} if any("rig" in it for it in job["items"]) else None
+    failed = 0
+    for it in job["items"]:
+        if "frame" in it:
+            scene.frame_set(it["frame"])
+        if "loc" in it:
+            scene.camera = _place_rig(cam, it.get("rig"), it["loc"], it["rot"], lens_base)
+        if "border" in it:
+            _set_border(scene.render, it["border"])
+        # 先写临时名再改名：进程被终止时不会留下半截文件，续渲的“已存在即跳过”才可靠
+        part = it["filepath"] + "_part"
+        scene.render.filepath = part
+        try:
+            bpy.ops.render.render(write_still=True, scene=scene.name)
+            os.replace(_still_output_path(scene, part), _still_output_path(scene, it["filepath"]))
+        except Exception as e:
+            failed += 1
+            print(f"HTXR:FAIL {it['index']} {e}", flush=True); continue
+        print(f"HTXR:DONE {it['index']} {it['filepath']}", flush=True)
+    return 1 if failed else 0
+
+def _encode_main(job_path):
+    # 在空白工程里用序列编辑器把图像序列编码为 MP4（H.264），不依赖外部 ffmpeg
+    with open(job_path, encoding="utf-8") as f:
+        job = json.load(f)
+    files = job["files"]
+    scene = bpy.data.scenes.new("HTXR_Encode")
+    r = scene.render
+    r.resolution_x, r.resolution_y = job["res"]; r.resolution_percentage = 100
+    r.fps, r.fps_base = job["fps"], 1.0
+    scene.view_settings.view_transform = 'Standard'
+    se = scene.sequence_editor_create()
+    strips = se.strips if hasattr(se, "strips") else se.sequences
+    strip = strips.new_image(name="HTXR", filepath=files[0], channel=1, frame_start=1)
+    for fp in files[1:]:
+        strip.elements.append(os.path.basename(fp))
+    scene.frame_start, scene.frame_end = 1, len(files)
+    r.use_sequencer = True
+    r.image_settings.file_format = 'FFMPEG'
+    r.ffmpeg.format = 'MPEG4'; r.ffmpeg.codec = 'H264'
+    r.filepath = os.path.splitext(job["outfile"])[0] + "_encode_"
+    try:
+        bpy.ops.render.render(animation=True, scene=scene.name)
+        # Blender 会在影片文件名后追加帧范围，编码完改回目标文件名
+        os.replace(r.frame_path(frame=scene.frame_start), job["outfile"])
+    except Exception as e:
+        print(f"HTXR:FAIL 0 {e}", flush=True); return 1
+    print(f"HTXR:ENCODED {len(files)} {job['outfile']}", flush=True)
+    return 0
+
+# =========================
+# 基准测试（blender -b --factory-startup --python 本文件 -- --htxr-bench [选项]）
+# 合成场景 + 低采样 CPU 渲染，记录吞吐与非采样开销，并与基线 JSON 对比
+# =========================
+_BENCH_FLAG = "--htxr-bench"
+_BENCH_OPS = ("sequence", "keyframes", "video")
+_BENCH_METRICS = {"poses_per_s": True, "frames_per_s": True, "overhead_s": False, "keyframe_s": False}  # 指标 → 越大越好
+
+def _bench_scene(scene, complexity):
+    # 清空场景后放 complexity² 个独立网格的 UV 球（每个约 256·complexity² 个三角面）、一盏日光与相机
+    import bmesh
+    for ob in list(scene.objects):
+        bpy.data.objects.remove(ob)
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(bm, u_segments=16 * complexity, v_segments=8 * complexity, radius=0.4)
+    me = bpy.data.meshes.new("HTXR_Bench"); bm.to_mesh(me); bm.free()
+    half = (complexity - 1) / 2
+    for k in range(complexity * complexity):
+        ob = bpy.data.objects.new(f"HTXR_Bench{k}", me if k == 0 else me.copy())
+        ob.location = (k % complexity - half, k // complexity - half, 0.0)
+        scene.collection.objects.link(ob)
+    scene.collection.objects.link(bpy.data.objects.new("HTXR_BenchSun", bpy.data.lights.new("HTXR_BenchSun", 'SUN')))
+    cam = bpy.data.objects.new("HTXR_BenchCam", bpy.data.cameras.new("HTXR_BenchCam"))
+    scene.collection.objects.link(cam)
+    scene.camera = cam
+    return cam
+
+def _bench_poses(n, complexity):
+    # 绕原点一圈、俯视对准中心
+    a = np.linspace(0.0, 2.0 * math.pi, n, endpoint=False)
+    radius = complexity + 2.0
+    pos = np.column_stack((radius * np.cos(a), radius * np.sin(a), np.full(n, radius * 0.5)))
+    return np.hstack((pos, _look_at_euler(pos, np.zeros(3))))
+
+def _bench_op(op, s):
+    # 运行一个 HTXR 操作，返回 (墙钟秒数, 性能摘要或 None)
+    s.profile_last = ""
+    t0 = time.perf_counter()
+    ret = op()
+    wall = time.perf_counter() - t0
+    if 'FINISHED' not in ret:
+        raise RuntimeError(f"{op.idname_py()} 返回 {ret}")
+    return wall, json.loads(s.profile_last) if s.profile_last else None
+
+def _bench_overhead(wall, summary, n):
+    # 非采样开销：墙钟时间扣除各张纯采样时间后按张平均（含场景同步、降噪、写文件与队列调度）
+    sampling = summary["render"] * summary["count"] if summary else 0.0
+    return {"sampling_s": round(sampling, 4), "overhead_s": round((wall - sampling) / n, 5)}
+
+def _bench_run(scene, s, ops, counts, complexity, work_dir):
+    results = {}
+    for n in counts:
+        print(f"[HTXR] 基准：{n} 个姿态", flush=True)
+        _fill_poses(s.poses, _bench_poses(n, complexity), None)
+        s.pose_source = 'SCENE'
+        s.output_dir = os.path.join(work_dir, str(n))
+        s.frame_start, s.total_frames = 1, max(n, 2)
+        if "sequence" in ops:
+            wall, summary = _bench_op(bpy.ops.htxr.render_sequence, s)
+            results.setdefault("render_sequence", {})[str(n)] = {
+                "wall_s": round(wall, 4), "poses_per_s": round(n / wall, 4), **_bench_overhead(wall, summary, n)}
+        if "keyframes" in ops or "video" in ops:
+            wall, _summary = _bench_op(bpy.ops.htxr.insert_keyframes_from_poses, s)
+            results.setdefault("insert_keyframes", {})[str(n)] = {
+                "keyframe_s": round(wall, 5), "poses_per_s": round(n / wall, 4)}
+        if "video" in ops:
+            wall, summary = _bench_op(bpy.ops.htxr.render_video, s)
+            frames = s.total_frames
+            results.setdefault("render_video", {})[str(n)] = {
+                "wall_s": round(wall, 4), "frames_per_s": round(frames / wall, 4),
+                **_bench_overhead(wall, summary, frames)}
+    return results
+
+def _bench_compare(results, baseline, threshold):
+    # 逐项对比基线：吞吐下降或耗时上升超过 threshold（比例）记为回归
+    rows = []
+    for op, by_n in results.items():
+        for n, m in by_n.items():
+            base = baseline.get("results", {}).get(op, {}).get(n)
+            for key, higher in _BENCH_METRICS.items():
+                if not base or key not in m or not base.get(key):
+                    continue
+                change = m[key] / base[key] - 1.0
+                rows.append({"op": op, "poses": int(n), "metric": key, "baseline": base[key], "current": m[key],
+                             "change": round(change, 4), "regression": (-change if higher else change) > threshold})
+    return rows
+
+def _bench_main(args):
+    import argparse
+    ap = argparse.ArgumentParser(prog=f"blender -b --factory-startup --python CameraBatcher.py -- {_BENCH_FLAG}")
+    ap.add_argument("--out", default="htxr_bench.json", help="结果 JSON")
+    ap.add_argument("--baseline", help="基线 JSON（以前某次的 --out）；有回归时退出码为 1")
+    ap.add_argument("--threshold", type=float, default=10.0, help="回归阈值（百分比）")
+    ap.add_argument("--poses", default="10,100", help="姿态数量，逗号分隔（大数量请显式指定，如 10,100,1000,10000）")
+    ap.add_argument("--ops", default=",".join(_BENCH_OPS), help="要测的操作：" + ",".join(_BENCH_OPS))
+    ap.add_argument("--complexity", type=int, default=4, help="场景复杂度：complexity² 个球体")
+    ap.add_argument("--res", type=int, default=64, help="渲染分辨率（正方形）")
+    ap.add_argument("--samples", type=int, default=1)
+    ap.add_argument("--static", action="store_true", help="开启『静态场景（持久数据）』")
+    ap.add_argument("--keep", action="store_true", help="保留渲染输出")
+    a = ap.parse_args(args)
+    ops = {o.strip() for o in a.ops.split(",") if o.strip()}
+    counts = sorted({int(v) for v in a.poses.split(",") if v.strip()})
+    if not ops <= set(_BENCH_OPS) or not counts or min(counts) < 2 or a.complexity < 1:
+        ap.error("--ops / --poses / --complexity 取值无效（姿态数量至少为 2）")
+
+    scene = bpy.context.scene
+    cam = _bench_scene(scene, a.complexity)
+    r = scene.render
+    r.engine = 'CYCLES'
+    r.resolution_x = r.resolution_y = a.res; r.resolution_percentage = 100
+    r.image_settings.file_format = 'PNG'
+    scene.cycles.device = 'CPU'; scene.cycles.samples = a.samples; scene.cycles.use_denoising = False
+    s = scene.htxr
+    s.camera, s.apply_override, s.video_apply_override = cam, False, False
+    s.profile_report, s.static_scene = True, a.static
+
+    work_dir = tempfile.mkdtemp(prefix="htxr_bench_")
+    try:
+        results = _bench_run(scene, s, ops, counts, a.complexity, work_dir)
+    except RuntimeError as e:
+        print(f"[HTXR] 基准失败：{e}", flush=True); return 2
+    finally:
+        if not a.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "version": 1, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "env": {"blender": bpy.app.version_string, "addon": list(bl_info["version"]), "python": sys.version.split()[0],
+                "platform": sys.platform, "cpu_count": os.cpu_count()},
+        "config": {"complexity": a.complexity, "res": a.res, "samples": a.samples, "static_scene": a.static},
+        "results": results,
+    }
+    regressions = []
+    if a.baseline:
+        with open(a.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print(f"[HTXR] 注意：基线配置不同 {baseline.get('config')}", flush=True)
+        report["baseline"] = {"path": os.path.abspath(a.baseline), "env": baseline.get("env")}
+        report["compare"] = _bench_compare(results, baseline, a.threshold / 100.0)
+        regressions = [c for c in report["compare"] if c["regression"]]
+    with open(a.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for op, by_n in results.items():
+        for n, m in by_n.items():
+            print(f"[HTXR] {op:<17} {n:>6}  " + "  ".join(f"{k}={v}" for k, v in m.items()), flush=True)
+    for c in report.get("compare", ()):
+        flag = "  ← 回归" if c["regression"] else ""
+        print(f"[HTXR] {c['op']:<17} {c['poses']:>6}  {c['metric']:<12} "
+              f"{c['baseline']} → {c['current']}（{c['change']:+.1%}）{flag}", flush=True)
+    print(f"[HTXR] 结果已写入 {os.path.abspath(a.out)}" + (f"；{len(regressions)} 项回归" if a.baseline else ""), flush=True)
+    return 1 if regressions else 0
+
 if __name__ == "__main__":
+    _argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if _WORKER_FLAG in _argv:
+        sys.exit(_worker_main(_argv[_argv.index(_WORKER_FLAG) + 1]))
+    if _ENCODE_FLAG in _argv:
+        sys.exit(_encode_main(_argv[_argv.index(_ENCODE_FLAG) + 1]))
+    if _JOB_FLAG in _argv:
+        sys.exit(_job_main(_argv[_argv.index(_JOB_FLAG) + 1:]))
+    if _BENCH_FLAG in _argv:
+        register()
+        sys.exit(_bench_main(_argv[_argv.index(_BENCH_FLAG) + 1:]))
     register()